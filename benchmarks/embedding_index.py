@@ -0,0 +1,89 @@
+"""Measure the persisted panel embedding index with the offline hashing embedder.
+
+Builds a synthetic dashboard, then times a cold build, a warm reload (nothing
+re-embedded), an incremental update after editing a few panels, and top-K
+searches against the memory-mapped matrix. Also checks that only the edited
+panels are re-embedded and that a panel matching the subject ranks first.
+
+    python benchmarks/embedding_index.py --panels 2000 --changed 20
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+SERVICES = ["checkout", "payments", "search", "auth", "inventory", "billing", "gateway", "ledger"]
+SIGNALS = [
+    ("Request latency p99", "histogram_quantile(0.99, rate(http_request_duration_seconds_bucket[5m]))"),
+    ("Error rate", "sum(rate(http_requests_total{code=~\"5..\"}[5m]))"),
+    ("CPU usage", "rate(container_cpu_usage_seconds_total[5m])"),
+    ("Memory usage", "container_memory_working_set_bytes"),
+    ("Queue depth", "kafka_consumergroup_lag"),
+    ("Database connections", "pg_stat_activity_count"),
+]
+
+def make_panels(count):
+    panels = []
+    for panel_id in range(1, count + 1):
+        service = SERVICES[panel_id % len(SERVICES)]
+        title, expr = SIGNALS[(panel_id // len(SERVICES)) % len(SIGNALS)]
+        panels.append({
+            'id': panel_id,
+            'title': f"{service} {title} #{panel_id}",
+            'type': 'timeseries',
+            'description': f"{title} for the {service} service",
+            'row': service,
+            'datasource': {'uid': 'prom'},
+            'targets': [{'expr': expr, 'refId': 'A'}],
+        })
+    return panels
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--panels", type=int, default=2000)
+    parser.add_argument("--changed", type=int, default=20)
+    parser.add_argument("--searches", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["FRESHWORKS_CACHE_DIR"] = tempfile.mkdtemp(prefix="embedding-bench-")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from freshworks_tools.tools.panel_embeddings import PanelEmbeddingIndex, HashingEmbedder
+
+    panels = make_panels(args.panels)
+    embedder = HashingEmbedder()
+    api_url = "http://grafana.local/api/dashboards/uid/bench"
+
+    index, cold_ms = timed(lambda: PanelEmbeddingIndex(api_url, "1", embedder).update(panels))
+    assert index.embedded == len(panels), index.embedded
+
+    index, warm_ms = timed(lambda: PanelEmbeddingIndex(api_url, "1", embedder).update(panels))
+    assert index.embedded == 0, index.embedded
+
+    for panel in panels[:args.changed]:
+        panel['description'] += " (edited)"
+    index, incremental_ms = timed(lambda: PanelEmbeddingIndex(api_url, "1", embedder).update(panels))
+    assert index.embedded == args.changed, index.embedded
+
+    subject = "High request latency on checkout"
+    results, _ = timed(lambda: index.search(subject, top_k=20, min_score=0.0))
+    top = next(panel for panel in panels if panel['id'] == results[0][0])
+    assert "checkout" in top['title'] and "latency" in top['title'], top['title']
+
+    _, search_ms = timed(lambda: [index.search(subject, top_k=20) for _ in range(args.searches)])
+
+    print(f"Panels: {len(panels)}, dimension {embedder.dim}")
+    print(f"Cold build:          {cold_ms:8.1f} ms ({len(panels)} embedded)")
+    print(f"Warm reload:         {warm_ms:8.1f} ms (0 embedded)")
+    print(f"Incremental update:  {incremental_ms:8.1f} ms ({args.changed} embedded)")
+    print(f"Top-20 search:       {search_ms / args.searches:8.2f} ms per query")
+    print(f"Best match: {top['title']} ({results[0][1]:.2f})")
+    print("ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Offline end-to-end benchmark with local stand-ins for Grafana, the LLM API and Slack.
+
+One local HTTP server plays every external service:
+
+    /api/dashboards/uid/bench-<N>          dashboard JSON with N panels (plus /versions)
+    /render/d-solo/..., /render/d/...      a distinct PNG per panel, after --render-latency
+    /v1/chat/completions                   OpenAI-compatible relevance, vision and composite answers
+    /slack/api/files.*, /slack/upload/...  the files_upload_v2 flow and chat.postMessage/chat.update
+
+Each alert runs the real CLI in a fresh process (cold caches unless --warm) with
+RUN_REPORT_PATH set, so stage timings come from the tracing layer, and posts to
+its own Slack thread. A run fails if the CLI exits non-zero, posts no panels, or
+posts an analysis that is the tools' error placeholder. Reported per
+mode and dashboard size: median and p95 end-to-end latency, the median of each
+stage's per-run p95, and alerts/minute at the given --parallel level.
+
+    python benchmarks/harness.py
+    python benchmarks/harness.py --mode filter_alert --sizes 10 100 500 --runs 5 --render-latency 800
+    python benchmarks/harness.py --parallel 4 -- VISION_MODE=composite
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    # benchmark name -> CLI subcommand
+    "grafana": "filter",
+    "filter_alert": "llm-filter",
+    "no_subject": "dashboard",
+}
+SERVICES = ["checkout", "payments", "search", "auth", "inventory", "billing", "gateway", "ledger"]
+SIGNALS = ["request latency", "error rate", "cpu usage", "memory usage", "queue depth", "db connections"]
+# A substring of panels 1-7 (and every 48th panel after), so every mode and
+# dashboard size has related panels to analyze
+DEFAULT_SUBJECT = "request latency"
+# image_dedup.ANALYSIS_ERROR, what the tools post when a vision call fails
+ANALYSIS_ERROR = "Unable to analyze the image due to an error."
+
+def panel_title(panel_id):
+    return f"{SERVICES[panel_id % len(SERVICES)]} {SIGNALS[(panel_id // len(SERVICES)) % len(SIGNALS)]}"
+
+def make_dashboard(uid, count):
+    panels = [{
+        "id": panel_id,
+        "title": panel_title(panel_id),
+        "type": "timeseries",
+        "datasource": {"type": "prometheus", "uid": "prom"},
+        "targets": [{"refId": "A", "expr": f"rate(http_requests_total{{service=\"{SERVICES[panel_id % len(SERVICES)]}\"}}[5m])"}],
+        "gridPos": {"x": 0, "y": panel_id * 8, "w": 24, "h": 8},
+    } for panel_id in range(1, count + 1)]
+    return {"dashboard": {"uid": uid, "title": uid, "version": 1, "panels": panels}, "meta": {"slug": uid}}
+
+class Stubs:
+    def __init__(self, render_latency, llm_latency, slack_latency):
+        self.render_latency = render_latency
+        self.llm_latency = llm_latency
+        self.slack_latency = slack_latency
+        self.images = {}
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.threads = {}
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def post(self, fields, files=0):
+        # What each alert's Slack thread received: uploaded files and failed analyses
+        with self.lock:
+            thread = self.threads.setdefault(fields.get("thread_ts"), {"files": 0, "errors": 0})
+            thread["files"] += files
+            thread["errors"] += ANALYSIS_ERROR in " ".join(str(fields.get(name) or "") for name in ("initial_comment", "text"))
+
+    def thread(self, thread_ts):
+        with self.lock:
+            return dict(self.threads.get(thread_ts, {"files": 0, "errors": 0}))
+
+    def image(self, panel_id, width, height):
+        # Different series per panel so image dedup doesn't collapse them
+        key = (panel_id, width, height)
+        with self.lock:
+            if key in self.images:
+                return self.images[key]
+        from PIL import Image, ImageDraw
+
+        rng = random.Random(panel_id)
+        image = Image.new("RGB", (width, height), (24, 27, 31))
+        draw = ImageDraw.Draw(image)
+        value = height / 2
+        points = []
+        for x in range(0, width, 5):
+            value = min(height - 10, max(30, value + rng.uniform(-12, 12)))
+            points.append((x, value))
+        draw.line(points, fill=(115, 191, 105), width=2)
+        draw.text((10, 8), panel_title(panel_id) if panel_id else "dashboard", fill=(204, 204, 220))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        with self.lock:
+            self.images[key] = buffer.getvalue()
+        return self.images[key]
+
+    def completion(self, request):
+        content = request["messages"][-1]["content"]
+        if isinstance(content, list):
+            text = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+            numbered = re.findall(r"^(\d+)\. ", text, re.M)
+            if numbered:
+                return json.dumps([{"panel": int(number), "findings": "Steady, no anomalies."} for number in numbered])
+            return "The series is steady with a brief spike near the end of the window."
+        panels = re.search(r"Panels: (\[.*\])", content)
+        subject = re.search(r"alert subject '([^']*)'", content)
+        words = set((subject.group(1) if subject else "").lower().split())
+        if panels:
+            related = [{"id": panel["id"], "score": 0.9} for panel in json.loads(panels.group(1))
+                       if words & set(panel["title"].lower().split())]
+            return json.dumps(related)
+        title = re.search(r"panel titled '([^']*)'", content)
+        return "Yes" if title and words & set(title.group(1).lower().split()) else "No"
+
+def make_handler(stubs):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send(self, status, body, content_type="application/json"):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            match = re.match(r"^/api/dashboards/uid/bench-(\d+)(/versions)?$", url.path)
+            if match:
+                stubs.count("dashboard")
+                if match.group(2):
+                    return self.send(200, [{"version": 1}])
+                return self.send(200, make_dashboard(f"bench-{match.group(1)}", int(match.group(1))))
+            if url.path.startswith("/render/"):
+                stubs.count("render")
+                time.sleep(stubs.render_latency)
+                width = int(float(query.get("width", ["1000"])[0]) * float(query.get("scale", ["1"])[0]))
+                height = int(float(query.get("height", ["500"])[0]) * float(query.get("scale", ["1"])[0]))
+                return self.send(200, stubs.image(int(query.get("panelId", ["0"])[0]), width, height), "image/png")
+            self.send(404, {"message": "not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self.read_body()
+            if url.path.endswith("/chat/completions"):
+                stubs.count("llm")
+                time.sleep(stubs.llm_latency)
+                content = stubs.completion(json.loads(body))
+                return self.send(200, {
+                    "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()), "model": "bench",
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(body) + len(content)) // 4},
+                })
+            if url.path.startswith("/slack/"):
+                stubs.count("slack")
+                time.sleep(stubs.slack_latency)
+                method = url.path.rsplit("/", 1)[-1]
+                if method == "files.getUploadURLExternal":
+                    file_id = f"F{random.randrange(10 ** 9)}"
+                    base = f"http://{self.headers['Host']}"
+                    return self.send(200, {"ok": True, "file_id": file_id, "upload_url": f"{base}/slack/upload/{file_id}"})
+                if url.path.startswith("/slack/upload/"):
+                    return self.send(200, b"OK", "text/plain")
+                if method == "files.completeUploadExternal":
+                    form = {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+                    files = json.loads(form.get("files", "[]"))
+                    stubs.post(form, len(files))
+                    return self.send(200, {"ok": True, "files": [{"id": f["id"], "name": f.get("title"), "title": f.get("title")} for f in files]})
+                if method in ("chat.postMessage", "chat.update"):
+                    try:
+                        fields = json.loads(body)
+                    except ValueError:
+                        fields = {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+                    stubs.post(fields)
+                    return self.send(200, {"ok": True, "channel": "CBENCH", "ts": f"{time.time():.6f}"})
+                return self.send(200, {"ok": True})
+            self.send(404, {"message": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def run_alert(stubs, base_url, mode, size, subject, cache_dir, extra_env, thread_ts):
+    report_fd, report_path = tempfile.mkstemp(suffix=".json")
+    os.close(report_fd)
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "GRAFANA_API_KEY": "bench",
+        "SLACK_API_TOKEN": "xoxb-bench",
+        "SLACK_CHANNEL_ID": "CBENCH",
+        "SLACK_THREAD_TS": thread_ts,
+        "SLACK_API_BASE_URL": f"{base_url}/slack/api/",
+        "VISION_LLM_KEY": "bench",
+        "VISION_LLM_BASE_URL": f"{base_url}/v1",
+        "FRESHWORKS_CACHE_DIR": cache_dir,
+        "RUN_REPORT_PATH": report_path,
+    })
+    env.update(extra_env)
+    command = [sys.executable, "-m", "freshworks_tools", MODES[mode]]
+    if mode != "no_subject":
+        command.append(subject)
+    command += ["--dashboard-url", f"{base_url}/d/bench-{size}/bench?orgId=1"]
+
+    start = time.perf_counter()
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    with open(report_path) as f:
+        report = json.load(f) if os.path.getsize(report_path) else {"stages": {}}
+    os.remove(report_path)
+    thread = stubs.thread(thread_ts)
+    if result.returncode != 0:
+        print(f"  {mode} ({size} panels) exited with {result.returncode}: {result.stderr.strip().splitlines()[-1:] or ''}")
+    elif not thread["files"]:
+        print(f"  {mode} ({size} panels) posted no panels for '{subject}'")
+    elif thread["errors"]:
+        print(f"  {mode} ({size} panels) posted {thread['errors']} failed analyses")
+    return elapsed, report, result.returncode == 0 and thread["files"] > 0 and not thread["errors"]
+
+def p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", action="append", choices=sorted(MODES), help="default: every mode")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 500])
+    parser.add_argument("--runs", type=int, default=3, help="alerts per mode and size")
+    parser.add_argument("--parallel", type=int, default=1, help="alerts running at once")
+    parser.add_argument("--subject", default=DEFAULT_SUBJECT)
+    parser.add_argument("--render-latency", type=float, default=300, help="ms per render")
+    parser.add_argument("--llm-latency", type=float, default=500, help="ms per LLM call")
+    parser.add_argument("--slack-latency", type=float, default=50, help="ms per Slack call")
+    parser.add_argument("--warm", action="store_true", help="share one cache directory across runs")
+    parser.add_argument("--json", help="also write the results here")
+    parser.add_argument("env", nargs="*", help="extra NAME=VALUE settings for every alert")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    stubs = Stubs(args.render_latency / 1000, args.llm_latency / 1000, args.slack_latency / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(stubs))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    shared_cache = tempfile.mkdtemp(prefix="harness-cache-")
+
+    results = []
+    threads = iter(range(1, 10 ** 6))
+    threads_lock = threading.Lock()
+    try:
+        for mode in args.mode or list(MODES):
+            for size in args.sizes:
+                def one(_):
+                    cache_dir = shared_cache if args.warm else tempfile.mkdtemp(prefix="harness-cache-")
+                    with threads_lock:
+                        thread_ts = f"1700000000.{next(threads):06d}"
+                    try:
+                        return run_alert(stubs, base_url, mode, size, args.subject, cache_dir, extra_env, thread_ts)
+                    finally:
+                        if not args.warm:
+                            shutil.rmtree(cache_dir, ignore_errors=True)
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+                    runs = list(executor.map(one, range(args.runs)))
+                wall = time.perf_counter() - start
+
+                latencies = [elapsed for elapsed, _, _ in runs]
+                stages = {}
+                for _, report, _ in runs:
+                    for name, stage in report.get("stages", {}).items():
+                        if "p95_s" in stage:
+                            stages.setdefault(name, []).append(stage["p95_s"])
+                result = {
+                    "mode": mode,
+                    "panels": size,
+                    "runs": args.runs,
+                    "failed": sum(1 for _, _, ok in runs if not ok),
+                    "stage_errors": sum(stage.get("errors", 0) for _, report, _ in runs for stage in report.get("stages", {}).values()),
+                    "median_s": round(statistics.median(latencies), 3),
+                    "p95_s": round(p95(latencies), 3),
+                    "alerts_per_minute": round(60 * args.runs / wall, 2),
+                    "stage_p95_s": {name: round(statistics.median(values), 3) for name, values in sorted(stages.items())},
+                }
+                results.append(result)
+                stage_text = " ".join(f"{name}={value:.3f}" for name, value in result["stage_p95_s"].items())
+                print(f"{mode:<13} {size:>4} panels  e2e median {result['median_s']:7.2f}s p95 {result['p95_s']:7.2f}s  "
+                      f"{result['alerts_per_minute']:6.2f} alerts/min  failed {result['failed']} errors {result['stage_errors']}  stage p95: {stage_text}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(shared_cache, ignore_errors=True)
+
+    print(f"Stub requests: {json.dumps(stubs.counts)}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
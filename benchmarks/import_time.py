@@ -0,0 +1,76 @@
+"""Startup regression check for the freshworks_tools entry points.
+
+Imports the CLI and every mode module under ``python -X importtime`` in a fresh
+interpreter and fails (exit status 1) if any heavy dependency is imported at
+module load or if the cumulative import time exceeds the budget.
+
+    python benchmarks/import_time.py --budget-ms 150
+
+The same check runs under pytest as tests/test_import_time.py.
+"""
+import sys
+import argparse
+import subprocess
+
+MODULES = [
+    "freshworks_tools.cli",
+    "freshworks_tools.tools.no_subject",
+    "freshworks_tools.tools.grafana",
+    "freshworks_tools.tools.filter_alert",
+    "freshworks_tools.tools.multi_dashboard",
+]
+HEAVY_MODULES = ["litellm", "slack_sdk", "PIL", "requests", "numpy"]
+DEFAULT_BUDGET_MS = 150
+
+def measure_imports(modules):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{result.stderr}")
+
+    # Lines look like "import time:       123 |        456 |   package.module",
+    # with the module name indented two spaces per nesting level
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line.split("|")
+        name = raw_name.strip()
+        level = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        imports[name] = (int(cumulative_us), level)
+    return imports
+
+def check_startup(modules=MODULES, budget_ms=DEFAULT_BUDGET_MS):
+    # Returns (total_ms, imports, failures) for one fresh interpreter importing modules
+    imports = measure_imports(modules)
+    failures = []
+
+    heavy = sorted(name for name in imports if name.split(".")[0] in HEAVY_MODULES)
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+
+    # Top-level freshworks_tools entries include everything they pull in
+    total_ms = sum(cumulative_us for name, (cumulative_us, level) in imports.items()
+                   if level == 0 and name.startswith("freshworks_tools")) / 1000
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget of {budget_ms:.0f} ms")
+    return total_ms, imports, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    total_ms, imports, failures = check_startup(MODULES, args.budget_ms)
+    print(f"Startup import time: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name in MODULES:
+        print(f"  {name}: {imports.get(name, (0, 0))[0] / 1000:.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Measure time-to-first-Grafana-request for the analyze_grafana_panel tool.
+
+A local HTTP server stands in for Grafana. Each run launches the tool command
+with GRAFANA_DASHBOARD_URL pointing at it and records how long it takes until
+the first request arrives; the process is then stopped.
+
+    python benchmarks/startup.py --preset local
+    python benchmarks/startup.py --preset baseline --preset prebuilt --runs 3
+    python benchmarks/startup.py -- python -m freshworks_tools.tools.filter_alert bench
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENV_NAMES = [
+    "GRAFANA_DASHBOARD_URL",
+    "GRAFANA_API_KEY",
+    "SLACK_API_TOKEN",
+    "SLACK_CHANNEL_ID",
+    "SLACK_THREAD_TS",
+    "VISION_LLM_KEY",
+    "VISION_LLM_BASE_URL",
+    "FRESHWORKS_CACHE_DIR",
+]
+DOCKER_ENV = [arg for name in ENV_NAMES for arg in ("-e", name)]
+
+PRESETS = {
+    # What tool_def.py used to run: install dependencies and fetch the script on every invocation
+    "baseline": ["docker", "run", "--rm", "--network", "host"] + DOCKER_ENV + [
+        "python:3.12", "sh", "-c",
+        "pip install slack_sdk requests==2.32.3 litellm==1.49.5 pillow==11.0.0 > /dev/null 2>&1 && "
+        "curl -s -o /tmp/grafana.py https://analyze-panel-grafana.s3.eu-west-1.amazonaws.com/filter_alert.py && "
+        "python /tmp/grafana.py bench",
+    ],
+    "prebuilt": ["docker", "run", "--rm", "--network", "host"] + DOCKER_ENV + [
+        os.environ.get("FRESHWORKS_TOOLS_IMAGE", "freshworks-tools:latest"),
+        "python", "-m", "freshworks_tools.tools.filter_alert", "bench",
+    ],
+    "local": [sys.executable, "-m", "freshworks_tools.tools.filter_alert", "bench"],
+}
+
+class FirstRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.first_request.set()
+        # A non-retryable error ends the run as soon as possible
+        self.send_response(404)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def measure(command, port, timeout):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FirstRequestHandler)
+    server.first_request = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cache_dir = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env.update({
+        "GRAFANA_DASHBOARD_URL": f"http://127.0.0.1:{server.server_port}/d/bench/bench?orgId=1",
+        "GRAFANA_API_KEY": "bench",
+        "SLACK_API_TOKEN": "bench",
+        "SLACK_CHANNEL_ID": "bench",
+        "SLACK_THREAD_TS": "0",
+        "VISION_LLM_KEY": "bench",
+        "VISION_LLM_BASE_URL": "http://127.0.0.1:1",
+        "FRESHWORKS_CACHE_DIR": cache_dir,
+    })
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not server.first_request.wait(timeout):
+            return None
+        return time.perf_counter() - start
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS), default=[])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("command", nargs="*", help="custom command to measure")
+    args = parser.parse_args()
+
+    commands = [(name, PRESETS[name]) for name in args.preset]
+    if args.command:
+        commands.append(("custom", args.command))
+    if not commands:
+        commands = [("local", PRESETS["local"])]
+
+    for name, command in commands:
+        timings = []
+        for _ in range(args.runs):
+            elapsed = measure(command, args.port, args.timeout)
+            if elapsed is None:
+                print(f"{name}: no Grafana request within {args.timeout:.0f}s")
+                break
+            timings.append(elapsed)
+        if timings:
+            print(f"{name}: time to first Grafana request "
+                  f"min={min(timings):.2f}s median={statistics.median(timings):.2f}s max={max(timings):.2f}s "
+                  f"({len(timings)} runs)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare vision payload bytes and estimated tokens per panel, before and after render profiles.
+
+Synthetic Grafana-style renders are drawn locally for a few panel types. The
+"before" payload is what the scripts used to send: every panel rendered at
+1000x500 and squashed to an 800x800 PNG. The "after" payload is rendered at the
+panel type's profile size and encoded by encode_for_vision.
+
+    python benchmarks/vision_payload.py
+    VISION_IMAGE_FORMAT=webp VISION_IMAGE_QUALITY=70 python benchmarks/vision_payload.py
+"""
+import io
+import os
+import sys
+import math
+import base64
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from freshworks_tools.tools.render_profiles import get_render_profile
+from freshworks_tools.tools.vision_image import encode_for_vision, estimate_vision_tokens
+
+PANEL_TYPES = ["timeseries", "stat", "gauge", "bargauge", "table", "heatmap"]
+
+def fake_render(panel_type, width, height, scale=1):
+    # Dark Grafana theme, a grid, a title and a noisy series with a spike
+    from PIL import Image, ImageDraw
+
+    width, height = int(width * scale), int(height * scale)
+    image = Image.new("RGBA", (width, height), (24, 27, 31, 255))
+    draw = ImageDraw.Draw(image)
+    draw.text((10, 8), f"{panel_type} panel", fill=(204, 204, 220, 255))
+    for x in range(0, width, width // 10):
+        draw.line([(x, 30), (x, height)], fill=(44, 50, 53, 255))
+    for y in range(30, height, height // 6):
+        draw.line([(0, y), (width, y)], fill=(44, 50, 53, 255))
+    points = []
+    for x in range(0, width, 4):
+        spike = 0.4 if width * 0.7 < x < width * 0.75 else 0
+        value = 0.5 + 0.15 * math.sin(x / 23) + 0.05 * math.sin(x / 3.7) + spike
+        points.append((x, height - int(value * (height - 40) * 0.8) - 10))
+    draw.line(points, fill=(115, 191, 105, 255), width=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def legacy_payload(image_data):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data)).resize((800, 800))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return len(base64.b64encode(buffer.getbuffer())), estimate_vision_tokens(800, 800)
+
+def main():
+    print(f"{'panel type':<12} {'render':>11} {'before':>10} {'tok':>5} {'after':>10} {'tok':>5} {'size':>10}")
+    totals = [0, 0, 0, 0]
+    for panel_type in PANEL_TYPES:
+        before_bytes, before_tokens = legacy_payload(fake_render(panel_type, 1000, 500))
+        width, height, scale = get_render_profile(panel_type)
+        image_url, size = encode_for_vision(fake_render(panel_type, width, height, scale))
+        after_bytes = len(image_url.split(",", 1)[1])
+        after_tokens = estimate_vision_tokens(*size)
+        for index, value in enumerate((before_bytes, before_tokens, after_bytes, after_tokens)):
+            totals[index] += value
+        print(f"{panel_type:<12} {width:>5}x{height:<5} {before_bytes:>10} {before_tokens:>5} {after_bytes:>10} {after_tokens:>5} {size[0]:>5}x{size[1]:<4}")
+
+    count = len(PANEL_TYPES)
+    print(f"Mean per panel: {totals[0] // count} -> {totals[2] // count} base64 bytes, "
+          f"{totals[1] // count} -> {totals[3] // count} estimated tokens")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from freshworks_tools.cli import main
+
+main()
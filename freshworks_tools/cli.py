@@ -0,0 +1,86 @@
+import os
+import sys
+import argparse
+import importlib
+from freshworks_tools.tools import tracing
+
+# Each mode's module is imported only once its subcommand is chosen, and the
+# modules themselves import litellm, slack_sdk, PIL and requests on first use,
+# so usage errors and bad arguments exit without paying for those imports.
+MODES = {
+    "dashboard": "freshworks_tools.tools.no_subject",
+    "filter": "freshworks_tools.tools.grafana",
+    "llm-filter": "freshworks_tools.tools.filter_alert",
+    "multi": "freshworks_tools.tools.multi_dashboard",
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="freshworks-tools", description="Analyze Grafana dashboards for an alert and post the results to Slack")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    dashboard = subparsers.add_parser("dashboard", help="render and analyze the whole dashboard")
+    dashboard.add_argument("--dashboard-url", help="defaults to $GRAFANA_DASHBOARD_URL")
+
+    substring = subparsers.add_parser("filter", help="analyze panels whose title contains the alert subject")
+    substring.add_argument("alert_subject", nargs="?", help="defaults to $ALERT_SUBJECT")
+    substring.add_argument("--dashboard-url", help="defaults to $GRAFANA_DASHBOARD_URL")
+
+    llm_filter = subparsers.add_parser("llm-filter", help="analyze panels an LLM classifies as related to the alert subject")
+    llm_filter.add_argument("alert_subject")
+    llm_filter.add_argument("--dashboard-url", help="defaults to $GRAFANA_DASHBOARD_URL")
+
+    multi = subparsers.add_parser("multi", help="rank panels across several dashboards and analyze the top N")
+    multi.add_argument("alert_subject")
+    multi.add_argument("--dashboard-url", action="append", help="repeatable; defaults to $GRAFANA_DASHBOARD_URLS")
+    multi.add_argument("--folder", help="also include dashboards in this folder UID")
+    multi.add_argument("--tag", help="also include dashboards with this tag")
+
+    worker = subparsers.add_parser("worker", help="process queued alert jobs in a long-running process")
+    worker.add_argument("--once", action="store_true", help="exit once the queue is empty")
+
+    enqueue = subparsers.add_parser("enqueue", help="queue an alert job for a running worker")
+    enqueue.add_argument("job_mode", choices=sorted(MODES))
+    enqueue.add_argument("alert_subject", nargs="?")
+    enqueue.add_argument("--dashboard-url", help="defaults to $GRAFANA_DASHBOARD_URL")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.mode in ("worker", "enqueue"):
+        from freshworks_tools import worker
+        if args.mode == "worker":
+            worker.main(args.once)
+        else:
+            print(f"Queued {worker.enqueue_job(args.job_mode, args.alert_subject, args.dashboard_url)}")
+        return
+
+    # Per-stage timings for this run, reported when TRACE=on or RUN_REPORT_PATH/RUN_METRICS_PATH is set
+    tracing.start_run(args.mode)
+    try:
+        run_mode(args)
+    finally:
+        tracing.finish_run()
+
+def run_mode(args):
+    if args.mode == "multi":
+        # Dashboards come from the arguments, $GRAFANA_DASHBOARD_URLS or a folder/tag search
+        importlib.import_module(MODES[args.mode]).main(args.alert_subject, args.dashboard_url, args.folder, args.tag)
+        return
+
+    if args.dashboard_url:
+        os.environ["GRAFANA_DASHBOARD_URL"] = args.dashboard_url
+    if not os.environ.get("GRAFANA_DASHBOARD_URL"):
+        print("GRAFANA_DASHBOARD_URL is not set and --dashboard-url was not given")
+        sys.exit(1)
+
+    module = importlib.import_module(MODES[args.mode])
+    if args.mode == "llm-filter":
+        module.main(args.alert_subject)
+    else:
+        if getattr(args, "alert_subject", None) is not None:
+            os.environ["ALERT_SUBJECT"] = args.alert_subject
+        module.main()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import time
+import threading
+from freshworks_tools.tools.vision_image import estimate_image_tokens
+
+class BudgetExhausted(Exception):
+    pass
+
+class RunBudget:
+    # Bounds one alert run: a wall-clock deadline and caps on vision calls and
+    # estimated vision tokens, each off when unset or 0. Pipelines check it before
+    # starting a stage and record the panels they skip; only vision calls that
+    # miss the analysis cache are charged.
+    def __init__(self, time_budget=None, max_calls=None, max_tokens=None):
+        self.deadline = time.monotonic() + float(time_budget) if time_budget else None
+        self.max_calls = int(max_calls or 0)
+        self.max_tokens = int(max_tokens or 0)
+        self.calls = 0
+        self.tokens = 0
+        self.reason = None
+        self.skipped = []
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        return max(0, self.deadline - time.monotonic()) if self.deadline is not None else None
+
+    def exhausted(self):
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.reason = "time budget exhausted"
+        return self.reason is not None
+
+    def charge(self, image_data, max_side=None):
+        tokens = estimate_image_tokens(image_data, max_side) if self.max_tokens else 0
+        with self.lock:
+            if self.exhausted():
+                raise BudgetExhausted(self.reason)
+            if self.max_calls and self.calls >= self.max_calls:
+                self.reason = f"vision call budget of {self.max_calls} exhausted"
+            elif self.max_tokens and self.tokens + tokens > self.max_tokens:
+                self.reason = f"vision token budget of {self.max_tokens} exhausted"
+            else:
+                self.calls += 1
+                self.tokens += tokens
+                return
+        raise BudgetExhausted(self.reason)
+
+    def skip(self, panel):
+        with self.lock:
+            self.skipped.append(panel)
+
+    def stats(self):
+        return {"vision_calls": self.calls, "vision_tokens": self.tokens, "skipped": len(self.skipped), "reason": self.reason}
+
+def get_run_budget(default_time_budget=None):
+    # ALERT_TIME_BUDGET seconds for the whole run, ALERT_MAX_VISION_CALLS and
+    # ALERT_MAX_VISION_TOKENS (estimated prompt tokens for the images)
+    return RunBudget(
+        os.environ.get("ALERT_TIME_BUDGET", default_time_budget),
+        os.environ.get("ALERT_MAX_VISION_CALLS"),
+        os.environ.get("ALERT_MAX_VISION_TOKENS"),
+    )
+
+def post_skipped_summary(token, channel_id, thread_ts, budget, titles, total):
+    # One thread message listing the panels left out, so a truncated run is visible in Slack
+    from freshworks_tools.tools.slack_client import get_slack_client
+
+    if not titles:
+        return None
+    text = (f"Analysis stopped early ({budget.reason or 'budget exhausted'}): "
+            f"skipped {len(titles)} of {total} related panels:\n" + "\n".join(f"- {title}" for title in titles))
+    print(text)
+    try:
+        return get_slack_client(token).chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=text)
+    except Exception as e:
+        print(f"Failed to post skipped panel summary: {e}")
+        return None
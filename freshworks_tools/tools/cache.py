@@ -0,0 +1,57 @@
+import os
+import json
+import hashlib
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "freshworks_tools")
+
+def get_cache_dir(name):
+    cache_dir = os.path.join(os.environ.get("FRESHWORKS_CACHE_DIR", DEFAULT_CACHE_DIR), name)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def cache_key(*parts):
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+def read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_json(path, data):
+    # Write to a temp file and rename so concurrent runs never read a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def evict_oldest(cache_dir, max_entries, suffix):
+    # Entries are touched on every hit, so mtime order is least-recently-used order
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - max_entries)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,116 @@
+import io
+import os
+import json
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.budget import BudgetExhausted
+from freshworks_tools.tools.vision_image import encode_for_vision, MAX_SIDE
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PANELS_PER_GRID = 6
+DEFAULT_COLUMNS = 2
+TILE_WIDTH = 800
+TILE_HEIGHT = 400
+LABEL_HEIGHT = 32
+
+def get_panels_per_grid():
+    return max(1, int(os.environ.get("VISION_COMPOSITE_PANELS", DEFAULT_PANELS_PER_GRID)))
+
+def build_composite(titles, images, columns=DEFAULT_COLUMNS):
+    from PIL import Image, ImageDraw, ImageFont
+
+    columns = min(columns, len(images))
+    rows = (len(images) + columns - 1) // columns
+    cell_height = TILE_HEIGHT + LABEL_HEIGHT
+    grid = Image.new("RGB", (columns * TILE_WIDTH, rows * cell_height), "white")
+    draw = ImageDraw.Draw(grid)
+    font = ImageFont.load_default(size=20)
+
+    for index, (title, image_data) in enumerate(zip(titles, images)):
+        left = (index % columns) * TILE_WIDTH
+        top = (index // columns) * cell_height
+        # Number each tile so the model can refer to panels unambiguously
+        draw.text((left + 8, top + 6), f"{index + 1}. {title}", fill="black", font=font)
+
+        tile = Image.open(io.BytesIO(image_data)).convert("RGB")
+        tile.thumbnail((TILE_WIDTH, TILE_HEIGHT))
+        grid.paste(tile, (left + (TILE_WIDTH - tile.width) // 2, top + LABEL_HEIGHT + (TILE_HEIGHT - tile.height) // 2))
+
+    buffer = io.BytesIO()
+    grid.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def parse_findings(content, count):
+    start = content.find("[")
+    end = content.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("No JSON array found in LLM response")
+    findings = {}
+    for item in json.loads(content[start:end + 1]):
+        panel = int(item["panel"])
+        if not 1 <= panel <= count:
+            raise ValueError(f"Unexpected panel number in LLM response: {panel}")
+        findings[panel] = str(item["findings"])
+    if len(findings) != count:
+        raise ValueError(f"Expected findings for {count} panels, got {len(findings)}")
+    return [findings[panel] for panel in range(1, count + 1)]
+
+@tracing.traced("vision_composite")
+def analyze_composite(titles, images, budget=None):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+
+    grid = build_composite(titles, images)
+    if budget:
+        # One vision call, charged for the whole grid
+        budget.charge(grid, MAX_SIDE)
+    # Grids keep their full size so tile labels stay legible, but are sent as JPEG/WebP
+    image_url, _ = encode_for_vision(grid, max_side=MAX_SIDE)
+    tracing.count("vision_composite", bytes=len(image_url))
+    panel_list = "\n".join(f"{index + 1}. {title}" for index, title in enumerate(titles))
+    prompt = ("This image is a grid of Grafana panels, each labelled with a number and title:\n"
+              f"{panel_list}\n"
+              "For each panel, identify any abnormalities or significant spikes in the data and give a brief summary of your observations. "
+              "Respond with only a JSON array of objects {\"panel\": <number>, \"findings\": <summary>}, one per panel.")
+
+    response = get_llm_gateway().complete("composite", [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_url}},
+            ],
+        }
+    ], budget=budget)
+    return parse_findings(response.choices[0].message.content, len(titles))
+
+def analyze_in_composites(titles, images, analyze_single, panels_per_grid=None, max_workers=4, budget=None):
+    # One vision call per grid of panels, grids analyzed concurrently; a grid whose
+    # response can't be parsed falls back to analyze_single(image_data) per panel.
+    # Panels left unanalyzed because the budget ran out get None.
+    panels_per_grid = panels_per_grid or get_panels_per_grid()
+
+    def analyze_or_skip(image_data):
+        if budget and budget.exhausted():
+            return None
+        try:
+            return analyze_single(image_data)
+        except BudgetExhausted:
+            return None
+
+    def analyze_grid(start):
+        grid_titles = titles[start:start + panels_per_grid]
+        grid_images = images[start:start + panels_per_grid]
+        if budget and budget.exhausted():
+            return [None] * len(grid_images)
+        try:
+            return analyze_composite(grid_titles, grid_images, budget)
+        except BudgetExhausted:
+            return [None] * len(grid_images)
+        except Exception as e:
+            print(f"Composite analysis failed for {len(grid_images)} panels, analyzing them individually: {e}")
+            return [analyze_or_skip(image_data) for image_data in grid_images]
+
+    analyses = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for grid_analyses in executor.map(analyze_grid, range(0, len(images), panels_per_grid)):
+            analyses.extend(grid_analyses)
+    return analyses
@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from freshworks_tools.tools import cache, tracing
+from freshworks_tools.tools.grafana_client import get_grafana_client
+from freshworks_tools.tools.dashboard_model import flatten_panels, DashboardIndex
+from freshworks_tools.tools.singleflight import coalesce
+
+# Bump when parse_panels changes so stale entries are not reused
+CACHE_FORMAT = 3
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 256
+# Built indexes kept in memory, one per dashboard, for the worker and other long-lived processes
+MAX_INDEXES = 32
+
+def parse_panels(dashboard_data, fetch_library_panel=None):
+    # Every panel in the tree, including collapsed rows and resolved library panels
+    return flatten_panels(dashboard_data, fetch_library_panel)
+
+def library_panel_fetcher(client, api_url, headers):
+    base_url = api_url.split("/api/dashboards/", 1)[0]
+
+    def fetch_library_panel(uid):
+        response = client.get(f"{base_url}/api/library-elements/{uid}", headers=headers)
+        if response.status_code != 200:
+            raise Exception(f"Status code: {response.status_code}")
+        return response.json().get("result", {}).get("model")
+
+    return fetch_library_panel
+
+def get_latest_version(client, api_url, headers):
+    # Cheap revalidation: only the newest entry of the version history
+    response = client.get(f"{api_url}/versions", headers=headers, params={"limit": 1})
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    versions = data.get("versions", []) if isinstance(data, dict) else data
+    if not versions:
+        return None
+    return versions[0].get("version")
+
+def fetch_dashboard(client, api_url, headers, etag=None):
+    if etag:
+        headers = dict(headers, **{"If-None-Match": etag})
+    response = client.get(api_url, headers=headers)
+    if response.status_code == 304:
+        return None, etag
+    if response.status_code == 200:
+        return response.json(), response.headers.get("ETag")
+    print(f"Failed to fetch dashboard data. Status code: {response.status_code}")
+    raise Exception("Failed to fetch dashboard data")
+
+def get_dashboard_panels(api_url, org_id, api_key):
+    return get_dashboard_entry(api_url, org_id, api_key)["panels"]
+
+@tracing.traced("dashboard")
+def get_dashboard_entry(api_url, org_id, api_key):
+    # During an alert storm one process fetches the dashboard; the others wait and
+    # then find it fresh in the cache
+    with coalesce("dashboard", api_url, org_id):
+        return load_dashboard_entry(api_url, org_id, api_key)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_dashboard_index(api_url, org_id, api_key):
+    # The DashboardIndex is built once per dashboard version and reused until the
+    # cached entry moves to a newer one
+    entry = get_dashboard_entry(api_url, org_id, api_key)
+    key = (api_url, str(org_id))
+    with _indexes_lock:
+        version, index = _indexes.pop(key, (None, None))
+        if index is None or version is None or version != entry["version"]:
+            index = DashboardIndex(entry["panels"])
+        # Least recently used first
+        while len(_indexes) >= MAX_INDEXES:
+            _indexes.pop(next(iter(_indexes)))
+        _indexes[key] = (entry["version"], index)
+        return index
+
+def load_dashboard_entry(api_url, org_id, api_key):
+    ttl = float(os.environ.get("DASHBOARD_CACHE_TTL", DEFAULT_TTL))
+    max_entries = int(os.environ.get("DASHBOARD_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    client = get_grafana_client(api_key)
+    headers = {"X-Grafana-Org-Id": str(org_id)}
+
+    cache_dir = cache.get_cache_dir("dashboards")
+    path = os.path.join(cache_dir, cache.cache_key(api_url, org_id) + ".json")
+    entry = cache.read_json(path)
+    if entry and entry.get("format") != CACHE_FORMAT:
+        entry = None
+
+    if entry:
+        if time.time() - entry["fetched_at"] < ttl:
+            cache.touch(path)
+            tracing.count("dashboard", cache_hits=1)
+            print(f"Using cached dashboard panels (version {entry['version']})")
+            return entry
+
+        try:
+            latest_version = get_latest_version(client, api_url, headers)
+        except Exception as e:
+            print(f"Failed to check dashboard version: {e}")
+            latest_version = None
+        if latest_version is not None and latest_version == entry["version"]:
+            entry["fetched_at"] = time.time()
+            cache.write_json(path, entry)
+            tracing.count("dashboard", cache_hits=1)
+            print(f"Dashboard unchanged (version {entry['version']}), using cached panels")
+            return entry
+
+    dashboard_data, etag = fetch_dashboard(client, api_url, headers, entry.get("etag") if entry else None)
+    if dashboard_data is None:
+        entry["fetched_at"] = time.time()
+        cache.write_json(path, entry)
+        tracing.count("dashboard", cache_hits=1)
+        print("Dashboard not modified, using cached panels")
+        return entry
+
+    tracing.count("dashboard", cache_misses=1)
+    entry = {
+        "format": CACHE_FORMAT,
+        "api_url": api_url,
+        "org_id": str(org_id),
+        "version": dashboard_data.get('dashboard', {}).get('version'),
+        "etag": etag,
+        "fetched_at": time.time(),
+        "panels": parse_panels(dashboard_data, library_panel_fetcher(client, api_url, headers)),
+    }
+    cache.write_json(path, entry)
+    cache.evict_oldest(cache_dir, max_entries, ".json")
+    return entry
+
+def get_dashboard_version(api_url, org_id, api_key):
+    # The cached entry's version while it is fresh, otherwise the latest from Grafana
+    ttl = float(os.environ.get("DASHBOARD_CACHE_TTL", DEFAULT_TTL))
+    entry = cache.read_json(os.path.join(cache.get_cache_dir("dashboards"), cache.cache_key(api_url, org_id) + ".json"))
+    if entry and entry.get("format") == CACHE_FORMAT and time.time() - entry["fetched_at"] < ttl:
+        return entry["version"]
+    try:
+        return get_latest_version(get_grafana_client(api_key), api_url, {"X-Grafana-Org-Id": str(org_id)})
+    except Exception as e:
+        print(f"Failed to check dashboard version: {e}")
+        return None
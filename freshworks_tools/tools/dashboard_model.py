@@ -0,0 +1,148 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+TOKEN = re.compile(r"[a-z0-9]+")
+# Title substrings up to this length are indexed, so subject lookups never scan every title
+GRAM_SIZE = 3
+# Metric-like identifiers in PromQL and similar query languages
+METRIC_NAME = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*")
+QUERY_KEYWORDS = {
+    "by", "without", "on", "ignoring", "group_left", "group_right", "offset", "bool", "and", "or", "unless",
+    "sum", "min", "max", "avg", "count", "stddev", "stdvar", "topk", "bottomk", "quantile", "count_values",
+    "rate", "irate", "increase", "delta", "idelta", "deriv", "histogram_quantile", "abs", "ceil", "floor",
+    "round", "clamp_min", "clamp_max", "label_replace", "label_join", "vector", "scalar", "time", "absent",
+    "avg_over_time", "min_over_time", "max_over_time", "sum_over_time", "count_over_time", "le", "job", "instance",
+}
+
+def tokenize(text):
+    return TOKEN.findall((text or "").lower())
+
+def grams(text):
+    return {text[start:start + size] for size in range(1, GRAM_SIZE + 1) for start in range(len(text) - size + 1)}
+
+def extract_metric_names(targets):
+    names = set()
+    for target in targets:
+        for key in ("expr", "query", "rawSql", "metric"):
+            value = target.get(key)
+            if isinstance(value, str):
+                # Drop label matchers and range selectors so label names and values aren't indexed
+                value = re.sub(r"\{[^}]*\}|\[[^\]]*\]|\"[^\"]*\"|'[^']*'", " ", value)
+                names.update(name for name in METRIC_NAME.findall(value)
+                             if name.lower() not in QUERY_KEYWORDS and not name.startswith("__") and not name.isdigit())
+    return sorted(names)
+
+def walk_panels(panels, row=None):
+    # Collapsed rows carry their children in row['panels']; expanded rows are
+    # followed by their children at the top level
+    for panel in panels:
+        if panel.get('type') == 'row':
+            row = panel.get('title') or None
+            yield from walk_panels(panel.get('panels', []), row)
+        else:
+            yield panel, row
+
+def resolve_library_panels(panels, fetch_library_panel, max_workers=4):
+    uids = sorted({panel['libraryPanel']['uid'] for panel, _ in panels if panel.get('libraryPanel', {}).get('uid')})
+    if not uids:
+        return panels
+
+    def fetch(uid):
+        try:
+            return fetch_library_panel(uid)
+        except Exception as e:
+            print(f"Failed to fetch library panel {uid}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        models = dict(zip(uids, executor.map(fetch, uids)))
+
+    resolved = []
+    for panel, row in panels:
+        model = models.get(panel.get('libraryPanel', {}).get('uid'))
+        if model:
+            # The dashboard's copy keeps its own id and placement
+            panel = dict(model, **{key: panel[key] for key in ('id', 'gridPos', 'libraryPanel') if key in panel})
+        resolved.append((panel, row))
+    return resolved
+
+def flatten_panels(dashboard_data, fetch_library_panel=None):
+    panels = list(walk_panels(dashboard_data.get('dashboard', {}).get('panels', [])))
+    if fetch_library_panel:
+        panels = resolve_library_panels(panels, fetch_library_panel)
+
+    return [{
+        'id': panel['id'],
+        'title': panel.get('title') or f"Untitled {panel.get('type') or 'panel'} {panel['id']}",
+        'type': panel.get('type'),
+        'description': panel.get('description', ''),
+        'row': row,
+        'datasource': panel.get('datasource'),
+        'targets': panel.get('targets', []),
+    } for panel, row in panels if 'id' in panel]
+
+class DashboardIndex:
+    def __init__(self, panels):
+        self.panels = panels
+        self.by_id = {}
+        self.by_title = {}
+        self.by_token = {}
+        self.by_datasource = {}
+        self.by_metric = {}
+        self.by_gram = {}
+        self.lower_titles = {}
+        self.position = {}
+
+        for position, panel in enumerate(panels):
+            panel_id = panel['id']
+            self.by_id[panel_id] = panel
+            self.position[panel_id] = position
+            self.lower_titles[panel_id] = panel['title'].lower()
+            for gram in grams(self.lower_titles[panel_id]):
+                self.by_gram.setdefault(gram, set()).add(panel_id)
+            self.by_title.setdefault(' '.join(tokenize(panel['title'])), []).append(panel_id)
+            for token in set(tokenize(panel['title'])):
+                self.by_token.setdefault(token, set()).add(panel_id)
+            for datasource in self.datasources(panel):
+                self.by_datasource.setdefault(datasource, set()).add(panel_id)
+            for metric in extract_metric_names(panel.get('targets', [])):
+                self.by_metric.setdefault(metric.lower(), set()).add(panel_id)
+
+    @staticmethod
+    def datasources(panel):
+        refs = [panel.get('datasource')] + [target.get('datasource') for target in panel.get('targets', [])]
+        names = set()
+        for ref in refs:
+            if isinstance(ref, dict):
+                names.update(str(value).lower() for key, value in ref.items() if key in ('uid', 'type') and value)
+            elif isinstance(ref, str) and ref:
+                names.add(ref.lower())
+        return names
+
+    def get(self, panel_id):
+        return self.by_id.get(panel_id)
+
+    def ordered(self, panel_ids):
+        # Dashboard order
+        return [self.by_id[panel_id] for panel_id in sorted((panel_id for panel_id in panel_ids if panel_id in self.by_id),
+                                                            key=self.position.get)]
+
+    def titles_containing(self, text):
+        text = text.lower()
+        if not text:
+            return list(self.panels)
+        if len(text) <= GRAM_SIZE:
+            return self.ordered(self.by_gram.get(text, ()))
+        # Titles holding every trigram of text, checked for the whole substring
+        candidates = set.intersection(*(self.by_gram.get(text[start:start + GRAM_SIZE], set())
+                                        for start in range(len(text) - GRAM_SIZE + 1)))
+        return self.ordered({panel_id for panel_id in candidates if text in self.lower_titles[panel_id]})
+
+    def find(self, term):
+        term = term.lower()
+        panel_ids = set(self.by_metric.get(term, set())) | self.by_datasource.get(term, set())
+        tokens = tokenize(term)
+        if tokens:
+            panel_ids |= set.intersection(*(self.by_token.get(token, set()) for token in tokens))
+        return self.ordered(panel_ids)
+
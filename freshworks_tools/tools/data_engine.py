@@ -0,0 +1,149 @@
+import os
+import re
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from freshworks_tools.tools import tracing
+
+MIXED_DATASOURCE = "-- Mixed --"
+DEFAULT_TIME_FROM = "now-1h"
+DEFAULT_TIME_TO = "now"
+DEFAULT_MAX_DATA_POINTS = 500
+# Fraction of each series treated as "recent" and compared against the rest
+RECENT_FRACTION = 0.2
+MIN_POINTS = 10
+# Minimum z and MAD scores; with many recent points the thresholds rise so that
+# noise alone flags a series with at most FALSE_ALARM_RATE probability
+Z_THRESHOLD = 3.0
+MAD_THRESHOLD = 3.5
+FALSE_ALARM_RATE = 0.001
+CHANGE_POINT_THRESHOLD = 5.0
+# Dashboard variables ($var, ${var}); global macros like $__rate_interval are expanded server-side
+TEMPLATE_VARIABLE = re.compile(r"\$\{?(?!__)\w")
+
+def get_grafana_base_url(grafana_dashboard_url):
+    parsed_url = urlparse(grafana_dashboard_url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+def datasource_ref(datasource):
+    # Panels saved by older Grafana versions reference datasources by name
+    if isinstance(datasource, dict):
+        return datasource if datasource.get("uid") else None
+    if isinstance(datasource, str) and datasource:
+        return {"uid": datasource}
+    return None
+
+def build_queries(panel):
+    panel_datasource = datasource_ref(panel.get('datasource'))
+    queries = []
+    for target in panel.get('targets', []):
+        if target.get('hide'):
+            continue
+        datasource = datasource_ref(target.get('datasource')) or panel_datasource
+        if datasource is None or datasource.get("uid") == MIXED_DATASOURCE:
+            return None
+        query = dict(target, datasource=datasource, refId=target.get('refId', f"Q{len(queries)}"))
+        query.setdefault("maxDataPoints", DEFAULT_MAX_DATA_POINTS)
+        # Dashboard template variables are not interpolated by /api/ds/query
+        if TEMPLATE_VARIABLE.search(str(datasource.get("uid"))) or any(TEMPLATE_VARIABLE.search(value) for value in query.values() if isinstance(value, str)):
+            return None
+        queries.append(query)
+    return queries or None
+
+@tracing.traced("data_query")
+def query_panel_series(client, grafana_base_url, org_id, panel, time_from=DEFAULT_TIME_FROM, time_to=DEFAULT_TIME_TO, budget=None):
+    queries = build_queries(panel)
+    if queries is None:
+        return None
+    response = client.post(
+        f"{grafana_base_url}/api/ds/query",
+        headers={"X-Grafana-Org-Id": str(org_id)},
+        json={"queries": queries, "from": time_from, "to": time_to},
+        budget=budget
+    )
+    if response.status_code != 200:
+        print(f"Failed to query data for panel '{panel['title']}'. Status code: {response.status_code}")
+        return None
+
+    series = []
+    for result in response.json().get("results", {}).values():
+        for frame in result.get("frames", []):
+            fields = frame.get("schema", {}).get("fields", [])
+            values = frame.get("data", {}).get("values", [])
+            for field, field_values in zip(fields, values):
+                if field.get("type") == "number":
+                    series.append((field.get("config", {}).get("displayNameFromDS") or field.get("name", ""), field_values))
+    return series
+
+def scaled_threshold(minimum, points):
+    from statistics import NormalDist
+    # Bonferroni correction: the max of `points` Gaussian scores passes it by chance
+    # with probability FALSE_ALARM_RATE
+    return max(minimum, NormalDist().inv_cdf(1 - FALSE_ALARM_RATE / (2 * points)))
+
+def detect_anomalies(values):
+    import numpy as np
+
+    x = np.asarray([np.nan if v is None else v for v in values], dtype=float)
+    x = x[np.isfinite(x)]
+    n = x.size
+    if n < MIN_POINTS:
+        return []
+
+    split = max(1, int(n * (1 - RECENT_FRACTION)))
+    baseline, recent = x[:split], x[split:]
+    reasons = []
+
+    # z-score of recent points against the baseline
+    std = baseline.std()
+    if std > 0:
+        z = np.abs(recent - baseline.mean()) / std
+        if z.max() > scaled_threshold(Z_THRESHOLD, recent.size):
+            reasons.append(f"z-score {z.max():.1f}")
+
+    # Robust z-score using the median absolute deviation
+    median = np.median(baseline)
+    mad = np.median(np.abs(baseline - median))
+    if mad > 0:
+        robust_z = 0.6745 * np.abs(recent - median) / mad
+        if robust_z.max() > scaled_threshold(MAD_THRESHOLD, recent.size):
+            reasons.append(f"MAD score {robust_z.max():.1f}")
+
+    # Single mean-shift change point: two-sample t statistic for every split, via cumulative sums
+    overall_std = x.std()
+    if overall_std > 0:
+        k = np.arange(1, n)
+        cumsum = np.cumsum(x)[:-1]
+        left_mean = cumsum / k
+        right_mean = (x.sum() - cumsum) / (n - k)
+        t = np.abs(left_mean - right_mean) / (overall_std * np.sqrt(1.0 / k + 1.0 / (n - k)))
+        best = int(t.argmax())
+        # Only shifts in the second half of the window are relevant to a firing alert
+        if t[best] > CHANGE_POINT_THRESHOLD and k[best] >= n // 2:
+            reasons.append(f"level shift at point {k[best]}/{n} (t={t[best]:.1f})")
+
+    return reasons
+
+def find_anomalous_panels(client, grafana_base_url, org_id, panels, max_workers=4, window=None, budget=None):
+    # Returns {panel_id: reasons} for panels worth rendering. Panels that cannot be
+    # queried (template variables, mixed or unknown datasources, query errors) are
+    # kept unless DATA_ENGINE_UNQUERYABLE=skip, since they can't be ruled out.
+    keep_unqueryable = os.environ.get("DATA_ENGINE_UNQUERYABLE", "render") != "skip"
+    # window is (from_ms, to_ms), matching the rendered range
+    time_from, time_to = (str(window[0]), str(window[1])) if window else (DEFAULT_TIME_FROM, DEFAULT_TIME_TO)
+
+    def check(panel):
+        try:
+            series = query_panel_series(client, grafana_base_url, org_id, panel, time_from, time_to, budget)
+        except Exception as e:
+            print(f"Error querying data for panel '{panel['title']}': {e}")
+            series = None
+        if series is None:
+            return ["not queryable"] if keep_unqueryable else []
+        reasons = []
+        for name, values in series:
+            reasons.extend(f"{name}: {reason}" if name else reason for reason in detect_anomalies(values))
+        return reasons
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(check, panels))
+    return {panel['id']: reasons for panel, reasons in zip(panels, results) if reasons}
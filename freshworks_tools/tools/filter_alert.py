@@ -1,13 +1,25 @@
 import os
 import sys
-import requests
 from urllib.parse import urlparse, parse_qs
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 import json
-from litellm import completion
-import base64
-from PIL import Image
+from freshworks_tools.tools.pipeline import run_panel_pipeline, run_grouped_pipeline, get_stage_limits
+from freshworks_tools.tools.composite import analyze_in_composites
+from freshworks_tools.tools.data_engine import find_anomalous_panels, get_grafana_base_url
+from freshworks_tools.tools import dashboard_cache
+from freshworks_tools.tools.panel_ranker import PanelRanker, DEFAULT_TOP_K
+from freshworks_tools.tools.panel_embeddings import PanelEmbeddingIndex, get_embedder, DEFAULT_MIN_SCORE
+from freshworks_tools.tools.image_dedup import get_image_deduplicator, panel_key
+from freshworks_tools.tools.relevance_cache import get_relevance_cache, normalize
+from freshworks_tools.tools.singleflight import coalesce
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.grafana_client import get_grafana_client
+from freshworks_tools.tools.vision_image import encode_for_vision
+from freshworks_tools.tools.render_profiles import render_params
+from freshworks_tools.tools.render_window import get_render_window, window_params
+from freshworks_tools.tools.render_cache import cached_render, get_render_cache
+from freshworks_tools.tools.slack_client import get_slack_client, get_upload_batch_size, ThreadUploader, extract_upload_info
+from freshworks_tools.tools.streaming import streaming_enabled, stream_analysis_to_thread
+from freshworks_tools.tools.budget import BudgetExhausted, get_run_budget, post_skipped_summary
 
 def generate_grafana_api_url(grafana_dashboard_url):
     parsed_url = urlparse(grafana_dashboard_url)
@@ -28,39 +40,166 @@ def generate_grafana_api_url(grafana_dashboard_url):
         print(f"Invalid Grafana dashboard URL: {str(e)}")
         raise
 
-def get_dashboard_panels(api_url, api_key):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        dashboard_data = response.json()
-        panels = dashboard_data.get('dashboard', {}).get('panels', [])
-        return [(panel.get('title'), panel.get('id')) for panel in panels if 'title' in panel and 'id' in panel]
-    else:
-        print(f"Failed to fetch dashboard data. Status code: {response.status_code}")
-        raise Exception("Failed to fetch dashboard data")
-
-def find_related_panels(panels, alert_subject):
-    llm_key = os.environ["VISION_LLM_KEY"]
-    llm_base_url = os.environ["VISION_LLM_BASE_URL"]
+RELATED_PANEL_THRESHOLD = 0.5
+# Rough budget for the panel list in a single batch prompt (gpt-4 has an 8k context)
+RELATED_PANEL_CHUNK_TOKENS = 3000
+RELATED_PANEL_CHUNK_SIZE = 100
 
-    related_panels = []
+def chunk_panels(panels, max_tokens=RELATED_PANEL_CHUNK_TOKENS, max_panels=RELATED_PANEL_CHUNK_SIZE):
+    chunks = []
+    current = []
+    current_tokens = 0
     for panel_title, panel_id in panels:
-        prompt = f"Given the alert subject '{alert_subject}', is the panel titled '{panel_title}' likely to be related? Respond with 'Yes' or 'No'."
-        try:
-            response = completion(
-                model="openai/gpt-4",
-                api_key=llm_key,
-                base_url=llm_base_url,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            if 'yes' in response.choices[0].message.content.lower():
-                related_panels.append((panel_title, panel_id))
-        except Exception as e:
-            print(f"Error in LLM call for panel '{panel_title}': {e}")
-
-    return related_panels
-
-def generate_grafana_render_url(grafana_dashboard_url, panel_id):
+        # ~4 characters per token is close enough for sizing the prompt
+        panel_tokens = len(json.dumps({"id": panel_id, "title": panel_title})) // 4 + 1
+        if current and (current_tokens + panel_tokens > max_tokens or len(current) >= max_panels):
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append((panel_title, panel_id))
+        current_tokens += panel_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def parse_panel_scores(content, chunk):
+    # Accept a bare JSON array, optionally wrapped in a markdown code fence or prose
+    start = content.find("[")
+    end = content.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("No JSON array found in LLM response")
+    items = json.loads(content[start:end + 1])
+    if not isinstance(items, list):
+        raise ValueError("LLM response is not a JSON array")
+
+    ids = {str(panel_id): panel_id for _, panel_id in chunk}
+    scores = {}
+    for item in items:
+        if not isinstance(item, dict) or str(item.get("id")) not in ids:
+            raise ValueError(f"Unexpected item in LLM response: {item}")
+        scores[ids[str(item["id"])]] = float(item.get("score", 1.0))
+    return scores
+
+def classify_panel_chunk(chunk, alert_subject, budget=None):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    panel_list = json.dumps([{"id": panel_id, "title": panel_title} for panel_title, panel_id in chunk])
+    prompt = (f"Given the alert subject '{alert_subject}', decide which of the following Grafana panels are likely to be related.\n"
+              f"Panels: {panel_list}\n"
+              "Respond with only a JSON array of the related panels, each as {\"id\": <panel id>, \"score\": <relevance from 0.0 to 1.0>}. "
+              "Respond with [] if none are related.")
+    response = get_llm_gateway().complete("relevance", [{"role": "user", "content": prompt}], budget=budget)
+    return parse_panel_scores(response.choices[0].message.content, chunk)
+
+def classify_single_panel(panel_title, alert_subject, budget=None):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    prompt = f"Given the alert subject '{alert_subject}', is the panel titled '{panel_title}' likely to be related? Respond with 'Yes' or 'No'."
+    response = get_llm_gateway().complete("relevance", [{"role": "user", "content": prompt}], budget=budget)
+    return 1.0 if 'yes' in response.choices[0].message.content.lower() else 0.0
+
+@tracing.traced("relevance")
+def score_related_panels(panels, alert_subject, batch=True, relevance_cache=None, dashboard=None, budget=None):
+    from freshworks_tools.tools.llm_gateway import get_model
+    # Cached decisions are keyed by model, so switching RELEVANCE_LLM_MODEL re-scores panels
+    model = get_model("relevance")
+
+    # Panels sharing a title (e.g. repeated per-host rows) get a single decision
+    representatives = {}
+    for panel_title, panel_id in panels:
+        representatives.setdefault(normalize(panel_title), (panel_title, panel_id))
+
+    # Cached decisions for every representative in one lookup
+    cached = relevance_cache.get_many(alert_subject, [panel_title for panel_title, _ in representatives.values()], model) if relevance_cache else {}
+    scores = {key: cached[panel_title] for key, (panel_title, _) in representatives.items() if panel_title in cached}
+    uncached = [(panel_title, panel_id) for panel_title, panel_id in representatives.values() if panel_title not in cached]
+
+    def record(panel_title, score):
+        scores[normalize(panel_title)] = score
+        if relevance_cache:
+            relevance_cache.set(alert_subject, panel_title, model, score)
+
+    def classify(uncached):
+        chunks = chunk_panels(uncached) if batch else [[panel] for panel in uncached]
+        for chunk in chunks:
+            if batch:
+                try:
+                    chunk_scores = classify_panel_chunk(chunk, alert_subject, budget)
+                    for panel_title, panel_id in chunk:
+                        record(panel_title, chunk_scores.get(panel_id, 0.0))
+                    continue
+                except BudgetExhausted as e:
+                    # Panels not scored by the deadline count as unrelated
+                    print(f"Relevance scoring stopped early: {e}")
+                    return
+                except Exception as e:
+                    print(f"Batch classification failed for {len(chunk)} panels, falling back to per-panel calls: {e}")
+
+            for panel_title, panel_id in chunk:
+                try:
+                    record(panel_title, classify_single_panel(panel_title, alert_subject, budget))
+                except BudgetExhausted as e:
+                    print(f"Relevance scoring stopped early: {e}")
+                    return
+                except Exception as e:
+                    print(f"Error in LLM call for panel '{panel_title}': {e}")
+
+    if relevance_cache and uncached:
+        # Concurrent alerts with the same subject on the same dashboard classify once;
+        # the others wait, at most until their run's deadline, and pick up the
+        # decisions the first one cached
+        with coalesce("relevance", dashboard, normalize(alert_subject), model,
+                      timeout=budget.remaining() if budget else None) as waited:
+            if waited:
+                # Already counted as misses above, so this lookup isn't counted again
+                cached = relevance_cache.get_many(alert_subject, [panel_title for panel_title, _ in uncached], model, count=False)
+                scores.update((normalize(panel_title), score) for panel_title, score in cached.items())
+                uncached = [(panel_title, panel_id) for panel_title, panel_id in uncached if panel_title not in cached]
+            classify(uncached)
+    else:
+        classify(uncached)
+
+    if relevance_cache:
+        relevance_cache.evict()
+        relevance_cache.flush()
+
+    return [(panel_title, panel_id, scores[normalize(panel_title)]) for panel_title, panel_id in panels
+            if scores.get(normalize(panel_title), 0.0) >= RELATED_PANEL_THRESHOLD]
+
+def find_related_panels(index, alert_subject, batch=True, relevance_cache=None, candidates=None, accepted=(), dashboard=None, budget=None):
+    # Related panels of the dashboard index, most relevant first and in dashboard
+    # order on ties. candidates limits the (title, id) pairs sent to the LLM, all
+    # panels by default; accepted ids count as fully relevant.
+    if candidates is None:
+        candidates = [(panel['title'], panel['id']) for panel in index.panels]
+    scores = dict.fromkeys(accepted, 1.0)
+    scores.update((panel_id, score) for _, panel_id, score in score_related_panels(candidates, alert_subject, batch, relevance_cache, dashboard, budget))
+    return [(panel['title'], panel['id']) for panel in sorted(index.ordered(scores), key=lambda panel: -scores[panel['id']])]
+
+def get_prefilter_top_k():
+    return int(os.environ.get("RELEVANCE_PREFILTER_TOP_K", DEFAULT_TOP_K))
+
+def embedding_matches(panels, alert_subject, top_k, api_url, org_id="1"):
+    # [(panel id, cosine similarity)] best first, from the dashboard's persisted vector index
+    embedding_index = PanelEmbeddingIndex(api_url, org_id, get_embedder()).update(panels)
+    if embedding_index.embedded:
+        print(f"Embedded {embedding_index.embedded} new or changed panels")
+    min_score = float(os.environ.get("RELEVANCE_EMBEDDING_MIN_SCORE", DEFAULT_MIN_SCORE))
+    return embedding_index.search(alert_subject, top_k, min_score)
+
+def prefilter_panels(panels, alert_subject, mode, api_url=None, org_id="1"):
+    # Rank dashboard panels locally. "shortlist" sends only the top-K to the LLM;
+    # "ambiguous" accepts clear matches, drops clear misses and sends the rest;
+    # "embedding" sends the top-K by cosine similarity from the persisted vector index.
+    top_k = get_prefilter_top_k()
+    if mode == "embedding":
+        shortlisted = dict(embedding_matches(panels, alert_subject, top_k, api_url, org_id))
+        return [], [(panel['title'], panel['id']) for panel in panels if panel['id'] in shortlisted]
+    ranker = PanelRanker(panels)
+    if mode == "shortlist":
+        return [], [(panel['title'], panel['id']) for panel, _ in ranker.shortlist(alert_subject, top_k)]
+    accepted, ambiguous = ranker.triage(alert_subject)
+    return [(panel['title'], panel['id']) for panel, _ in accepted], [(panel['title'], panel['id']) for panel, _ in ambiguous]
+
+def generate_grafana_render_url(grafana_dashboard_url, panel_id, panel_type=None, window=None):
     parsed_url = urlparse(grafana_dashboard_url)
     path_parts = parsed_url.path.strip("/").split("/")
 
@@ -74,31 +213,35 @@ def generate_grafana_render_url(grafana_dashboard_url, panel_id):
         query_params = parse_qs(parsed_url.query)
         org_id = query_params.get("orgId", ["1"])[0]
 
-        render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d-solo/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&from=now-1h&to=now&panelId={panel_id}&width=1000&height=500"
+        render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d-solo/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&{window_params(window)}&panelId={panel_id}&{render_params(panel_type)}"
         return render_url, org_id
     except (IndexError, ValueError) as e:
         print(f"Invalid Grafana dashboard URL: {str(e)}")
         raise
 
-def download_grafana_image(render_url, api_key, panel_title):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(render_url, headers=headers)
+@tracing.traced("render", measure=len)
+def download_grafana_image(render_url, api_key, panel_title, budget=None):
+    response = get_grafana_client(api_key).get(render_url, budget=budget, stream=True)
     if response.status_code == 200:
-        filename = f"grafana_panel_{panel_title.replace(' ', '_')}.png"
-        with open(filename, "wb") as f:
-            f.write(response.content)
-        print(f"Grafana panel image downloaded successfully: {filename}")
-        return filename
+        # Stream the render straight into memory instead of a temp file
+        image_data = b"".join(response.iter_content(chunk_size=64 * 1024))
+        print(f"Grafana panel image downloaded successfully for panel '{panel_title}' ({len(image_data)} bytes)")
+        return image_data
     else:
         print(f"Failed to download Grafana image. Status code: {response.status_code}")
+        # Unread streamed responses keep their pooled connection until closed
+        response.close()
         raise Exception("Failed to download Grafana image")
 
-def send_slack_file_to_thread(token, channel_id, thread_ts, file_path, initial_comment):
-    client = WebClient(token=token)
+@tracing.traced("slack")
+def send_slack_file_to_thread(token, channel_id, thread_ts, image_data, filename, initial_comment):
+    from slack_sdk.errors import SlackApiError
+    client = get_slack_client(token)
     try:
         response = client.files_upload_v2(
             channel=channel_id,
-            file=file_path,
+            file=image_data,
+            filename=filename,
             initial_comment=initial_comment,
             thread_ts=thread_ts
         )
@@ -116,44 +259,33 @@ def extract_slack_response_info(response):
         "timestamp": response.get("file", {}).get("timestamp")
     }
 
-def analyze_image_with_vision_model(image_path):
-    # Open the image
-    image = Image.open(image_path)
+VISION_PROMPT = "Analyze this Grafana dashboard image. Identify any abnormalities or significant patterns in the data. Provide a brief summary of your observations."
 
-    # Resize the image (e.g., to 800x800)
-    image = image.resize((800, 800))
+@tracing.traced("vision")
+def analyze_image_with_vision_model(image_data, budget=None):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    # Aspect-preserving, tile-aligned JPEG for the model; the original stays full quality for Slack
+    image_url, _ = encode_for_vision(image_data)
+    tracing.count("vision", bytes=len(image_url))
 
-    # Save the resized image
-    image.save(image_path)
-
-    # Encode the image
-    with open(image_path, "rb") as image_file:
-        base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-
-    llm_key = os.environ["VISION_LLM_KEY"]
-    llm_base_url = os.environ["VISION_LLM_BASE_URL"]
-
-    # openai call
+    # openai call, rate limited and retried by the shared gateway
     try:
-        response = completion(
-            model="openai/gpt-4o",
-            api_key=llm_key,
-            base_url=llm_base_url,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Analyze this Grafana dashboard image. Identify any abnormalities or significant patterns in the data. Provide a brief summary of your observations."},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            },
+        response = get_llm_gateway().complete("vision", [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": VISION_PROMPT},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
                         },
-                    ],
-                }
-            ],
-        )
+                    },
+                ],
+            }
+        ], budget=budget)
+    except BudgetExhausted:
+        raise
     except Exception as e:
         print(f"Error for llm: {e}")
         return "Unable to analyze the image due to an error."
@@ -164,12 +296,12 @@ def analyze_image_with_vision_model(image_path):
         print(f"Failed to get content from response: {e}")
         return "Unable to analyze the image due to an error."
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python script.py <alert_subject>")
-        sys.exit(1)
-
-    alert_subject = sys.argv[1]
+def main(alert_subject=None):
+    if alert_subject is None:
+        if len(sys.argv) < 2:
+            print("Usage: python script.py <alert_subject>")
+            sys.exit(1)
+        alert_subject = sys.argv[1]
 
     # Access environment variables
     grafana_dashboard_url = os.environ.get("GRAFANA_DASHBOARD_URL")
@@ -177,39 +309,120 @@ def main():
     channel_id = os.environ.get("SLACK_CHANNEL_ID")
     slack_token = os.environ.get("SLACK_API_TOKEN")
     grafana_api_key = os.environ.get("GRAFANA_API_KEY")
+    # Deadline for the whole run plus optional caps on vision calls and tokens
+    budget = get_run_budget()
 
     # Get dashboard panels
     api_url, org_id = generate_grafana_api_url(grafana_dashboard_url)
-    all_panels = get_dashboard_panels(api_url, grafana_api_key)
-
-    # Find related panels
-    related_panels = find_related_panels(all_panels, alert_subject)
-
-    for panel_title, panel_id in related_panels:
+    index = dashboard_cache.get_dashboard_index(api_url, org_id, grafana_api_key)
+    # One bucket-aligned window for every panel, ending at the alert time
+    window = get_render_window()
+    dashboard_version = dashboard_cache.get_dashboard_version(api_url, org_id, grafana_api_key)
+
+    # Find related panels, one LLM call per chunk of panels unless per-panel mode is requested
+    # and only for panels without a cached decision for this subject
+    batch = os.environ.get("RELATED_PANELS_MODE", "batch") != "per_panel"
+    relevance_cache = get_relevance_cache() if os.environ.get("RELEVANCE_CACHE", "on") != "off" else None
+    prefilter = os.environ.get("RELEVANCE_PREFILTER", "off")
+    accepted, candidates = [], None
+    if prefilter in ("shortlist", "ambiguous", "embedding"):
+        accepted, candidates = prefilter_panels(index.panels, alert_subject, prefilter, api_url, org_id)
+        print(f"Local prefilter: {len(accepted)} panels accepted, {len(candidates)} of {len(index.panels)} sent to the LLM")
+    # Clear local matches count as fully relevant. Most relevant first, so a run
+    # cut short by its budget drops the least related panels
+    related_panels = find_related_panels(index, alert_subject, batch, relevance_cache, candidates,
+                                         [panel_id for _, panel_id in accepted], (api_url, org_id), budget)
+    if relevance_cache:
+        print(f"Relevance cache stats: {json.dumps(relevance_cache.stats())}")
+
+    if os.environ.get("ANALYSIS_ENGINE") == "data":
+        # Query each related panel's series and only render the ones that look anomalous
+        anomalies = find_anomalous_panels(get_grafana_client(grafana_api_key), get_grafana_base_url(grafana_dashboard_url), org_id,
+                                          [index.get(panel_id) for _, panel_id in related_panels], get_stage_limits()[0], window, budget)
+        for panel_title, panel_id in related_panels:
+            print(f"Panel '{panel_title}': {'; '.join(anomalies.get(panel_id, ['no anomalies detected']))}")
+        related_panels = [(panel_title, panel_id) for panel_title, panel_id in related_panels if panel_id in anomalies]
+
+    def render(panel):
+        panel_title, panel_id = panel
         # Generate Grafana render URL for each related panel
-        render_url, _ = generate_grafana_render_url(grafana_dashboard_url, panel_id)
+        render_url, _ = generate_grafana_render_url(grafana_dashboard_url, panel_id, index.get(panel_id)['type'], window)
         print(f"Generated Grafana render URL for panel '{panel_title}': {render_url}")
 
-        # Download Grafana image
-        image_path = download_grafana_image(render_url, grafana_api_key, panel_title)
+        # Download Grafana image, or reuse a render of the same window and dashboard version
+        return cached_render(render_url, dashboard_version, lambda: download_grafana_image(render_url, grafana_api_key, panel_title, budget), budget)
 
+    # Identical or near-identical renders in this run share one vision call; recent
+    # runs' analyses are reused for the same panel and an identical render
+    deduplicator = get_image_deduplicator(lambda image_data: analyze_image_with_vision_model(image_data, budget), "filter_alert", budget)
+
+    def analyze(panel, image_data):
         # Analyze the image using the vision model
-        analysis_result = analyze_image_with_vision_model(image_path)
+        return deduplicator.analyze(image_data, panel_key=panel_key(api_url, org_id, panel[1]))
+
+    # With SLACK_UPLOAD_BATCH_SIZE > 1, several panels share one upload and comment
+    batch_size = get_upload_batch_size()
+    uploader = ThreadUploader(slack_token, channel_id, thread_ts, f"Grafana panel images from dashboard: {grafana_dashboard_url}", batch_size)
+
+    def print_batch_response(slack_response):
+        if slack_response:
+            print("Slack response for batch upload:")
+            print(json.dumps(extract_upload_info(slack_response), indent=2))
+
+    def upload(panel, image_data, analysis_result):
+        panel_title, _ = panel
+        filename = f"grafana_panel_{panel_title.replace(' ', '_')}.png"
+        if batch_size > 1:
+            print_batch_response(uploader.add(panel_title, image_data, filename, analysis_result))
+            return None
 
         # Send image to Slack thread
         initial_comment = (f"Grafana panel image: {panel_title}\n"
                            f"From dashboard: {grafana_dashboard_url}\n\n"
                            f"Analysis:\n{analysis_result}")
-        slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_path, initial_comment)
+        slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, filename, initial_comment)
 
         # Extract relevant information from the Slack response
         response_info = extract_slack_response_info(slack_response)
         print(f"Slack response for panel '{panel_title}':")
         print(json.dumps(response_info, indent=2))
-
-        # Clean up the downloaded image
-        os.remove(image_path)
-        print(f"Temporary image file removed for panel '{panel_title}'")
+        return response_info
+
+    if os.environ.get("VISION_MODE") == "composite":
+        # Tile the renders into labelled grids and analyze each grid in one vision call;
+        # each grid call is charged to the budget, which is checked before every grid
+        def analyze_group(panels, images):
+            titles = [panel_title for panel_title, _ in panels]
+            return analyze_in_composites(titles, images, deduplicator.analyze, max_workers=get_stage_limits()[1], budget=budget)
+
+        run_grouped_pipeline(related_panels, render, analyze_group, upload, budget=budget)
+    elif streaming_enabled():
+        # Post each image as soon as it is rendered, then stream its analysis into a reply
+        def render_and_post(panel):
+            panel_title, _ = panel
+            image_data = render(panel)
+            send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, f"grafana_panel_{panel_title.replace(' ', '_')}.png",
+                                      f"Grafana panel image: {panel_title}\nFrom dashboard: {grafana_dashboard_url}")
+            return image_data
+
+        def stream_analysis(panel, image_data):
+            panel_title, panel_id = panel
+            return stream_analysis_to_thread(deduplicator, image_data, VISION_PROMPT, slack_token, channel_id, thread_ts,
+                                             f"Analysis of {panel_title}:", panel_key(api_url, org_id, panel_id))
+
+        def log_analysis(panel, image_data, analysis_result):
+            print(f"Analysis for panel '{panel[0]}': {analysis_result}")
+
+        run_panel_pipeline(related_panels, render_and_post, stream_analysis, log_analysis, budget=budget)
+    else:
+        # Render and analyze panels concurrently, posting to Slack in relevance order
+        run_panel_pipeline(related_panels, render, analyze, upload, budget=budget)
+    print_batch_response(uploader.flush())
+    post_skipped_summary(slack_token, channel_id, thread_ts, budget, [panel_title for panel_title, _ in budget.skipped], len(related_panels))
+    print(f"Run budget stats: {json.dumps(budget.stats())}")
+    print(f"Image dedup stats: {json.dumps(deduplicator.stats())}")
+    if get_render_cache():
+        print(f"Render cache stats: {json.dumps(get_render_cache().stats())}")
 
     print("Processing complete")
 
@@ -1,12 +1,20 @@
 import os
-import requests
 from urllib.parse import urlparse, parse_qs
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 import json
-from litellm import completion
-import base64
-from PIL import Image
+from freshworks_tools.tools.pipeline import run_panel_pipeline, run_grouped_pipeline, get_stage_limits
+from freshworks_tools.tools.composite import analyze_in_composites
+from freshworks_tools.tools.data_engine import find_anomalous_panels, get_grafana_base_url
+from freshworks_tools.tools import dashboard_cache
+from freshworks_tools.tools.panel_ranker import PanelRanker, DEFAULT_TOP_K
+from freshworks_tools.tools.image_dedup import get_image_deduplicator, panel_key
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.grafana_client import get_grafana_client
+from freshworks_tools.tools.vision_image import encode_for_vision
+from freshworks_tools.tools.render_profiles import render_params
+from freshworks_tools.tools.render_window import get_render_window, window_params
+from freshworks_tools.tools.render_cache import cached_render, get_render_cache
+from freshworks_tools.tools.slack_client import get_slack_client, get_upload_batch_size, ThreadUploader, extract_upload_info
+from freshworks_tools.tools.streaming import streaming_enabled, stream_analysis_to_thread
 
 def generate_grafana_api_url(grafana_dashboard_url):
     print(f"Received Grafana URL: {grafana_dashboard_url}")
@@ -28,48 +36,51 @@ def generate_grafana_api_url(grafana_dashboard_url):
         print(f"Invalid Grafana dashboard URL: {str(e)}")
         raise
 
-def get_dashboard_panels(api_url, api_key):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        dashboard_data = response.json()
-        panels = dashboard_data['dashboard']['panels']
-        return [{'id': panel['id'], 'title': panel['title']} for panel in panels]
-    else:
-        print(f"Failed to fetch dashboard data. Status code: {response.status_code}")
-        raise Exception("Failed to fetch dashboard data")
+def get_dashboard_index(api_url, api_key, org_id="1"):
+    # Parsed panel lists are cached on disk and revalidated against the dashboard version;
+    # the index over them is built once per version
+    return dashboard_cache.get_dashboard_index(api_url, org_id, api_key)
 
-def filter_panels_by_subject(panels, subject):
-    return [panel for panel in panels if subject.lower() in panel['title'].lower()]
+def filter_panels_by_subject(index, subject):
+    if os.environ.get("SUBJECT_MATCH") == "ranked":
+        # BM25 + fuzzy ranking over titles, descriptions and metric names instead of exact substrings
+        top_k = int(os.environ.get("SUBJECT_MATCH_TOP_K", DEFAULT_TOP_K))
+        min_score = float(os.environ.get("SUBJECT_MATCH_MIN_SCORE", 0.5))
+        return index.ordered({panel['id'] for panel, _ in PanelRanker(index.panels).shortlist(subject, top_k, min_score)})
+    return index.titles_containing(subject)
 
-def generate_grafana_render_url(grafana_dashboard_url, org_id, panel_id):
+def generate_grafana_render_url(grafana_dashboard_url, org_id, panel_id, panel_type=None, window=None):
     parsed_url = urlparse(grafana_dashboard_url)
     path_parts = parsed_url.path.strip("/").split("/")
     dashboard_uid = path_parts[1]
     dashboard_slug = path_parts[2]
 
-    render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d-solo/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&from=now-1h&to=now&panelId={panel_id}&width=1000&height=500"
+    render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d-solo/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&{window_params(window)}&panelId={panel_id}&{render_params(panel_type)}"
     return render_url
 
+@tracing.traced("render", measure=len)
 def download_grafana_image(render_url, api_key, panel_id):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(render_url, headers=headers)
+    response = get_grafana_client(api_key).get(render_url, stream=True)
     if response.status_code == 200:
-        filename = f"grafana_panel_{panel_id}.png"
-        with open(filename, "wb") as f:
-            f.write(response.content)
-        print(f"Grafana panel image downloaded successfully: {filename}")
-        return filename
+        # Stream the render straight into memory instead of a temp file
+        image_data = b"".join(response.iter_content(chunk_size=64 * 1024))
+        print(f"Grafana panel image downloaded successfully for panel {panel_id} ({len(image_data)} bytes)")
+        return image_data
     else:
         print(f"Failed to download Grafana image. Status code: {response.status_code}")
+        # Unread streamed responses keep their pooled connection until closed
+        response.close()
         raise Exception("Failed to download Grafana image")
 
-def send_slack_file_to_thread(token, channel_id, thread_ts, file_path, initial_comment):
-    client = WebClient(token=token)
+@tracing.traced("slack")
+def send_slack_file_to_thread(token, channel_id, thread_ts, image_data, filename, initial_comment):
+    from slack_sdk.errors import SlackApiError
+    client = get_slack_client(token)
     try:
         response = client.files_upload_v2(
             channel=channel_id,
-            file=file_path,
+            file=image_data,
+            filename=filename,
             initial_comment=initial_comment,
             thread_ts=thread_ts
         )
@@ -87,44 +98,31 @@ def extract_slack_response_info(response):
         "timestamp": response.get("file", {}).get("timestamp")
     }
 
-def analyze_image_with_vision_model(image_path):
-    # Open the image
-    image = Image.open(image_path)
-
-    # Resize the image (e.g., to 800x800)
-    image = image.resize((800, 800))
-
-    # Save the resized image
-    image.save(image_path)
+VISION_PROMPT = "Analyze this Grafana panel image. Identify any abnormalities or significant spikes in the data. Provide a brief summary of your observations."
 
-    # Encode the image
-    with open(image_path, "rb") as image_file:
-        base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+@tracing.traced("vision")
+def analyze_image_with_vision_model(image_data):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    # Aspect-preserving, tile-aligned JPEG for the model; the original stays full quality for Slack
+    image_url, _ = encode_for_vision(image_data)
+    tracing.count("vision", bytes=len(image_url))
 
-    llm_key = os.environ["VISION_LLM_KEY"]
-    llm_base_url = os.environ["VISION_LLM_BASE_URL"]
-
-    # openai call
+    # openai call, rate limited and retried by the shared gateway
     try:
-        response = completion(
-            model="openai/gpt-4o",
-            api_key=llm_key,
-            base_url=llm_base_url,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Analyze this Grafana panel image. Identify any abnormalities or significant spikes in the data. Provide a brief summary of your observations."},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            },
+        response = get_llm_gateway().complete("vision", [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": VISION_PROMPT},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
                         },
-                    ],
-                }
-            ],
-        )
+                    },
+                ],
+            }
+        ])
     except Exception as e:
         print(f"Error for llm: {e}")
         return "Unable to analyze the image due to an error."
@@ -149,38 +147,97 @@ def main():
     print(f"Generated Grafana API URL: {api_url}")
 
     # Get all panels from the dashboard
-    all_panels = get_dashboard_panels(api_url, grafana_api_key)
+    index = get_dashboard_index(api_url, grafana_api_key, org_id)
+    # One bucket-aligned window for every panel, ending at the alert time
+    window = get_render_window()
+    dashboard_version = dashboard_cache.get_dashboard_version(api_url, org_id, grafana_api_key)
 
     # Filter panels based on the subject
-    filtered_panels = filter_panels_by_subject(all_panels, subject)
+    filtered_panels = filter_panels_by_subject(index, subject)
+
+    if filtered_panels and os.environ.get("ANALYSIS_ENGINE") == "data":
+        # Query each matching panel's series and only render the ones that look anomalous
+        anomalies = find_anomalous_panels(get_grafana_client(grafana_api_key), get_grafana_base_url(grafana_dashboard_url), org_id,
+                                          filtered_panels, get_stage_limits()[0], window)
+        for panel in filtered_panels:
+            print(f"Panel {panel['id']}: {'; '.join(anomalies.get(panel['id'], ['no anomalies detected']))}")
+        filtered_panels = [panel for panel in filtered_panels if panel['id'] in anomalies]
 
     if not filtered_panels:
         print(f"No panels found matching the subject: {subject}")
     else:
-        for panel in filtered_panels:
+        def render(panel):
             # Generate Grafana render URL for each panel
-            render_url = generate_grafana_render_url(grafana_dashboard_url, org_id, panel['id'])
+            render_url = generate_grafana_render_url(grafana_dashboard_url, org_id, panel['id'], panel.get('type'), window)
             print(f"Generated Grafana render URL for panel {panel['id']}: {render_url}")
 
-            # Download Grafana image
-            image_path = download_grafana_image(render_url, grafana_api_key, panel['id'])
+            # Download Grafana image, or reuse a render of the same window and dashboard version
+            return cached_render(render_url, dashboard_version, lambda: download_grafana_image(render_url, grafana_api_key, panel['id']))
+
+        # Identical or near-identical renders in this run share one vision call; recent
+        # runs' analyses are reused for the same panel and an identical render
+        deduplicator = get_image_deduplicator(analyze_image_with_vision_model, "grafana")
 
+        def analyze(panel, image_data):
             # Analyze the image using the vision model
-            analysis_result = analyze_image_with_vision_model(image_path)
+            return deduplicator.analyze(image_data, panel_key=panel_key(api_url, org_id, panel['id']))
+
+        # With SLACK_UPLOAD_BATCH_SIZE > 1, several panels share one upload and comment
+        batch_size = get_upload_batch_size()
+        uploader = ThreadUploader(slack_token, channel_id, thread_ts, f"Grafana dashboard images from: {grafana_dashboard_url}", batch_size)
+
+        def print_batch_response(slack_response):
+            if slack_response:
+                print("Slack response for batch upload:")
+                print(json.dumps(extract_upload_info(slack_response), indent=2))
+
+        def upload(panel, image_data, analysis_result):
+            filename = f"grafana_panel_{panel['id']}.png"
+            if batch_size > 1:
+                print_batch_response(uploader.add(panel['title'], image_data, filename, analysis_result))
+                return None
 
             # Send image to Slack thread
             initial_comment = (f"Grafana dashboard image for panel '{panel['title']}' from: {grafana_dashboard_url}\n\n"
                                f"Analysis:\n{analysis_result}")
-            slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_path, initial_comment)
+            slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, filename, initial_comment)
 
             # Extract relevant information from the Slack response
             response_info = extract_slack_response_info(slack_response)
             print(f"Slack response for panel {panel['id']}:")
             print(json.dumps(response_info, indent=2))
-
-            # Clean up the downloaded image
-            os.remove(image_path)
-            print(f"Temporary image file removed for panel {panel['id']}")
+            return response_info
+
+        if os.environ.get("VISION_MODE") == "composite":
+            # Tile the renders into labelled grids and analyze each grid in one vision call
+            def analyze_group(panels, images):
+                titles = [panel['title'] for panel in panels]
+                return analyze_in_composites(titles, images, deduplicator.analyze, max_workers=get_stage_limits()[1])
+
+            run_grouped_pipeline(filtered_panels, render, analyze_group, upload)
+        elif streaming_enabled():
+            # Post each image as soon as it is rendered, then stream its analysis into a reply
+            def render_and_post(panel):
+                image_data = render(panel)
+                send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, f"grafana_panel_{panel['id']}.png",
+                                          f"Grafana dashboard image for panel '{panel['title']}' from: {grafana_dashboard_url}")
+                return image_data
+
+            def stream_analysis(panel, image_data):
+                return stream_analysis_to_thread(deduplicator, image_data, VISION_PROMPT, slack_token, channel_id, thread_ts,
+                                                 f"Analysis of panel '{panel['title']}':", panel_key(api_url, org_id, panel['id']))
+
+            def log_analysis(panel, image_data, analysis_result):
+                print(f"Analysis for panel {panel['id']}: {analysis_result}")
+
+            run_panel_pipeline(filtered_panels, render_and_post, stream_analysis, log_analysis)
+        else:
+            # Render and analyze panels concurrently, posting to Slack in panel order
+            run_panel_pipeline(filtered_panels, render, analyze, upload)
+        print_batch_response(uploader.flush())
+        print(f"Image dedup stats: {json.dumps(deduplicator.stats())}")
+        if get_render_cache():
+            print(f"Render cache stats: {json.dumps(get_render_cache().stats())}")
 
     print("Processing complete")
 
@@ -0,0 +1,113 @@
+import os
+import time
+import random
+import threading
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.budget import BudgetExhausted
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30
+DEFAULT_POOL_SIZE = 16
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def cap_timeout(timeout, remaining):
+    if remaining is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining) if timeout is not None else remaining
+
+def out_of_time(budget, delay):
+    remaining = budget.remaining() if budget else None
+    return remaining is not None and delay >= remaining
+
+class GrafanaClient:
+    def __init__(self, api_key, timeout=None, max_retries=None, backoff=None, max_backoff=None, pool_size=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.requests = requests
+        self.timeout = timeout or (
+            float(os.environ.get("GRAFANA_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+            float(os.environ.get("GRAFANA_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+        )
+        self.max_retries = int(max_retries if max_retries is not None else os.environ.get("GRAFANA_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self.backoff = float(backoff if backoff is not None else os.environ.get("GRAFANA_RETRY_BACKOFF", DEFAULT_BACKOFF))
+        self.max_backoff = float(max_backoff if max_backoff is not None else DEFAULT_MAX_BACKOFF)
+        self.retries = 0
+
+        pool_size = int(pool_size or os.environ.get("GRAFANA_POOL_SIZE", DEFAULT_POOL_SIZE))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def backoff_delay(self, attempt):
+        # Full jitter keeps concurrent panel renders from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, budget=None, **kwargs):
+        # With a run budget, each attempt's timeouts are capped at the time left
+        # and no retry is started that would outlast the deadline
+        timeout = kwargs.pop("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if budget and budget.exhausted():
+                raise BudgetExhausted(budget.reason)
+            kwargs["timeout"] = cap_timeout(timeout, budget.remaining() if budget else None)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (self.requests.ConnectionError, self.requests.Timeout) as e:
+                if budget and budget.exhausted():
+                    raise BudgetExhausted(budget.reason) from e
+                delay = self.backoff_delay(attempt)
+                if attempt == self.max_retries or out_of_time(budget, delay):
+                    raise
+                print(f"Grafana request failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = min(self.max_backoff, retry_after) if retry_after is not None else self.backoff_delay(attempt)
+                if out_of_time(budget, delay):
+                    return response
+                response.close()
+                print(f"Grafana returned {response.status_code}, retrying in {delay:.1f}s")
+            self.retries += 1
+            tracing.count("grafana", retries=1)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_grafana_client(api_key):
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = GrafanaClient(api_key)
+        return client
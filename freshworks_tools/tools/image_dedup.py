@@ -0,0 +1,200 @@
+import io
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import nullcontext
+from concurrent.futures import Future
+from freshworks_tools.tools import cache, tracing
+from freshworks_tools.tools.singleflight import coalesce
+
+# Returned by analyze_image_with_vision_model on failure; never cached
+ANALYSIS_ERROR = "Unable to analyze the image due to an error."
+DEFAULT_TTL = 15 * 60
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_DISTANCE = 2
+# A render counts as blank when nothing below its title bar spans more than
+# BLANK_MAX_WIDTH of the image, e.g. an empty panel or a centered "No data"
+TITLE_BAR_FRACTION = 0.1
+BLANK_TOLERANCE = 24
+BLANK_MAX_WIDTH = 0.25
+
+def exact_hash(image_data):
+    return hashlib.sha256(image_data).hexdigest()
+
+def perceptual_hash(image_data):
+    from PIL import Image
+    # 64-bit difference hash: compare neighbouring pixels of a 9x8 grayscale thumbnail
+    image = Image.open(io.BytesIO(image_data)).convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = image.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    # Stored as a signed 64-bit integer so it fits an SQLite INTEGER column
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def is_blank(image_data):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data)).convert("L")
+    width, height = image.size
+    body = image.crop((0, int(height * TITLE_BAR_FRACTION), width, height))
+    background = max(body.getcolors(256))[1]
+    mask = body.point(lambda value: 255 if abs(value - background) > BLANK_TOLERANCE else 0)
+    box = mask.getbbox()
+    return box is None or box[2] - box[0] <= width * BLANK_MAX_WIDTH
+
+def panel_key(api_url, org_id, panel_id=None):
+    # Identifies what a render shows, independent of its time window
+    return f"{api_url}?orgId={org_id}" + (f"&panelId={panel_id}" if panel_id is not None else "")
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+class AnalysisStore:
+    # Analyses from recent runs, reused only for the same panel and byte-identical
+    # render. Perceptual hashes barely move when a panel starts spiking, so a
+    # near match across runs could hand back a stale "no abnormalities".
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or os.path.join(cache.get_cache_dir("analyses"), "analyses.sqlite3")
+        self.ttl = float(ttl if ttl is not None else os.environ.get("IMAGE_DEDUP_TTL", DEFAULT_TTL))
+        self.max_entries = int(max_entries if max_entries is not None else os.environ.get("IMAGE_DEDUP_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS panel_analyses (
+                    namespace TEXT NOT NULL,
+                    panel_key TEXT NOT NULL,
+                    exact_hash TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, panel_key, exact_hash)
+                )""")
+
+    def lookup(self, namespace, panel_key, exact):
+        now = time.time()
+        key = (namespace, panel_key, exact)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT analysis FROM panel_analyses WHERE namespace = ? AND panel_key = ? AND exact_hash = ? AND created_at >= ?",
+                key + (now - self.ttl,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE panel_analyses SET last_used = ? WHERE namespace = ? AND panel_key = ? AND exact_hash = ?", (now,) + key
+            )
+            return row[0]
+
+    def save(self, namespace, panel_key, exact, analysis):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO panel_analyses VALUES (?, ?, ?, ?, ?, ?)", (namespace, panel_key, exact, analysis, now, now)
+            )
+            self.conn.execute("DELETE FROM panel_analyses WHERE created_at < ?", (now - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM panel_analyses WHERE rowid IN (SELECT rowid FROM panel_analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+class ImageDeduplicator:
+    # Wraps an analyze(image_data) callable so identical images in this run share a
+    # single vision call. Near-identical ones only do when both are blank: a spike
+    # moves the perceptual hash by a bit or two, so a near match between two
+    # plotted series could hand one panel the other's analysis. Across runs an analysis is reused
+    # only for the same panel_key and identical bytes. Calls that do reach the
+    # model are charged to budget, which raises BudgetExhausted when spent.
+    def __init__(self, analyze, namespace, store=None, max_distance=None, budget=None):
+        self.analyze_image = analyze
+        self.namespace = namespace
+        self.store = store
+        self.budget = budget
+        self.max_distance = int(max_distance if max_distance is not None else os.environ.get("IMAGE_DEDUP_MAX_DISTANCE", DEFAULT_MAX_DISTANCE))
+        self.lock = threading.Lock()
+        # exact hash -> (phash, blank, future) while a call is running; finished
+        # analyses move to completed as (exact, phash, blank, analysis)
+        self.in_flight = {}
+        self.completed = []
+        self.hits = 0
+        self.misses = 0
+
+    def similar(self, exact, phash, blank, other_exact, other_phash, other_blank):
+        if other_exact == exact:
+            return True
+        return blank and other_blank and hamming_distance(other_phash, phash) <= self.max_distance
+
+    def match(self, exact, phash, blank):
+        for other_exact, (other_phash, other_blank, future) in self.in_flight.items():
+            if self.similar(exact, phash, blank, other_exact, other_phash, other_blank):
+                return future
+        for other_exact, other_phash, other_blank, analysis in self.completed:
+            if self.similar(exact, phash, blank, other_exact, other_phash, other_blank):
+                future = Future()
+                future.set_result(analysis)
+                return future
+        return None
+
+    def analyze(self, image_data, analyze=None, panel_key=None):
+        # analyze overrides the wrapped callable for this call, e.g. to stream the result.
+        # panel_key (e.g. dashboard URL and panel id) enables reuse from recent runs.
+        exact = exact_hash(image_data)
+        phash = perceptual_hash(image_data)
+        blank = is_blank(image_data)
+        store = self.store if panel_key is not None else None
+
+        with self.lock:
+            future = self.match(exact, phash, blank)
+            if future is None:
+                cached = store.lookup(self.namespace, panel_key, exact) if store else None
+                if cached is not None:
+                    self.hits += 1
+                    tracing.count("vision", cache_hits=1)
+                    return cached
+                self.misses += 1
+                tracing.count("vision", cache_misses=1)
+                owned = Future()
+                self.in_flight[exact] = (phash, blank, owned)
+            else:
+                self.hits += 1
+                tracing.count("vision", cache_hits=1)
+
+        if future is not None:
+            return future.result()
+
+        # Other processes analyzing the same render (concurrent alerts on one
+        # dashboard) wait for one vision call and read its result from the store
+        try:
+            with coalesce("analysis", self.namespace, panel_key, exact, timeout=self.budget.remaining() if self.budget else None) if store else nullcontext(False) as waited:
+                cached = store.lookup(self.namespace, panel_key, exact) if waited else None
+                if cached is not None:
+                    analysis = cached
+                else:
+                    if self.budget:
+                        self.budget.charge(image_data)
+                    analysis = (analyze or self.analyze_image)(image_data)
+                    if store and analysis != ANALYSIS_ERROR:
+                        store.save(self.namespace, panel_key, exact, analysis)
+        except Exception as e:
+            with self.lock:
+                del self.in_flight[exact]
+            owned.set_exception(e)
+            raise
+        with self.lock:
+            del self.in_flight[exact]
+            # Errors aren't reused, so a later copy of the image gets a fresh call
+            if analysis != ANALYSIS_ERROR:
+                self.completed.append((exact, phash, blank, analysis))
+        owned.set_result(analysis)
+        return analysis
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+def get_image_deduplicator(analyze, namespace, budget=None):
+    store = AnalysisStore() if os.environ.get("IMAGE_DEDUP_CACHE", "on") != "off" else None
+    return ImageDeduplicator(analyze, namespace, store, budget=budget)
@@ -0,0 +1,305 @@
+import os
+import re
+import time
+import queue
+import random
+import asyncio
+import threading
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.budget import BudgetExhausted
+from freshworks_tools.tools.grafana_client import cap_timeout, out_of_time, parse_retry_after
+
+# Model per kind of call; each can be overridden with <PURPOSE>_LLM_MODEL, e.g. VISION_LLM_MODEL
+DEFAULT_MODELS = {
+    "vision": "openai/gpt-4o",
+    "relevance": "openai/gpt-4",
+    "composite": "openai/gpt-4o",
+}
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 1
+DEFAULT_MAX_BACKOFF = 60
+# Token costs assumed before the provider reports usage: one image part at the
+# default vision size, and the completion when max_tokens isn't given
+IMAGE_TOKEN_ESTIMATE = 765
+COMPLETION_TOKEN_ESTIMATE = 300
+RESET_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+RESET_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def get_model(purpose):
+    return os.environ.get(f"{purpose.upper()}_LLM_MODEL", DEFAULT_MODELS[purpose])
+
+def get_credentials():
+    # VISION_LLM_* configures every tool; OPENAI_* is still accepted for older deployments of orig.py
+    return (os.environ.get("VISION_LLM_KEY") or os.environ.get("OPENAI_API_KEY"),
+            os.environ.get("VISION_LLM_BASE_URL") or os.environ.get("OPENAI_API_BASE"))
+
+def parse_reset(value):
+    # OpenAI-style reset durations: "1s", "6m0s", "20ms", "0.5s"
+    if value is None:
+        return None
+    parts = RESET_PART.findall(str(value))
+    if not parts:
+        return parse_retry_after(value)
+    return sum(float(number) * RESET_UNITS[unit] for number, unit in parts)
+
+def estimate_tokens(messages, max_tokens=None):
+    tokens = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            tokens += len(content) // 4 + 1
+            continue
+        for part in content:
+            tokens += IMAGE_TOKEN_ESTIMATE if part.get("type") == "image_url" else len(part.get("text", "")) // 4 + 1
+    return tokens + (max_tokens or COMPLETION_TOKEN_ESTIMATE)
+
+def response_headers(response):
+    # litellm keeps provider headers on the response (or exception), prefixed with "llm_provider-"
+    headers = dict(getattr(response, "_response_headers", None) or getattr(response, "litellm_response_headers", None) or {})
+    headers.update((getattr(response, "_hidden_params", None) or {}).get("additional_headers") or {})
+    return {str(key).lower().removeprefix("llm_provider-"): value for key, value in headers.items()}
+
+class TokenBucket:
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self.refill()
+        amount = min(amount, self.capacity)
+        return 0 if self.level >= amount else (amount - self.level) / self.rate
+
+class RateLimiter:
+    # Requests- and tokens-per-minute buckets for one model. Seeded from LLM_RPM /
+    # LLM_TPM when set, otherwise unlimited until the provider's x-ratelimit-*
+    # headers say what the limits are; every response re-syncs the buckets and a
+    # 429 pauses all callers for its Retry-After. Only used on the gateway's loop.
+    def __init__(self, rpm=None, tpm=None):
+        self.buckets = {
+            "requests": TokenBucket(rpm, rpm / 60) if rpm else None,
+            "tokens": TokenBucket(tpm, tpm / 60) if tpm else None,
+        }
+        self.paused_until = 0
+
+    async def acquire(self, tokens):
+        amounts = {"requests": 1, "tokens": tokens}
+        while True:
+            wait = self.paused_until - time.monotonic()
+            for kind, bucket in self.buckets.items():
+                if bucket:
+                    wait = max(wait, bucket.wait_time(amounts[kind]))
+            if wait <= 0:
+                for kind, bucket in self.buckets.items():
+                    if bucket:
+                        bucket.level -= amounts[kind]
+                return
+            await asyncio.sleep(wait)
+
+    def sync(self, headers):
+        for kind in self.buckets:
+            try:
+                limit = float(headers[f"x-ratelimit-limit-{kind}"])
+                remaining = float(headers[f"x-ratelimit-remaining-{kind}"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if limit <= 0:
+                continue
+            # The reset header is how long until the window is full again
+            reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+            rate = (limit - remaining) / reset if reset and remaining < limit else limit / 60
+            bucket = self.buckets[kind]
+            if bucket is None or bucket.capacity != limit:
+                bucket = self.buckets[kind] = TokenBucket(limit, rate)
+            bucket.refill()
+            bucket.rate = max(rate, limit / 3600)
+            bucket.level = min(bucket.level, remaining)
+
+    def settle(self, estimated, actual):
+        # Correct the token bucket once the provider has reported real usage
+        if self.buckets["tokens"] and actual:
+            self.buckets["tokens"].level -= actual - estimated
+
+    def pause(self, delay):
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+class LLMGateway:
+    # Runs every LLM call the tools make on one asyncio loop in a daemon thread,
+    # through litellm's async API. The thread-pool pipelines share its concurrency
+    # limit, per-model rate limiters, timeouts and retries; complete(), stream()
+    # and embed() block the calling thread until their result is ready.
+    def __init__(self, concurrency=None, timeout=None, max_retries=None, backoff=None, max_backoff=None):
+        self.concurrency = int(concurrency or os.environ.get("LLM_CONCURRENCY", DEFAULT_CONCURRENCY))
+        self.timeout = float(timeout or os.environ.get("LLM_TIMEOUT", DEFAULT_TIMEOUT))
+        self.max_retries = int(max_retries if max_retries is not None else os.environ.get("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self.backoff = float(backoff if backoff is not None else os.environ.get("LLM_RETRY_BACKOFF", DEFAULT_BACKOFF))
+        self.max_backoff = float(max_backoff if max_backoff is not None else DEFAULT_MAX_BACKOFF)
+        self.rpm = float(os.environ.get("LLM_RPM", 0))
+        self.tpm = float(os.environ.get("LLM_TPM", 0))
+        self.retries = 0
+        self.limiters = {}
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-gateway", daemon=True)
+        self.thread.start()
+
+    def limiter(self, model):
+        limiter = self.limiters.get(model)
+        if limiter is None:
+            limiter = self.limiters[model] = RateLimiter(self.rpm, self.tpm)
+        return limiter
+
+    def backoff_delay(self, attempt):
+        # Full jitter keeps concurrent panels from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def retry_delay(self, error, attempt):
+        status = getattr(error, "status_code", None)
+        if status not in RETRY_STATUSES and not isinstance(error, (asyncio.TimeoutError, ConnectionError)) \
+                and type(error).__name__ not in ("Timeout", "APIConnectionError", "APITimeoutError"):
+            return None
+        retry_after = parse_retry_after(response_headers(error).get("retry-after"))
+        return min(self.max_backoff, retry_after) if retry_after is not None else self.backoff_delay(attempt)
+
+    async def admit(self, limiter, tokens):
+        await limiter.acquire(tokens)
+        await self.semaphore.acquire()
+
+    async def request(self, call, model, tokens, consume=None, budget=None, **kwargs):
+        # Retries cover the request itself; a stream that fails part-way through
+        # is not retried, since its text has already been handed out. With a run
+        # budget, waiting for a slot, each attempt and each chunk are capped at the
+        # time left and no retry is started that would outlast the deadline.
+        api_key, api_base = get_credentials()
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            if budget and budget.exhausted():
+                raise BudgetExhausted(budget.reason)
+            try:
+                await asyncio.wait_for(self.admit(limiter, tokens), budget.remaining() if budget else None)
+            except asyncio.TimeoutError:
+                budget.exhausted()
+                raise BudgetExhausted(budget.reason or "time budget exhausted")
+            try:
+                timeout = cap_timeout(self.timeout, budget.remaining() if budget else None)
+                response = await asyncio.wait_for(
+                    call(model=model, api_key=api_key, api_base=api_base, timeout=timeout, max_retries=0, **kwargs),
+                    timeout
+                )
+            except Exception as e:
+                error = e
+            else:
+                limiter.sync(response_headers(response))
+                usage = getattr(response, "usage", None)
+                limiter.settle(tokens, getattr(usage, "total_tokens", None) if usage else None)
+                return await consume(self.chunks(response, budget)) if consume else response
+            finally:
+                self.semaphore.release()
+            if budget and budget.exhausted():
+                tracing.count("llm", errors=1)
+                raise BudgetExhausted(budget.reason) from error
+            delay = self.retry_delay(error, attempt)
+            if delay is None or attempt == self.max_retries or out_of_time(budget, delay):
+                tracing.count("llm", errors=1)
+                raise error
+            if getattr(error, "status_code", None) == 429:
+                limiter.pause(delay)
+            self.retries += 1
+            tracing.count("llm", retries=1)
+            print(f"LLM call to {model} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def chunks(self, response, budget=None):
+        # A stream that stalls for longer than the request timeout is abandoned
+        iterator = response.__aiter__()
+        while True:
+            if budget and budget.exhausted():
+                raise BudgetExhausted(budget.reason)
+            try:
+                yield await asyncio.wait_for(iterator.__anext__(), cap_timeout(self.timeout, budget.remaining() if budget else None))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                if budget and budget.exhausted():
+                    raise BudgetExhausted(budget.reason)
+                raise
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def complete(self, purpose, messages, model=None, **kwargs):
+        from litellm import acompletion
+
+        tokens = estimate_tokens(messages, kwargs.get("max_tokens"))
+        return self.run(self.request(acompletion, model or get_model(purpose), tokens, messages=messages, **kwargs))
+
+    def stream(self, purpose, messages, model=None, **kwargs):
+        # Yields text deltas on the calling thread as they arrive
+        from litellm import acompletion
+
+        return self.iterate(acompletion, model or get_model(purpose), estimate_tokens(messages, kwargs.get("max_tokens")),
+                            messages=messages, stream=True, **kwargs)
+
+    def iterate(self, call, model, tokens, budget=None, **kwargs):
+        deltas = queue.Queue()
+
+        async def consume(chunks):
+            async for chunk in chunks:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    deltas.put(delta)
+
+        async def produce():
+            try:
+                await self.request(call, model, tokens, consume, budget, **kwargs)
+            except Exception as e:
+                deltas.put(e)
+            deltas.put(None)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self.loop)
+        # The first delta may wait out rate limits and every retry; after that the
+        # stream only gets the per-chunk timeout
+        timeout = (self.timeout + self.max_backoff) * (self.max_retries + 1)
+        try:
+            while True:
+                try:
+                    delta = deltas.get(timeout=cap_timeout(timeout, budget.remaining() if budget else None))
+                except queue.Empty:
+                    tracing.count("llm", errors=1)
+                    if budget and budget.exhausted():
+                        raise BudgetExhausted(budget.reason)
+                    raise TimeoutError(f"No response from {model} within {timeout:.0f}s")
+                if delta is None:
+                    return
+                if isinstance(delta, Exception):
+                    raise delta
+                timeout = self.timeout
+                yield delta
+        finally:
+            # Stops the request if the caller gave up or stopped reading early
+            future.cancel()
+
+    def embed(self, model, texts, **kwargs):
+        from litellm import aembedding
+
+        tokens = sum(len(text) // 4 + 1 for text in texts)
+        return self.run(self.request(aembedding, model, tokens, input=texts, **kwargs))
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_llm_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from freshworks_tools.tools import dashboard_cache
+from freshworks_tools.tools.pipeline import run_streaming_pipeline
+from freshworks_tools.tools.data_engine import get_grafana_base_url
+from freshworks_tools.tools.image_dedup import get_image_deduplicator, panel_key
+from freshworks_tools.tools.relevance_cache import get_relevance_cache
+from freshworks_tools.tools.grafana_client import get_grafana_client
+from freshworks_tools.tools.render_window import get_render_window
+from freshworks_tools.tools.render_cache import cached_render
+from freshworks_tools.tools.filter_alert import (
+    generate_grafana_api_url, generate_grafana_render_url, download_grafana_image, score_related_panels,
+    prefilter_panels, embedding_matches, get_prefilter_top_k, analyze_image_with_vision_model, send_slack_file_to_thread, extract_slack_response_info, VISION_PROMPT,
+)
+from freshworks_tools.tools.streaming import streaming_enabled, stream_analysis_to_thread
+from freshworks_tools.tools.budget import get_run_budget, post_skipped_summary
+
+DEFAULT_TOP_N = 10
+DEFAULT_TIME_BUDGET = 300
+DEFAULT_FETCH_CONCURRENCY = 4
+
+def split_urls(value):
+    return [url for url in re.split(r"[\s,]+", value or "") if url]
+
+def search_dashboards(grafana_base_url, api_key, org_id="1", folder_uid=None, tag=None):
+    params = {"type": "dash-db", "limit": 5000}
+    if folder_uid:
+        params["folderUIDs"] = folder_uid
+    if tag:
+        params["tag"] = tag
+    response = get_grafana_client(api_key).get(f"{grafana_base_url}/api/search", headers={"X-Grafana-Org-Id": str(org_id)}, params=params)
+    if response.status_code != 200:
+        print(f"Failed to search dashboards. Status code: {response.status_code}")
+        raise Exception("Failed to search dashboards")
+    return [f"{grafana_base_url}{item['url']}?orgId={org_id}" for item in response.json() if item.get('url')]
+
+def dashboard_name(grafana_dashboard_url):
+    path_parts = urlparse(grafana_dashboard_url).path.strip("/").split("/")
+    return path_parts[2] if len(path_parts) >= 3 else grafana_dashboard_url
+
+def fetch_dashboards(dashboard_urls, api_key, max_workers=DEFAULT_FETCH_CONCURRENCY):
+    def fetch(grafana_dashboard_url):
+        try:
+            api_url, org_id = generate_grafana_api_url(grafana_dashboard_url)
+            panels = dashboard_cache.get_dashboard_panels(api_url, org_id, api_key)
+            return {"url": grafana_dashboard_url, "name": dashboard_name(grafana_dashboard_url), "panels": panels,
+                    "api_url": api_url, "org_id": org_id,
+                    "version": dashboard_cache.get_dashboard_version(api_url, org_id, api_key)}
+        except Exception as e:
+            print(f"Failed to fetch dashboard {grafana_dashboard_url}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [dashboard for dashboard in executor.map(fetch, dashboard_urls) if dashboard]
+
+def embedding_shortlist(dashboards, alert_subject):
+    # Vector indexes are persisted per dashboard, so each one is searched on its own
+    # and the global top-K by similarity goes to the LLM as (title, global number)
+    top_k = get_prefilter_top_k()
+    matches = []
+    offset = 0
+    for dashboard in dashboards:
+        panels = dashboard["panels"]
+        numbers = {panel['id']: (offset + row, panel['title']) for row, panel in enumerate(panels)}
+        for panel_id, score in embedding_matches(panels, alert_subject, top_k, dashboard["api_url"], dashboard["org_id"]):
+            number, title = numbers[panel_id]
+            matches.append((score, number, title))
+        offset += len(panels)
+    shortlisted = sorted(matches, key=lambda match: (-match[0], match[1]))[:top_k]
+    return [(title, number) for _, number, title in shortlisted]
+
+def rank_panels(dashboards, alert_subject, top_n=DEFAULT_TOP_N, batch=True, relevance_cache=None, budget=None):
+    # Panel ids are only unique within a dashboard, so panels are numbered globally
+    # and scored in one pass; returns [(dashboard, panel, score)] best first
+    entries = [(dashboard, panel) for dashboard in dashboards for panel in dashboard["panels"]]
+    numbered = [dict(panel, id=number) for number, (_, panel) in enumerate(entries)]
+
+    prefilter = os.environ.get("RELEVANCE_PREFILTER", "off")
+    accepted, candidates = [], [(panel['title'], panel['id']) for panel in numbered]
+    if prefilter == "embedding":
+        candidates = embedding_shortlist(dashboards, alert_subject)
+    elif prefilter in ("shortlist", "ambiguous"):
+        accepted, candidates = prefilter_panels(numbered, alert_subject, prefilter)
+    if prefilter in ("shortlist", "ambiguous", "embedding"):
+        print(f"Local prefilter: {len(accepted)} panels accepted, {len(candidates)} of {len(numbered)} sent to the LLM")
+
+    scores = {number: 1.0 for _, number in accepted}
+    # Coalesced per set of dashboards, so alerts on other dashboards never wait on this one
+    dashboard_set = tuple(sorted((dashboard["api_url"], dashboard["org_id"]) for dashboard in dashboards))
+    for _, number, score in score_related_panels(candidates, alert_subject, batch, relevance_cache, dashboard_set, budget):
+        scores[number] = score
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_n]
+    return [(entries[number][0], entries[number][1], score) for number, score in ranked]
+
+def get_dashboard_urls(dashboard_urls=None, folder_uid=None, tag=None, api_key=None):
+    urls = list(dashboard_urls or []) or split_urls(os.environ.get("GRAFANA_DASHBOARD_URLS")) or split_urls(os.environ.get("GRAFANA_DASHBOARD_URL"))
+    folder_uid = folder_uid or os.environ.get("GRAFANA_FOLDER_UID")
+    tag = tag or os.environ.get("GRAFANA_DASHBOARD_TAG")
+    if folder_uid or tag:
+        grafana_base_url = os.environ.get("GRAFANA_URL") or (get_grafana_base_url(urls[0]) if urls else None)
+        if not grafana_base_url:
+            print("GRAFANA_URL is not set and no dashboard URL was given to search from")
+            raise Exception("Missing Grafana URL")
+        org_id = parse_qs(urlparse(urls[0]).query).get("orgId", ["1"])[0] if urls else os.environ.get("GRAFANA_ORG_ID", "1")
+        urls += search_dashboards(grafana_base_url.rstrip("/"), api_key, org_id, folder_uid, tag)
+    # Keep the first occurrence of each dashboard
+    return list(dict.fromkeys(urls))
+
+def main(alert_subject=None, dashboard_urls=None, folder_uid=None, tag=None):
+    alert_subject = alert_subject or os.environ.get("ALERT_SUBJECT")
+    thread_ts = os.environ.get("SLACK_THREAD_TS")
+    channel_id = os.environ.get("SLACK_CHANNEL_ID")
+    slack_token = os.environ.get("SLACK_API_TOKEN")
+    grafana_api_key = os.environ.get("GRAFANA_API_KEY")
+    top_n = int(os.environ.get("MULTI_DASHBOARD_TOP_N", DEFAULT_TOP_N))
+    # Shared by fetching, ranking, rendering and analysis across every dashboard
+    window = get_render_window()
+    budget = get_run_budget(os.environ.get("MULTI_DASHBOARD_TIME_BUDGET", DEFAULT_TIME_BUDGET))
+
+    dashboard_urls = get_dashboard_urls(dashboard_urls, folder_uid, tag, grafana_api_key)
+    if not dashboard_urls:
+        print("No dashboards to analyze")
+        return
+    print(f"Fetching {len(dashboard_urls)} dashboards")
+    dashboards = fetch_dashboards(dashboard_urls, grafana_api_key, int(os.environ.get("DASHBOARD_FETCH_CONCURRENCY", DEFAULT_FETCH_CONCURRENCY)))
+
+    batch = os.environ.get("RELATED_PANELS_MODE", "batch") != "per_panel"
+    relevance_cache = get_relevance_cache() if os.environ.get("RELEVANCE_CACHE", "on") != "off" else None
+    ranked = rank_panels(dashboards, alert_subject, top_n, batch, relevance_cache, budget)
+    total = sum(len(dashboard["panels"]) for dashboard in dashboards)
+    print(f"Selected {len(ranked)} of {total} panels across {len(dashboards)} dashboards")
+    for dashboard, panel, score in ranked:
+        print(f"  {score:.2f} {dashboard['name']}: {panel['title']}")
+
+    def render(item):
+        dashboard, panel, _ = item
+        render_url, _ = generate_grafana_render_url(dashboard["url"], panel['id'], panel.get('type'), window)
+        print(f"Generated Grafana render URL for panel '{panel['title']}': {render_url}")
+        return cached_render(render_url, dashboard["version"], lambda: download_grafana_image(render_url, grafana_api_key, panel['title'], budget), budget)
+
+    deduplicator = get_image_deduplicator(lambda image_data: analyze_image_with_vision_model(image_data, budget), "multi_dashboard", budget)
+
+    def item_key(item):
+        dashboard, panel, _ = item
+        return panel_key(dashboard["api_url"], dashboard["org_id"], panel['id'])
+
+    def analyze(item, image_data):
+        return deduplicator.analyze(image_data, panel_key=item_key(item))
+
+    def upload(item, image_data, analysis_result):
+        dashboard, panel, score = item
+        filename = f"grafana_panel_{dashboard['name']}_{panel['title'].replace(' ', '_')}.png"
+        initial_comment = (f"Grafana panel image: {panel['title']} (relevance {score:.2f})\n"
+                           f"From dashboard: {dashboard['url']}\n\n"
+                           f"Analysis:\n{analysis_result}")
+        slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, filename, initial_comment)
+        response_info = extract_slack_response_info(slack_response)
+        print(f"Slack response for panel '{panel['title']}':")
+        print(json.dumps(response_info, indent=2))
+        return response_info
+
+    if streaming_enabled():
+        # Post each image as soon as it is rendered, then stream its analysis into a reply
+        def render_and_post(item):
+            dashboard, panel, score = item
+            image_data = render(item)
+            send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data,
+                                      f"grafana_panel_{dashboard['name']}_{panel['title'].replace(' ', '_')}.png",
+                                      f"Grafana panel image: {panel['title']} (relevance {score:.2f})\nFrom dashboard: {dashboard['url']}")
+            return image_data
+
+        def analyze(item, image_data):
+            _, panel, _ = item
+            return stream_analysis_to_thread(deduplicator, image_data, VISION_PROMPT, slack_token, channel_id, thread_ts,
+                                             f"Analysis of {panel['title']}:", item_key(item))
+
+        def upload(item, image_data, analysis_result):
+            print(f"Analysis for panel '{item[1]['title']}': {analysis_result}")
+    else:
+        render_and_post = render
+
+    # Panels are posted as they finish rather than in rank order
+    _, skipped = run_streaming_pipeline(ranked, render_and_post, analyze, upload, budget=budget)
+    post_skipped_summary(slack_token, channel_id, thread_ts, budget,
+                         [f"{panel['title']} ({dashboard['name']})" for dashboard, panel, _ in skipped], len(ranked))
+    print(f"Run budget stats: {json.dumps(budget.stats())}")
+    print(f"Image dedup stats: {json.dumps(deduplicator.stats())}")
+
+    print("Processing complete")
+
+if __name__ == "__main__":
+    main()
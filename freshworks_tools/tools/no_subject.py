@@ -1,14 +1,18 @@
 import os
-import requests
 from urllib.parse import urlparse, parse_qs
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 import json
-from litellm import completion
-import base64
-from PIL import Image
-
-def generate_grafana_render_url(grafana_dashboard_url):
+from freshworks_tools.tools.image_dedup import get_image_deduplicator, panel_key
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.grafana_client import get_grafana_client
+from freshworks_tools.tools.vision_image import encode_for_vision
+from freshworks_tools.tools.render_profiles import render_params
+from freshworks_tools.tools.render_window import get_render_window, window_params
+from freshworks_tools.tools.render_cache import cached_render
+from freshworks_tools.tools import dashboard_cache
+from freshworks_tools.tools.slack_client import get_slack_client
+from freshworks_tools.tools.streaming import streaming_enabled, stream_analysis_to_thread
+
+def generate_grafana_render_url(grafana_dashboard_url, window=None):
     print(f"Received Grafana URL: {grafana_dashboard_url}")
     parsed_url = urlparse(grafana_dashboard_url)
     path_parts = parsed_url.path.strip("/").split("/")
@@ -23,31 +27,35 @@ def generate_grafana_render_url(grafana_dashboard_url):
         query_params = parse_qs(parsed_url.query)
         org_id = query_params.get("orgId", ["1"])[0]
 
-        render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&from=now-1h&to=now&width=1000&height=500"
+        render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&{window_params(window)}&{render_params('dashboard')}"
         return render_url, org_id
     except (IndexError, ValueError) as e:
         print(f"Invalid Grafana dashboard URL: {str(e)}")
         raise
 
+@tracing.traced("render", measure=len)
 def download_grafana_image(render_url, api_key):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(render_url, headers=headers)
+    response = get_grafana_client(api_key).get(render_url, stream=True)
     if response.status_code == 200:
-        filename = "grafana_dashboard.png"
-        with open(filename, "wb") as f:
-            f.write(response.content)
-        print(f"Grafana dashboard image downloaded successfully: {filename}")
-        return filename
+        # Stream the render straight into memory instead of a temp file
+        image_data = b"".join(response.iter_content(chunk_size=64 * 1024))
+        print(f"Grafana dashboard image downloaded successfully ({len(image_data)} bytes)")
+        return image_data
     else:
         print(f"Failed to download Grafana image. Status code: {response.status_code}")
+        # Unread streamed responses keep their pooled connection until closed
+        response.close()
         raise Exception("Failed to download Grafana image")
 
-def send_slack_file_to_thread(token, channel_id, thread_ts, file_path, initial_comment):
-    client = WebClient(token=token)
+@tracing.traced("slack")
+def send_slack_file_to_thread(token, channel_id, thread_ts, image_data, filename, initial_comment):
+    from slack_sdk.errors import SlackApiError
+    client = get_slack_client(token)
     try:
         response = client.files_upload_v2(
             channel=channel_id,
-            file=file_path,
+            file=image_data,
+            filename=filename,
             initial_comment=initial_comment,
             thread_ts=thread_ts
         )
@@ -65,44 +73,31 @@ def extract_slack_response_info(response):
         "timestamp": response.get("file", {}).get("timestamp")
     }
 
-def analyze_image_with_vision_model(image_path):
-    # Open the image
-    image = Image.open(image_path)
-
-    # Resize the image (e.g., to 800x800)
-    image = image.resize((800, 800))
-
-    # Save the resized image
-    image.save(image_path)
-
-    # Encode the image
-    with open(image_path, "rb") as image_file:
-        base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+VISION_PROMPT = "Analyze this Grafana dashboard image. Identify any abnormalities or significant patterns in the data. Provide a brief summary of your observations."
 
-    llm_key = os.environ["VISION_LLM_KEY"]
-    llm_base_url = os.environ["VISION_LLM_BASE_URL"]
+@tracing.traced("vision")
+def analyze_image_with_vision_model(image_data):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    # Aspect-preserving, tile-aligned JPEG for the model; the original stays full quality for Slack
+    image_url, _ = encode_for_vision(image_data)
+    tracing.count("vision", bytes=len(image_url))
 
-    # openai call
+    # openai call, rate limited and retried by the shared gateway
     try:
-        response = completion(
-            model="openai/gpt-4o",
-            api_key=llm_key,
-            base_url=llm_base_url,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Analyze this Grafana dashboard image. Identify any abnormalities or significant patterns in the data. Provide a brief summary of your observations."},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            },
+        response = get_llm_gateway().complete("vision", [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": VISION_PROMPT},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
                         },
-                    ],
-                }
-            ],
-        )
+                    },
+                ],
+            }
+        ])
     except Exception as e:
         print(f"Error for llm: {e}")
         return "Unable to analyze the image due to an error."
@@ -122,29 +117,41 @@ def main():
     grafana_api_key = os.environ.get("GRAFANA_API_KEY")
 
     # Generate Grafana render URL
-    render_url, org_id = generate_grafana_render_url(grafana_dashboard_url)
+    render_url, org_id = generate_grafana_render_url(grafana_dashboard_url, get_render_window())
     print(f"Generated Grafana render URL: {render_url}")
 
-    # Download Grafana image
-    image_path = download_grafana_image(render_url, grafana_api_key)
-
-    # Analyze the image using the vision model
-    analysis_result = analyze_image_with_vision_model(image_path)
+    # Download Grafana image, or reuse a render of the same window and dashboard version
+    parsed_url = urlparse(grafana_dashboard_url)
+    api_url = f"{parsed_url.scheme}://{parsed_url.netloc}/api/dashboards/uid/{parsed_url.path.strip('/').split('/')[1]}"
+    dashboard_version = dashboard_cache.get_dashboard_version(api_url, org_id, grafana_api_key)
+    image_data = cached_render(render_url, dashboard_version, lambda: download_grafana_image(render_url, grafana_api_key))
+
+    # Analyze the image using the vision model, reusing a recent analysis of the same render
+    deduplicator = get_image_deduplicator(analyze_image_with_vision_model, "no_subject")
+    if streaming_enabled():
+        # Post the image right away and stream the analysis into a reply
+        slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, "grafana_dashboard.png",
+                                                   f"Grafana dashboard image from: {grafana_dashboard_url}")
+        print("Slack response:")
+        print(json.dumps(extract_slack_response_info(slack_response), indent=2))
+        analysis_result = stream_analysis_to_thread(deduplicator, image_data, VISION_PROMPT, slack_token, channel_id, thread_ts, "Analysis:",
+                                                    panel_key(api_url, org_id))
+        print(f"Analysis: {analysis_result}")
+        print("Processing complete")
+        return
+
+    analysis_result = deduplicator.analyze(image_data, panel_key=panel_key(api_url, org_id))
 
     # Send image to Slack thread
     initial_comment = (f"Grafana dashboard image from: {grafana_dashboard_url}\n\n"
                        f"Analysis:\n{analysis_result}")
-    slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_path, initial_comment)
+    slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, "grafana_dashboard.png", initial_comment)
 
     # Extract relevant information from the Slack response
     response_info = extract_slack_response_info(slack_response)
     print("Slack response:")
     print(json.dumps(response_info, indent=2))
 
-    # Clean up the downloaded image
-    os.remove(image_path)
-    print("Temporary image file removed")
-
     print("Processing complete")
 
 if __name__ == "__main__":
@@ -1,11 +1,13 @@
 import os
-import requests
 from urllib.parse import urlparse, parse_qs
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 import json
-from litellm import completion
-import base64
+from freshworks_tools.tools import dashboard_cache
+from freshworks_tools.tools.grafana_client import get_grafana_client
+from freshworks_tools.tools.slack_client import get_slack_client
+from freshworks_tools.tools.vision_image import encode_for_vision
+from freshworks_tools.tools.llm_gateway import get_llm_gateway
+from freshworks_tools.tools.render_profiles import render_params
+from freshworks_tools.tools.render_window import get_render_window, window_params
 
 def generate_grafana_api_url(grafana_dashboard_url):
     print(f"Received Grafana URL: {grafana_dashboard_url}")
@@ -27,48 +29,44 @@ def generate_grafana_api_url(grafana_dashboard_url):
         print(f"Invalid Grafana dashboard URL: {str(e)}")
         raise
 
-def get_dashboard_panels(api_url, api_key):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        dashboard_data = response.json()
-        panels = dashboard_data['dashboard']['panels']
-        return [{'id': panel['id'], 'title': panel['title']} for panel in panels]
-    else:
-        print(f"Failed to fetch dashboard data. Status code: {response.status_code}")
-        raise Exception("Failed to fetch dashboard data")
+def get_dashboard_index(api_url, api_key, org_id="1"):
+    # Parsed panel lists are cached on disk and revalidated against the dashboard version;
+    # the index over them is built once per version
+    return dashboard_cache.get_dashboard_index(api_url, org_id, api_key)
 
-def filter_panels_by_subject(panels, subject):
-    return [panel for panel in panels if subject.lower() in panel['title'].lower()]
+def filter_panels_by_subject(index, subject):
+    return index.titles_containing(subject)
 
-def generate_grafana_render_url(grafana_dashboard_url, org_id, panel_id):
+def generate_grafana_render_url(grafana_dashboard_url, org_id, panel_id, panel_type=None, window=None):
     parsed_url = urlparse(grafana_dashboard_url)
     path_parts = parsed_url.path.strip("/").split("/")
     dashboard_uid = path_parts[1]
     dashboard_slug = path_parts[2]
 
-    render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d-solo/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&from=now-1h&to=now&panelId={panel_id}&width=1000&height=500"
+    render_url = f"{parsed_url.scheme}://{parsed_url.netloc}/render/d-solo/{dashboard_uid}/{dashboard_slug}?orgId={org_id}&{window_params(window)}&panelId={panel_id}&{render_params(panel_type)}"
     return render_url
 
 def download_grafana_image(render_url, api_key, panel_id):
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(render_url, headers=headers)
+    response = get_grafana_client(api_key).get(render_url, stream=True)
     if response.status_code == 200:
-        filename = f"grafana_panel_{panel_id}.png"
-        with open(filename, "wb") as f:
-            f.write(response.content)
-        print(f"Grafana panel image downloaded successfully: {filename}")
-        return filename
+        # Stream the render straight into memory instead of a temp file
+        image_data = b"".join(response.iter_content(chunk_size=64 * 1024))
+        print(f"Grafana panel image downloaded successfully for panel {panel_id} ({len(image_data)} bytes)")
+        return image_data
     else:
         print(f"Failed to download Grafana image. Status code: {response.status_code}")
+        # Unread streamed responses keep their pooled connection until closed
+        response.close()
         raise Exception("Failed to download Grafana image")
 
-def send_slack_file_to_thread(token, channel_id, thread_ts, file_path, initial_comment):
-    client = WebClient(token=token)
+def send_slack_file_to_thread(token, channel_id, thread_ts, image_data, filename, initial_comment):
+    from slack_sdk.errors import SlackApiError
+    client = get_slack_client(token)
     try:
         response = client.files_upload_v2(
             channel=channel_id,
-            file=file_path,
+            file=image_data,
+            filename=filename,
             initial_comment=initial_comment,
             thread_ts=thread_ts
         )
@@ -86,9 +84,8 @@ def extract_slack_response_info(response):
         "timestamp": response.get("file", {}).get("timestamp")
     }
 
-def analyze_image_with_vision_model(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded_image = base64.b64encode(image_file.read()).decode('utf-8')
+def analyze_image_with_vision_model(image_data):
+    image_url, _ = encode_for_vision(image_data)
 
     messages = [
         {
@@ -100,19 +97,15 @@ def analyze_image_with_vision_model(image_path):
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/png;base64,{encoded_image}"
+                    "image_url": image_url
                 }
             ]
         }
     ]
 
     try:
-        response = completion(
-            model="gpt-4-vision-preview",
-            messages=messages,
-            api_base=os.environ.get("OPENAI_API_BASE"),
-            api_key=os.environ.get("OPENAI_API_KEY")
-        )
+        # The gateway falls back to OPENAI_API_KEY/OPENAI_API_BASE when VISION_LLM_* isn't set
+        response = get_llm_gateway().complete("vision", messages)
         return response.choices[0].message.content
     except Exception as e:
         print(f"Error analyzing image with vision model: {e}")
@@ -131,37 +124,34 @@ api_url, org_id = generate_grafana_api_url(grafana_dashboard_url)
 print(f"Generated Grafana API URL: {api_url}")
 
 # Get all panels from the dashboard
-all_panels = get_dashboard_panels(api_url, grafana_api_key)
+index = get_dashboard_index(api_url, grafana_api_key, org_id)
 
 # Filter panels based on the subject
-filtered_panels = filter_panels_by_subject(all_panels, subject)
+filtered_panels = filter_panels_by_subject(index, subject)
 
 if not filtered_panels:
     print(f"No panels found matching the subject: {subject}")
 else:
+    window = get_render_window()
     for panel in filtered_panels:
         # Generate Grafana render URL for each panel
-        render_url = generate_grafana_render_url(grafana_dashboard_url, org_id, panel['id'])
+        render_url = generate_grafana_render_url(grafana_dashboard_url, org_id, panel['id'], panel.get('type'), window)
         print(f"Generated Grafana render URL for panel {panel['id']}: {render_url}")
 
         # Download Grafana image
-        image_path = download_grafana_image(render_url, grafana_api_key, panel['id'])
+        image_data = download_grafana_image(render_url, grafana_api_key, panel['id'])
 
         # Analyze the image using the vision model
-        analysis_result = analyze_image_with_vision_model(image_path)
+        analysis_result = analyze_image_with_vision_model(image_data)
 
         # Send image to Slack thread
         initial_comment = (f"Grafana dashboard image for panel '{panel['title']}' from: {grafana_dashboard_url}\n\n"
                            f"Analysis:\n{analysis_result}")
-        slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_path, initial_comment)
+        slack_response = send_slack_file_to_thread(slack_token, channel_id, thread_ts, image_data, f"grafana_panel_{panel['id']}.png", initial_comment)
 
         # Extract relevant information from the Slack response
         response_info = extract_slack_response_info(slack_response)
         print(f"Slack response for panel {panel['id']}:")
         print(json.dumps(response_info, indent=2))
 
-        # Clean up the downloaded image
-        os.remove(image_path)
-        print(f"Temporary image file removed for panel {panel['id']}")
-
 print("Processing complete")
\ No newline at end of file
@@ -0,0 +1,166 @@
+import os
+import hashlib
+import tempfile
+from freshworks_tools.tools import cache
+from freshworks_tools.tools.dashboard_model import extract_metric_names
+from freshworks_tools.tools.panel_ranker import stemmed_tokens
+from freshworks_tools.tools.singleflight import coalesce
+
+DEFAULT_EMBEDDING_MODEL = "openai/text-embedding-3-small"
+LOCAL_EMBEDDING_MODEL = "local:hashing"
+DEFAULT_TOP_K = 20
+DEFAULT_MIN_SCORE = 0.3
+EMBEDDING_BATCH_SIZE = 256
+
+def panel_text(panel):
+    parts = [panel['title'], panel.get('description') or "", panel.get('row') or ""]
+    parts += extract_metric_names(panel.get('targets', []))
+    return "\n".join(part for part in parts if part)
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class HashingEmbedder:
+    # Deterministic, offline stand-in for an embedding model: hashed stemmed tokens
+    # and character trigrams, L2-normalized
+    name = LOCAL_EMBEDDING_MODEL
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def features(self, text):
+        tokens = stemmed_tokens(text)
+        features = list(tokens)
+        for token in tokens:
+            padded = f"#{token}#"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                digest = hashlib.md5(feature.encode("utf-8")).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+class LiteLLMEmbedder:
+    def __init__(self, model):
+        self.name = model
+
+    def embed(self, texts):
+        import numpy as np
+        from freshworks_tools.tools.llm_gateway import get_llm_gateway
+
+        vectors = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            response = get_llm_gateway().embed(self.name, texts[start:start + EMBEDDING_BATCH_SIZE])
+            vectors += [item["embedding"] for item in response.data]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+def get_embedder(model=None):
+    model = model or os.environ.get("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    if model == LOCAL_EMBEDDING_MODEL:
+        return HashingEmbedder()
+    return LiteLLMEmbedder(model)
+
+class PanelEmbeddingIndex:
+    # One directory per dashboard and embedding model: a vectors-*.npy file holds
+    # the normalized matrix (memory-mapped on load), meta.json names that file and
+    # has the row -> panel id map and content hashes used to re-embed only panels
+    # that changed
+    def __init__(self, api_url, org_id, embedder):
+        self.embedder = embedder
+        self.path = os.path.join(cache.get_cache_dir("embeddings"), cache.cache_key(api_url, org_id, embedder.name))
+        os.makedirs(self.path, exist_ok=True)
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self.ids = []
+        self.vectors = None
+        self.embedded = 0
+
+    def load(self):
+        import numpy as np
+
+        meta = cache.read_json(self.meta_path)
+        if not meta or meta.get("model") != self.embedder.name or not meta.get("vectors"):
+            return [], [], None
+        try:
+            vectors = np.load(os.path.join(self.path, meta["vectors"]), mmap_mode="r")
+        except (OSError, ValueError):
+            return [], [], None
+        if vectors.ndim != 2 or vectors.shape[0] != len(meta["ids"]):
+            return [], [], None
+        return meta["ids"], meta["hashes"], vectors
+
+    def update(self, panels):
+        ids = [panel['id'] for panel in panels]
+        texts = [panel_text(panel) for panel in panels]
+        hashes = [content_hash(text) for text in texts]
+        self.ids = ids
+        # One process updates a dashboard's index at a time; the others then load its result
+        with coalesce("embeddings", self.path):
+            old_ids, old_hashes, old_vectors = self.load()
+            if old_ids == ids and old_hashes == hashes:
+                self.vectors = old_vectors
+            else:
+                self.save(self.merge(texts, hashes, old_ids, old_hashes, old_vectors), hashes)
+        return self
+
+    def merge(self, texts, hashes, old_ids, old_hashes, old_vectors):
+        import numpy as np
+
+        ids = self.ids
+        existing = {(panel_id, digest): row for row, (panel_id, digest) in enumerate(zip(old_ids, old_hashes))}
+        stale = [row for row in range(len(texts)) if (ids[row], hashes[row]) not in existing]
+        fresh = self.embedder.embed([texts[row] for row in stale]) if stale else None
+        self.embedded = len(stale)
+        fresh_rows = {row: index for index, row in enumerate(stale)}
+        dim = fresh.shape[1] if fresh is not None else old_vectors.shape[1]
+        vectors = np.empty((len(texts), dim), dtype=np.float32)
+        for row in range(len(texts)):
+            if row in fresh_rows:
+                vectors[row] = fresh[fresh_rows[row]]
+            else:
+                vectors[row] = old_vectors[existing[(ids[row], hashes[row])]]
+        return vectors
+
+    def save(self, vectors, hashes):
+        import numpy as np
+
+        # Every matrix gets a new file and meta.json is replaced atomically to name
+        # it, so readers always load a matrix together with its own ids and hashes
+        fd, path = tempfile.mkstemp(dir=self.path, prefix="vectors-", suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, vectors)
+            cache.write_json(self.meta_path, {"model": self.embedder.name, "vectors": os.path.basename(path),
+                                              "ids": self.ids, "hashes": hashes})
+        except Exception:
+            os.remove(path)
+            raise
+        for name in os.listdir(self.path):
+            # Readers that already mapped an older matrix keep it until they close it
+            if name.startswith("vectors") and name.endswith(".npy") and name != os.path.basename(path):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+        self.vectors = np.load(path, mmap_mode="r")
+
+    def search(self, text, top_k=DEFAULT_TOP_K, min_score=DEFAULT_MIN_SCORE):
+        import numpy as np
+
+        if self.vectors is None or not len(self.ids):
+            return []
+        query = self.embedder.embed([text])[0]
+        scores = np.asarray(self.vectors @ query)
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top if scores[row] >= min_score]
@@ -0,0 +1,106 @@
+import math
+from difflib import SequenceMatcher, get_close_matches
+from freshworks_tools.tools.dashboard_model import tokenize, extract_metric_names
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 2
+FUZZY_WEIGHT = 0.3
+DEFAULT_TOP_K = 20
+DEFAULT_ACCEPT_SCORE = 0.8
+DEFAULT_REJECT_SCORE = 0.1
+
+def stem(token):
+    # Just enough suffix stripping to match "latencies"/"latency", "errors"/"error"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix) and not token.endswith("ss"):
+            return token[:-len(suffix)]
+    return token
+
+def stemmed_tokens(text):
+    return [stem(token) for token in tokenize(text)]
+
+def panel_terms(panel):
+    # Title tokens count double; metric names contribute both whole and split on '_'/':'
+    terms = stemmed_tokens(panel['title']) * TITLE_WEIGHT
+    terms += stemmed_tokens(panel.get('description'))
+    terms += stemmed_tokens(panel.get('row'))
+    for metric in extract_metric_names(panel.get('targets', [])):
+        terms.append(metric.lower())
+        terms += stemmed_tokens(metric.replace("_", " ").replace(":", " "))
+    return terms
+
+class PanelRanker:
+    def __init__(self, panels):
+        self.panels = panels
+        self.doc_terms = []
+        self.doc_freq = {}
+        for panel in panels:
+            counts = {}
+            for term in panel_terms(panel):
+                counts[term] = counts.get(term, 0) + 1
+            self.doc_terms.append((counts, sum(counts.values())))
+            for term in counts:
+                self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+        self.avg_length = sum(length for _, length in self.doc_terms) / len(self.doc_terms) if self.doc_terms else 0
+        self.vocabulary = list(self.doc_freq)
+
+    def query_terms(self, subject):
+        # Subject words missing from the dashboard vocabulary are replaced by close
+        # spellings (plurals, typos, truncations) when there are any
+        terms = {}
+        for token in tokenize(subject):
+            if token not in self.doc_freq:
+                token = stem(token)
+            if token in self.doc_freq:
+                terms[token] = 1.0
+            else:
+                for match in get_close_matches(token, self.vocabulary, n=2, cutoff=0.8):
+                    terms[match] = max(terms.get(match, 0), 0.5)
+        return terms
+
+    def idf(self, term):
+        n = len(self.doc_terms)
+        df = self.doc_freq.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def rank(self, subject):
+        terms = self.query_terms(subject)
+        bm25 = []
+        for counts, length in self.doc_terms:
+            score = 0.0
+            for term, weight in terms.items():
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_length)
+                    score += weight * self.idf(term) * tf * (BM25_K1 + 1) / norm
+            bm25.append(score)
+
+        # A panel containing every query term about once scores close to 1
+        full_match = sum(weight * self.idf(term) for term, weight in terms.items()) or 1.0
+        subject_lower = (subject or "").lower()
+        fuzzy_by_title = {}
+        ranked = []
+        for panel, score in zip(self.panels, bm25):
+            title = panel['title'].lower()
+            if title not in fuzzy_by_title:
+                fuzzy_by_title[title] = SequenceMatcher(None, subject_lower, title).ratio()
+            fuzzy = fuzzy_by_title[title]
+            ranked.append((panel, (1 - FUZZY_WEIGHT) * min(1.0, score / full_match) + FUZZY_WEIGHT * fuzzy))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def shortlist(self, subject, top_k=DEFAULT_TOP_K, min_score=0.0):
+        return [(panel, score) for panel, score in self.rank(subject)[:top_k] if score > min_score]
+
+    def triage(self, subject, accept_score=DEFAULT_ACCEPT_SCORE, reject_score=DEFAULT_REJECT_SCORE):
+        # Clear matches are accepted and clear misses dropped; only the rest need the LLM
+        accepted, ambiguous = [], []
+        for panel, score in self.rank(subject):
+            if score >= accept_score:
+                accepted.append((panel, score))
+            elif score > reject_score:
+                ambiguous.append((panel, score))
+        return accepted, ambiguous
@@ -0,0 +1,141 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from freshworks_tools.tools.budget import BudgetExhausted
+
+DEFAULT_RENDER_CONCURRENCY = 4
+DEFAULT_ANALYZE_CONCURRENCY = 4
+
+def get_stage_limits():
+    render_limit = int(os.environ.get("RENDER_CONCURRENCY", DEFAULT_RENDER_CONCURRENCY))
+    analyze_limit = int(os.environ.get("VISION_CONCURRENCY", DEFAULT_ANALYZE_CONCURRENCY))
+    return max(1, render_limit), max(1, analyze_limit)
+
+def run_panel_pipeline(panels, render, analyze, upload, render_limit=None, analyze_limit=None, budget=None):
+    # render(panel) -> image, analyze(panel, image) -> analysis, upload(panel, image, analysis)
+    # Render and analysis run concurrently, each stage bounded by its own semaphore.
+    # Uploads run on the calling thread in the original panel order so the Slack
+    # thread reads the same as a sequential run. With a RunBudget, nothing new
+    # starts once it is exhausted and past its deadline only finished panels are
+    # posted; the rest are recorded with budget.skip().
+    default_render, default_analyze = get_stage_limits()
+    render_limit = render_limit or default_render
+    analyze_limit = analyze_limit or default_analyze
+    render_slots = threading.Semaphore(render_limit)
+    analyze_slots = threading.Semaphore(analyze_limit)
+    process = budgeted_process(render, analyze, render_slots, analyze_slots, budget)
+
+    results = []
+    executor = ThreadPoolExecutor(max_workers=render_limit + analyze_limit)
+    futures = [executor.submit(process, panel) for panel in panels]
+    try:
+        for panel, future in zip(panels, futures):
+            try:
+                result = future.result(timeout=budget.remaining() if budget else None)
+            except TimeoutError:
+                budget.exhausted()
+                result = None
+            except Exception as e:
+                print(f"Failed to process panel {panel}: {e}")
+                results.append(None)
+                continue
+            if result is None:
+                budget.skip(panel)
+                results.append(None)
+                continue
+            results.append(upload(panel, *result))
+    finally:
+        # Work still queued or in flight once the budget runs out is abandoned
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+def budgeted_process(render, analyze, render_slots, analyze_slots, budget):
+    # process(panel) -> (image, analysis), or None when the budget ran out first
+    def process(panel):
+        with render_slots:
+            if budget and budget.exhausted():
+                return None
+            try:
+                image = render(panel)
+            except BudgetExhausted:
+                return None
+        with analyze_slots:
+            if budget and budget.exhausted():
+                return None
+            try:
+                analysis = analyze(panel, image)
+            except BudgetExhausted:
+                return None
+        return image, analysis
+    return process
+
+def run_streaming_pipeline(panels, render, analyze, upload, render_limit=None, analyze_limit=None, budget=None):
+    # Like run_panel_pipeline, but each panel is uploaded as soon as it finishes.
+    # Returns the upload results in completion order and the panels that were skipped.
+    default_render, default_analyze = get_stage_limits()
+    render_limit = render_limit or default_render
+    analyze_limit = analyze_limit or default_analyze
+    render_slots = threading.Semaphore(render_limit)
+    analyze_slots = threading.Semaphore(analyze_limit)
+    process = budgeted_process(render, analyze, render_slots, analyze_slots, budget)
+
+    results = []
+    executor = ThreadPoolExecutor(max_workers=render_limit + analyze_limit)
+    futures = {executor.submit(process, panel): panel for panel in panels}
+    try:
+        for future in as_completed(futures, timeout=budget.remaining() if budget else None):
+            panel = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Failed to process panel {panel}: {e}")
+                continue
+            if result is None:
+                budget.skip(panel)
+                continue
+            results.append(upload(panel, *result))
+    except TimeoutError:
+        print(f"Time budget exhausted with {len(futures)} panels unfinished")
+        budget.exhausted()
+        for panel in futures.values():
+            budget.skip(panel)
+    finally:
+        # Renders already in flight are abandoned rather than waited for
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results, list(budget.skipped) if budget else []
+
+def run_grouped_pipeline(panels, render, analyze_group, upload, render_limit=None, budget=None):
+    # For analysis that needs every render at once (e.g. composite grids):
+    # render concurrently, call analyze_group(panels, images) -> analyses once,
+    # then upload in the original panel order. Renders stop once budget is exhausted,
+    # and panels analyze_group returns None for (grids it skipped) are not uploaded.
+    render_limit = render_limit or get_stage_limits()[0]
+
+    def process(panel):
+        if budget and budget.exhausted():
+            budget.skip(panel)
+            return None
+        try:
+            return render(panel)
+        except BudgetExhausted:
+            budget.skip(panel)
+            return None
+        except Exception as e:
+            print(f"Failed to process panel {panel}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=render_limit) as executor:
+        images = list(executor.map(process, panels))
+
+    rendered = [(panel, image) for panel, image in zip(panels, images) if image is not None]
+    if budget and budget.exhausted():
+        analyses = [None] * len(rendered)
+    else:
+        analyses = analyze_group([panel for panel, _ in rendered], [image for _, image in rendered]) if rendered else []
+    results = []
+    for (panel, image), analysis in zip(rendered, analyses):
+        if analysis is None and budget:
+            budget.skip(panel)
+            continue
+        results.append(upload(panel, image, analysis))
+    return results
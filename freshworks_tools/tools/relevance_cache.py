@@ -0,0 +1,113 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from freshworks_tools.tools import cache, tracing
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 50000
+
+def normalize(text):
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+class RelevanceCache:
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or os.path.join(cache.get_cache_dir("relevance"), "relevance.sqlite3")
+        self.ttl = float(ttl if ttl is not None else os.environ.get("RELEVANCE_CACHE_TTL", DEFAULT_TTL))
+        self.max_entries = int(max_entries if max_entries is not None else os.environ.get("RELEVANCE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.hits = 0
+        self.misses = 0
+        # Counter increments not yet written to the database; see flush()
+        self.pending = {"hits": 0, "misses": 0}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS relevance (
+                    subject TEXT NOT NULL,
+                    panel_title TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (subject, panel_title, model)
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS relevance_last_used ON relevance (last_used)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def get(self, subject, panel_title, model):
+        return self.get_many(subject, [panel_title], model).get(panel_title)
+
+    def get_many(self, subject, panel_titles, model, count=True):
+        # {panel_title: score} for the titles with a fresh decision, looked up and
+        # marked as used in one transaction. count=False leaves the hit/miss
+        # counters alone, for a second look at titles already counted as misses.
+        subject = normalize(subject)
+        now = time.time()
+        scores = {}
+        with self.lock, self.conn:
+            for panel_title in panel_titles:
+                row = self.conn.execute(
+                    "SELECT score, created_at FROM relevance WHERE subject = ? AND panel_title = ? AND model = ?",
+                    (subject, normalize(panel_title), model)
+                ).fetchone()
+                if row is not None and now - row[1] < self.ttl:
+                    scores[panel_title] = row[0]
+            if scores:
+                self.conn.executemany(
+                    "UPDATE relevance SET last_used = ? WHERE subject = ? AND panel_title = ? AND model = ?",
+                    [(now, subject, normalize(panel_title), model) for panel_title in scores]
+                )
+            if count:
+                hits, misses = len(scores), len(panel_titles) - len(scores)
+                self.hits += hits
+                self.misses += misses
+                self.pending["hits"] += hits
+                self.pending["misses"] += misses
+                tracing.count("relevance", cache_hits=hits, cache_misses=misses)
+        return scores
+
+    def set(self, subject, panel_title, model, score):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO relevance VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize(subject), normalize(panel_title), model, float(score), now, now)
+            )
+
+    def evict(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM relevance WHERE created_at < ?", (time.time() - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM relevance WHERE rowid IN (SELECT rowid FROM relevance ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def flush(self):
+        # Adds this run's hits and misses to the all-time counters in one write
+        with self.lock, self.conn:
+            pending = [(name, value) for name, value in self.pending.items() if value]
+            self.conn.executemany(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", pending
+            )
+            self.pending = dict.fromkeys(self.pending, 0)
+
+    def stats(self):
+        with self.lock:
+            totals = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+            pending = dict(self.pending)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0) + pending["hits"],
+            "total_misses": totals.get("misses", 0) + pending["misses"],
+        }
+
+_default_cache = None
+
+def get_relevance_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RelevanceCache()
+    return _default_cache
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+from freshworks_tools.tools import cache, tracing
+from freshworks_tools.tools.singleflight import coalesce
+
+DEFAULT_MAX_ENTRIES = 500
+
+class RenderCache:
+    # Rendered PNGs on disk, one file per (render URL, dashboard version). The render
+    # URL carries the dashboard, org, panel id, bucketed time window and size, so
+    # repeat and overlapping alerts reuse renders until the dashboard changes.
+    def __init__(self, cache_dir=None, max_entries=None):
+        self.cache_dir = cache_dir or cache.get_cache_dir("renders")
+        self.max_entries = int(max_entries if max_entries is not None else os.environ.get("RENDER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def path(self, render_url, dashboard_version):
+        return os.path.join(self.cache_dir, cache.cache_key(render_url, dashboard_version) + ".png")
+
+    def get(self, render_url, dashboard_version):
+        path = self.path(render_url, dashboard_version)
+        try:
+            with open(path, "rb") as f:
+                image_data = f.read()
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            tracing.count("render", cache_misses=1)
+            return None
+        cache.touch(path)
+        with self.lock:
+            self.hits += 1
+        tracing.count("render", cache_hits=1)
+        return image_data
+
+    def set(self, render_url, dashboard_version, image_data):
+        path = self.path(render_url, dashboard_version)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(image_data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        cache.evict_oldest(self.cache_dir, self.max_entries, ".png")
+
+    def fetch(self, render_url, dashboard_version, download, budget=None):
+        # Without a known dashboard version a cached render could be stale, so skip the cache
+        if dashboard_version is None:
+            return download()
+        image_data = self.get(render_url, dashboard_version)
+        if image_data is not None:
+            print(f"Using cached render for {render_url}")
+            return image_data
+        # The URL pins the dashboard, panel and bucketed window, so concurrent alerts
+        # asking for the same render wait for one download instead of each hitting Grafana
+        with coalesce("render", render_url, dashboard_version, timeout=budget.remaining() if budget else None) as waited:
+            image_data = self.get(render_url, dashboard_version) if waited else None
+            if image_data is not None:
+                print(f"Using render from a concurrent alert for {render_url}")
+                return image_data
+            image_data = download()
+            self.set(render_url, dashboard_version, image_data)
+        return image_data
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+_render_cache = None
+_render_cache_lock = threading.Lock()
+
+def get_render_cache():
+    global _render_cache
+    if os.environ.get("RENDER_CACHE", "on") == "off":
+        return None
+    with _render_cache_lock:
+        if _render_cache is None:
+            _render_cache = RenderCache()
+        return _render_cache
+
+def cached_render(render_url, dashboard_version, download, budget=None):
+    render_cache = get_render_cache()
+    return render_cache.fetch(render_url, dashboard_version, download, budget) if render_cache else download()
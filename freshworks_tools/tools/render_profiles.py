@@ -0,0 +1,53 @@
+import os
+
+# (width, height, scale) per panel type. Wide panels keep the old 1000x500; small
+# single-value panels don't need it and tables/logs need the extra rows.
+DEFAULT_PROFILE = (1000, 500, 1)
+PROFILES = {
+    "timeseries": (1000, 500, 1),
+    "graph": (1000, 500, 1),
+    "barchart": (1000, 500, 1),
+    "heatmap": (1000, 500, 1),
+    "state-timeline": (1000, 400, 1),
+    "status-history": (1000, 400, 1),
+    "stat": (500, 250, 1),
+    "singlestat": (500, 250, 1),
+    "gauge": (500, 300, 1),
+    "bargauge": (800, 400, 1),
+    "piechart": (600, 400, 1),
+    "text": (800, 400, 1),
+    "table": (1200, 600, 1),
+    "table-old": (1200, 600, 1),
+    "logs": (1200, 600, 1),
+    "dashboard": (1000, 500, 1),
+}
+
+def parse_profile(value):
+    # "1200x600" or "1200x600@2"
+    size, _, scale = value.partition("@")
+    width, height = size.lower().split("x")
+    return int(width), int(height), float(scale) if scale else 1
+
+def get_overrides():
+    # RENDER_PROFILES="stat=400x200,table=1200x800@2,default=1000x500"
+    overrides = {}
+    for item in os.environ.get("RENDER_PROFILES", "").split(","):
+        name, _, value = item.strip().partition("=")
+        if not value:
+            continue
+        try:
+            overrides[name] = parse_profile(value)
+        except ValueError:
+            print(f"Ignoring invalid render profile '{item}'")
+    return overrides
+
+def get_render_profile(panel_type):
+    overrides = get_overrides()
+    return overrides.get(panel_type) or PROFILES.get(panel_type) or overrides.get("default") or DEFAULT_PROFILE
+
+def render_params(panel_type):
+    width, height, scale = get_render_profile(panel_type)
+    params = f"width={width}&height={height}"
+    if scale != 1:
+        params += f"&scale={scale:g}"
+    return params
@@ -0,0 +1,49 @@
+import os
+import re
+import math
+import time
+from datetime import datetime, timezone
+
+DEFAULT_LOOKBACK = "1h"
+DEFAULT_BUCKET = "1m"
+DURATION = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h|d|w)?$")
+UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_duration(value):
+    # "90", "90s", "15m", "1h", "7d"; bare numbers are seconds
+    match = DURATION.match(str(value).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    return float(match.group(1)) * UNITS[match.group(2) or "s"]
+
+def parse_alert_time(value):
+    # Epoch seconds or milliseconds, or an ISO 8601 timestamp such as Grafana's startsAt
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        number = float(value)
+        return number / 1000 if number > 1e11 else number
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        print(f"Ignoring unparseable alert time: {value}")
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def get_render_window(alert_time=None):
+    # (from_ms, to_ms) ending at the alert time, or now, rounded up to a bucket boundary
+    # so alerts firing within the same bucket ask for identical renders
+    alert_time = parse_alert_time(alert_time or os.environ.get("ALERT_TIME")) or time.time()
+    lookback = parse_duration(os.environ.get("RENDER_LOOKBACK", DEFAULT_LOOKBACK))
+    bucket = parse_duration(os.environ.get("RENDER_WINDOW_BUCKET", DEFAULT_BUCKET)) or 1
+    end = math.ceil(alert_time / bucket) * bucket
+    return int((end - lookback) * 1000), int(end * 1000)
+
+def window_params(window=None):
+    time_from, time_to = window or get_render_window()
+    return f"from={time_from}&to={time_to}"
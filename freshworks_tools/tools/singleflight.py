@@ -0,0 +1,87 @@
+import os
+import time
+from contextlib import contextmanager
+from freshworks_tools.tools import cache, tracing
+
+DEFAULT_TIMEOUT = 120
+POLL_INTERVAL = 0.05
+
+def coalescing_enabled():
+    return os.environ.get("ALERT_COALESCING", "on") != "off"
+
+def lock_path(key):
+    # One lock file per key, so unrelated work never waits on a shared stripe
+    return os.path.join(cache.get_cache_dir("locks"), f"{key}.lock")
+
+def acquire(path, timeout):
+    # Exclusive flock, polled so a stuck leader can't block followers forever.
+    # Each call opens its own file description, so threads in one process
+    # exclude each other as well as separate processes do.
+    import fcntl
+
+    deadline = time.monotonic() + timeout
+    waited = False
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    print(f"Gave up waiting for {path} after {timeout:.0f}s, continuing without it")
+                    return None, True
+                waited = True
+                time.sleep(POLL_INTERVAL)
+        # The previous holder removes the file on release; if that happened while
+        # we waited, our lock is on the removed file and the current one is retried
+        try:
+            current = os.stat(path)
+            locked = os.fstat(fd)
+            if (current.st_dev, current.st_ino) == (locked.st_dev, locked.st_ino):
+                return fd, waited
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+def release(path, fd):
+    import fcntl
+
+    # Removed while still held, so the directory only holds locks in use
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+@contextmanager
+def coalesce(*parts, timeout=None):
+    # Single flight across processes: concurrent alerts running the same step
+    # (keyed by parts, e.g. a dashboard or a render of one dashboard panel and
+    # time bucket) run it one at a time. Yields True when another holder went
+    # first, so the caller should re-check the shared cache before repeating the
+    # work; every caller still gets its own result to post to its own thread.
+    # timeout (e.g. what is left of the run's budget) caps ALERT_COALESCING_TIMEOUT.
+    if not coalescing_enabled():
+        yield False
+        return
+    limit = float(os.environ.get("ALERT_COALESCING_TIMEOUT", DEFAULT_TIMEOUT))
+    if timeout is not None:
+        limit = min(limit, timeout)
+    path = lock_path(cache.cache_key(*parts))
+    try:
+        fd, waited = acquire(path, limit)
+    except (ImportError, OSError) as e:
+        # No flock (e.g. Windows) or an unwritable cache dir: run uncoalesced
+        print(f"Alert coalescing unavailable: {e}")
+        yield False
+        return
+    if waited:
+        tracing.count("coalesce", cache_hits=1)
+    try:
+        yield waited
+    finally:
+        if fd is not None:
+            release(path, fd)
@@ -0,0 +1,85 @@
+import os
+import threading
+from freshworks_tools.tools import tracing
+
+DEFAULT_RATE_LIMIT_RETRIES = 5
+# Slack shows at most 10 files on a single message
+MAX_FILES_PER_MESSAGE = 10
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_slack_client(token):
+    from slack_sdk import WebClient
+    from slack_sdk.http_retry.builtin_handlers import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
+
+    with _clients_lock:
+        client = _clients.get(token)
+        if client is None:
+            # 429 responses are retried after the Retry-After Slack sends instead of being dropped
+            retries = int(os.environ.get("SLACK_RATE_LIMIT_RETRIES", DEFAULT_RATE_LIMIT_RETRIES))
+            client = _clients[token] = WebClient(
+                token=token,
+                # Overridable for proxies and the offline benchmark harness
+                base_url=os.environ.get("SLACK_API_BASE_URL", WebClient.BASE_URL),
+                retry_handlers=[ConnectionErrorRetryHandler(), RateLimitErrorRetryHandler(max_retry_count=retries)]
+            )
+        return client
+
+def get_upload_batch_size():
+    return max(1, min(MAX_FILES_PER_MESSAGE, int(os.environ.get("SLACK_UPLOAD_BATCH_SIZE", 1))))
+
+@tracing.traced("slack")
+def upload_files_to_thread(token, channel_id, thread_ts, file_uploads, initial_comment):
+    from slack_sdk.errors import SlackApiError
+
+    tracing.count("slack", bytes=sum(len(upload["file"]) for upload in file_uploads))
+    try:
+        return get_slack_client(token).files_upload_v2(
+            channel=channel_id,
+            file_uploads=file_uploads,
+            initial_comment=initial_comment,
+            thread_ts=thread_ts
+        )
+    except SlackApiError as e:
+        print(f"Error sending files to Slack thread: {e}")
+        raise
+
+class ThreadUploader:
+    # Collects panel images in order and posts them to the thread batch_size at a
+    # time, one files_upload_v2 call per batch with a combined analysis comment
+    def __init__(self, token, channel_id, thread_ts, header, batch_size=None):
+        self.token = token
+        self.channel_id = channel_id
+        self.thread_ts = thread_ts
+        self.header = header
+        self.batch_size = batch_size or get_upload_batch_size()
+        self.pending = []
+        self.responses = []
+
+    def add(self, title, image_data, filename, analysis):
+        self.pending.append((title, image_data, filename, analysis))
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        if not self.pending:
+            return None
+        batch, self.pending = self.pending, []
+        file_uploads = [{"file": image_data, "filename": filename, "title": title} for title, image_data, filename, _ in batch]
+        sections = [f"*{title}*\nAnalysis:\n{analysis}" for title, _, _, analysis in batch]
+        initial_comment = self.header + "\n\n" + "\n\n".join(sections)
+        response = upload_files_to_thread(self.token, self.channel_id, self.thread_ts, file_uploads, initial_comment)
+        self.responses.append(response)
+        return response
+
+def extract_upload_info(response):
+    files = response.get("files") or [response.get("file", {})]
+    return [{
+        "ok": response.get("ok"),
+        "file_id": file.get("id"),
+        "file_name": file.get("name"),
+        "file_url": file.get("url_private"),
+        "timestamp": file.get("timestamp")
+    } for file in files]
@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from freshworks_tools.tools import tracing
+from freshworks_tools.tools.budget import BudgetExhausted
+from freshworks_tools.tools.image_dedup import ANALYSIS_ERROR
+from freshworks_tools.tools.slack_client import get_slack_client
+from freshworks_tools.tools.vision_image import encode_for_vision
+
+# chat.update is a Tier 3 method (~50 calls a minute), so one update every 1.2s
+# per channel stays under the limit however many panels are streaming
+DEFAULT_UPDATE_INTERVAL = 1.2
+PLACEHOLDER = "_Analyzing..._"
+
+def streaming_enabled():
+    return os.environ.get("VISION_STREAMING", "off") == "on"
+
+class UpdateThrottle:
+    # Spaces chat.update calls in one channel at least `interval` seconds apart
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_at = 0
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            if now < self.next_at:
+                return False
+            self.next_at = now + self.interval
+            return True
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0, self.next_at - now)
+            self.next_at = now + wait + self.interval
+        if wait:
+            time.sleep(wait)
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def get_update_throttle(channel_id):
+    with _throttles_lock:
+        throttle = _throttles.get(channel_id)
+        if throttle is None:
+            interval = float(os.environ.get("SLACK_UPDATE_INTERVAL", DEFAULT_UPDATE_INTERVAL))
+            throttle = _throttles[channel_id] = UpdateThrottle(interval)
+        return throttle
+
+class StreamingMessage:
+    # A thread reply that fills in as the analysis streams. Intermediate text is
+    # coalesced: it is only sent when the channel's throttle allows, and the
+    # latest text always wins. finish() hands the final text to its own thread,
+    # which waits for a slot, so the caller's vision slot is released right away.
+    def __init__(self, token, channel_id, thread_ts, header):
+        self.client = get_slack_client(token)
+        self.channel_id = channel_id
+        self.header = header
+        self.throttle = get_update_throttle(channel_id)
+        self.sent = None
+        response = self.post(lambda: self.client.chat_postMessage(
+            channel=channel_id, thread_ts=thread_ts, text=f"{header}\n{PLACEHOLDER}"
+        ))
+        self.ts = response["ts"] if response else None
+
+    def post(self, call):
+        from slack_sdk.errors import SlackApiError
+
+        try:
+            return call()
+        except SlackApiError as e:
+            print(f"Error updating streamed analysis in Slack: {e}")
+            tracing.count("slack", errors=1)
+            return None
+
+    def send(self, text):
+        if self.ts is None or text == self.sent:
+            return
+        self.sent = text
+        self.post(lambda: self.client.chat_update(channel=self.channel_id, ts=self.ts, text=f"{self.header}\n{text}"))
+
+    def update(self, text):
+        if self.throttle.try_acquire():
+            self.send(text.rstrip() + " ...")
+
+    def finish(self, text):
+        # Not a daemon thread, so the process waits for the final edit before exiting
+        thread = threading.Thread(target=self.deliver, args=(text,), name="slack-final-update")
+        thread.start()
+        return thread
+
+    def deliver(self, text):
+        self.throttle.acquire()
+        self.send(text)
+
+@tracing.traced("vision")
+def stream_vision_analysis(image_data, prompt, on_text, budget=None):
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    # Same request as analyze_image_with_vision_model, streamed; on_text gets the
+    # text received so far after every chunk
+    image_url, _ = encode_for_vision(image_data)
+    tracing.count("vision", bytes=len(image_url))
+
+    parts = []
+    try:
+        for delta in get_llm_gateway().stream("vision", [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                ],
+            }
+        ], budget=budget):
+            parts.append(delta)
+            on_text("".join(parts))
+    except BudgetExhausted:
+        raise
+    except Exception as e:
+        print(f"Error for llm: {e}")
+        return ANALYSIS_ERROR
+    return "".join(parts) or ANALYSIS_ERROR
+
+def stream_analysis_to_thread(deduplicator, image_data, prompt, token, channel_id, thread_ts, header, panel_key=None):
+    # Posts a placeholder reply and streams the analysis into it. Cached and
+    # duplicate renders skip the model and fill the reply in one update.
+    message = StreamingMessage(token, channel_id, thread_ts, header)
+    try:
+        analysis = deduplicator.analyze(image_data, lambda data: stream_vision_analysis(data, prompt, message.update, deduplicator.budget), panel_key)
+    except Exception as e:
+        # e.g. BudgetExhausted; don't leave the placeholder behind
+        message.finish(f"Not analyzed: {e}")
+        raise
+    message.finish(analysis)
+    return analysis
@@ -1,6 +1,7 @@
 from . import grafana
 
 import inspect
+import os
 
 from kubiya_sdk import tool_registry
 from kubiya_sdk.tools.models import Arg, Tool
@@ -9,16 +10,15 @@ analyze_grafana_panel = Tool(
     name="analyze_grafana_panel",
     description="Generate render URLs for relevant Grafana dashboard panels, download images, analyze them using OpenAI's vision model, and send results to the current Slack thread",
     type="docker",
-    image="python:3.12",
+    # Built from the Dockerfile at the repository root; dependencies and the
+    # freshworks_tools package are baked in, so nothing is installed per run
+    image=os.environ.get("FRESHWORKS_TOOLS_IMAGE", "freshworks-tools:latest"),
     content="""
-pip install slack_sdk requests==2.32.3 litellm==1.49.5 pillow==11.0.0 > /dev/null 2>&1
-
 export GRAFANA_DASHBOARD_URL="$grafana_dashboard_url"
 export ALERT_SUBJECT="$alert_subject"
+export ALERT_TIME="$alert_time"
 
-curl -o /tmp/grafana.py https://analyze-panel-grafana.s3.eu-west-1.amazonaws.com/filter_alert.py
-
-python /tmp/grafana.py --grafana_dashboard_url "$grafana_dashboard_url" --alert_subject "$alert_subject"
+python -m freshworks_tools llm-filter "$alert_subject"
 """,
     secrets=[
         "SLACK_API_TOKEN", 
@@ -42,9 +42,75 @@ python /tmp/grafana.py --grafana_dashboard_url "$grafana_dashboard_url" --alert_
             type="str",
             description="Subject of the alert, used to filter relevant panels",
             required=True
+        ),
+        Arg(
+            name="alert_time",
+            type="str",
+            description="When the alert fired (epoch or ISO 8601); panels are rendered for the lookback window ending then",
+            required=False
+        )
+    ]
+)
+
+analyze_grafana_dashboards = Tool(
+    name="analyze_grafana_dashboards",
+    description="Rank panels related to an alert across several Grafana dashboards (a list of URLs, a folder or a tag), analyze the top ones using OpenAI's vision model, and stream the results to the current Slack thread",
+    type="docker",
+    image=os.environ.get("FRESHWORKS_TOOLS_IMAGE", "freshworks-tools:latest"),
+    content="""
+export GRAFANA_DASHBOARD_URLS="$grafana_dashboard_urls"
+export GRAFANA_FOLDER_UID="$grafana_folder_uid"
+export GRAFANA_DASHBOARD_TAG="$grafana_dashboard_tag"
+export ALERT_SUBJECT="$alert_subject"
+export ALERT_TIME="$alert_time"
+
+python -m freshworks_tools multi "$alert_subject"
+""",
+    secrets=[
+        "SLACK_API_TOKEN",
+        "GRAFANA_API_KEY",
+        "VISION_LLM_KEY"
+    ],
+    env=[
+        "SLACK_THREAD_TS",
+        "SLACK_CHANNEL_ID",
+        "VISION_LLM_BASE_URL",
+        "GRAFANA_URL"
+    ],
+    args=[
+        Arg(
+            name="alert_subject",
+            type="str",
+            description="Subject of the alert, used to rank panels across dashboards",
+            required=True
+        ),
+        Arg(
+            name="grafana_dashboard_urls",
+            type="str",
+            description="Comma-separated Grafana dashboard URLs",
+            required=False
+        ),
+        Arg(
+            name="grafana_folder_uid",
+            type="str",
+            description="UID of a Grafana folder whose dashboards should be included",
+            required=False
+        ),
+        Arg(
+            name="grafana_dashboard_tag",
+            type="str",
+            description="Tag of the Grafana dashboards to include",
+            required=False
+        ),
+        Arg(
+            name="alert_time",
+            type="str",
+            description="When the alert fired (epoch or ISO 8601); panels are rendered for the lookback window ending then",
+            required=False
         )
     ]
 )
 
-# Register the updated tool
-tool_registry.register("freshworks", analyze_grafana_panel)
\ No newline at end of file
+# Register the updated tools
+tool_registry.register("freshworks", analyze_grafana_panel)
+tool_registry.register("freshworks", analyze_grafana_dashboards)
\ No newline at end of file
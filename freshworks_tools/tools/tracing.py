@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import uuid
+import functools
+import threading
+
+STAGE_COUNTERS = ("bytes", "retries", "cache_hits", "cache_misses")
+
+class Tracer:
+    # Per-stage latencies and counters for one run. Disabled unless TRACE=on or a
+    # report/metrics path is set; when disabled traced() costs one attribute check.
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, mode=None):
+        self.run_id = uuid.uuid4().hex
+        self.mode = mode
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"durations": [], "errors": 0, **{counter: 0 for counter in STAGE_COUNTERS}}
+        return stage
+
+    def record(self, name, duration, ok=True, nbytes=0):
+        with self.lock:
+            stage = self.stage(name)
+            stage["durations"].append(duration)
+            stage["errors"] += 0 if ok else 1
+            stage["bytes"] += nbytes
+
+    def count(self, name, **counters):
+        with self.lock:
+            stage = self.stage(name)
+            for counter, value in counters.items():
+                stage[counter] = stage.get(counter, 0) + value
+
+    def report(self):
+        stages = {}
+        with self.lock:
+            for name, stage in self.stages.items():
+                durations = sorted(stage["durations"])
+                summary = {key: value for key, value in stage.items() if key != "durations"}
+                summary["count"] = len(durations)
+                summary["total_s"] = round(sum(durations), 4)
+                if durations:
+                    summary["p50_s"] = round(percentile(durations, 0.5), 4)
+                    summary["p95_s"] = round(percentile(durations, 0.95), 4)
+                    summary["max_s"] = round(durations[-1], 4)
+                stages[name] = summary
+        return {
+            "run_id": self.run_id,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "duration_s": round(time.perf_counter() - self.started, 4),
+            "stages": stages,
+        }
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+_tracer = Tracer()
+
+def get_tracer():
+    return _tracer
+
+def start_run(mode=None):
+    _tracer.enabled = (os.environ.get("TRACE", "off") == "on"
+                       or bool(os.environ.get("RUN_REPORT_PATH")) or bool(os.environ.get("RUN_METRICS_PATH")))
+    with _tracer.lock:
+        _tracer.reset(mode)
+
+def traced(name, measure=None):
+    # Times every call of the wrapped function under stage `name`; measure(result)
+    # gives the bytes to attribute to the stage
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                _tracer.record(name, time.perf_counter() - start, ok=False)
+                raise
+            _tracer.record(name, time.perf_counter() - start, nbytes=measure(result) if measure and result is not None else 0)
+            return result
+        return wrapper
+    return decorate
+
+def count(name, **counters):
+    if _tracer.enabled:
+        _tracer.count(name, **counters)
+
+def format_metrics(report, openmetrics=False):
+    lines = [
+        "# HELP freshworks_stage_duration_seconds Time spent per call in each pipeline stage.",
+        "# TYPE freshworks_stage_duration_seconds summary",
+    ]
+    for name, stage in report["stages"].items():
+        for quantile, key in (("0.5", "p50_s"), ("0.95", "p95_s")):
+            if key in stage:
+                lines.append(f'freshworks_stage_duration_seconds{{stage="{name}",quantile="{quantile}"}} {stage[key]}')
+        lines.append(f'freshworks_stage_duration_seconds_sum{{stage="{name}"}} {stage["total_s"]}')
+        lines.append(f'freshworks_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+    for counter in ("errors",) + STAGE_COUNTERS:
+        metric = f"freshworks_stage_{counter}"
+        lines.append(f"# HELP {metric} Total {counter.replace('_', ' ')} per pipeline stage.")
+        lines.append(f"# TYPE {metric} counter")
+        # OpenMetrics counters carry a _total suffix on the sample, not the family
+        sample = f"{metric}_total"
+        for name, stage in report["stages"].items():
+            lines.append(f'{sample}{{stage="{name}"}} {stage.get(counter, 0)}')
+    lines.append("# TYPE freshworks_run_duration_seconds gauge")
+    lines.append(f'freshworks_run_duration_seconds{{mode="{report["mode"]}"}} {report["duration_s"]}')
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+def write_output(path, content):
+    if path == "-":
+        sys.stdout.write(content)
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def finish_run():
+    # RUN_REPORT_PATH gets the JSON report; RUN_METRICS_PATH gets Prometheus text
+    # exposition (or OpenMetrics with RUN_METRICS_FORMAT=openmetrics), e.g. for
+    # node_exporter's textfile collector. "-" writes to stdout.
+    if not _tracer.enabled:
+        return None
+    report = _tracer.report()
+    report_path = os.environ.get("RUN_REPORT_PATH")
+    metrics_path = os.environ.get("RUN_METRICS_PATH")
+    try:
+        if report_path:
+            write_output(report_path, json.dumps(report, indent=2) + "\n")
+        if metrics_path:
+            write_output(metrics_path, format_metrics(report, os.environ.get("RUN_METRICS_FORMAT") == "openmetrics"))
+    except OSError as e:
+        print(f"Failed to write run report: {e}")
+    if not report_path:
+        print(f"Run report: {json.dumps(report)}")
+    return report
@@ -0,0 +1,68 @@
+import io
+import os
+import math
+import base64
+
+# OpenAI bills high-detail images per 512px tile after fitting them within
+# 2048x2048 and scaling the shortest side down to 768
+TILE_SIZE = 512
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+MAX_SIDE = 2048
+MAX_SHORT_SIDE = 768
+DEFAULT_MAX_SIDE = 1024
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_QUALITY = 80
+# Shrink up to 15% if that saves a row or column of tiles
+MIN_TILE_FILL = 0.85
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+def estimate_vision_tokens(width, height):
+    scale = min(1.0, MAX_SIDE / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, MAX_SHORT_SIDE / min(width, height))
+    width, height = width * scale, height * scale
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+def vision_size(width, height, max_side=DEFAULT_MAX_SIDE):
+    # Aspect-preserving target size: no larger than the model would keep, and pulled
+    # back onto a tile boundary when a dimension only just spills into another tile
+    scale = min(1.0, max_side / max(width, height), MAX_SHORT_SIDE / min(width, height))
+    fit = 1.0
+    for side in (width * scale, height * scale):
+        aligned = (math.ceil(side / TILE_SIZE) - 1) * TILE_SIZE
+        if aligned and aligned >= side * MIN_TILE_FILL:
+            fit = min(fit, aligned / side)
+    scale *= fit
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+def encode_for_vision(image_data, max_side=None, image_format=None, quality=None):
+    # Returns (data URL, (width, height)); the original bytes are left for the Slack upload
+    from PIL import Image
+
+    max_side = int(max_side or os.environ.get("VISION_IMAGE_MAX_SIDE", DEFAULT_MAX_SIDE))
+    image_format = (image_format or os.environ.get("VISION_IMAGE_FORMAT", DEFAULT_FORMAT)).lower()
+    quality = int(quality or os.environ.get("VISION_IMAGE_QUALITY", DEFAULT_QUALITY))
+    if image_format not in MIME_TYPES:
+        raise Exception(f"Unsupported VISION_IMAGE_FORMAT: {image_format}")
+
+    image = Image.open(io.BytesIO(image_data))
+    size = vision_size(image.width, image.height, max_side)
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+    if image_format == "jpeg":
+        # Grafana renders RGBA PNGs; JPEG has no alpha channel
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format.upper(), quality=quality, optimize=True)
+    encoded = base64.b64encode(buffer.getbuffer()).decode('utf-8')
+    return f"data:{MIME_TYPES[image_format]};base64,{encoded}", size
+
+def estimate_image_tokens(image_data, max_side=None):
+    # Prompt tokens image_data will cost once encode_for_vision has resized it; only the header is read
+    from PIL import Image
+
+    max_side = int(max_side or os.environ.get("VISION_IMAGE_MAX_SIDE", DEFAULT_MAX_SIDE))
+    image = Image.open(io.BytesIO(image_data))
+    return estimate_vision_tokens(*vision_size(image.width, image.height, max_side))
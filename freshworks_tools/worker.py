@@ -0,0 +1,279 @@
+import os
+import time
+import uuid
+import shutil
+from freshworks_tools.tools import cache
+from freshworks_tools.tools.relevance_cache import normalize
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_COALESCE_WINDOW = 120
+DEFAULT_CONCURRENCY = 4
+# Loaded by the worker before it starts its job processes; each is optional
+WARM_IMPORTS = ["requests", "slack_sdk", "PIL.Image", "numpy", "litellm"]
+# Per-alert settings carried in the job; secrets and everything else come from the worker's environment
+JOB_ENV = ["SLACK_CHANNEL_ID", "SLACK_THREAD_TS", "ALERT_TIME"]
+
+def get_spool_dir():
+    spool_dir = os.environ.get("WORKER_SPOOL_DIR") or cache.get_cache_dir("spool")
+    for name in ("incoming", "processing", "failed"):
+        os.makedirs(os.path.join(spool_dir, name), exist_ok=True)
+    return spool_dir
+
+def enqueue_job(mode, alert_subject=None, dashboard_url=None, env=None, spool_dir=None):
+    spool_dir = spool_dir or get_spool_dir()
+    env = dict(env if env is not None else {name: os.environ[name] for name in JOB_ENV if name in os.environ})
+    # A job queued behind others still renders the window of the alert, not of
+    # when it runs, so it shares cached renders with the alert's other runs
+    env.setdefault("ALERT_TIME", str(time.time()))
+    job = {
+        "mode": mode,
+        "alert_subject": alert_subject,
+        "dashboard_url": dashboard_url or os.environ.get("GRAFANA_DASHBOARD_URL"),
+        "env": env,
+        "enqueued_at": time.time(),
+    }
+    # Names sort in arrival order; write_json renames into place so the worker never reads a partial job
+    path = os.path.join(spool_dir, "incoming", f"{time.time_ns()}-{uuid.uuid4().hex}.json")
+    cache.write_json(path, job)
+    return path
+
+def register_worker(spool_dir):
+    # Each worker claims jobs into its own processing/<id>/ directory and holds an
+    # flock on it while it (or a job it started) is alive, so a later worker can
+    # tell the jobs of one that died apart from jobs still in progress
+    import fcntl
+
+    path = os.path.join(spool_dir, "processing", f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(path)
+    fd = os.open(os.path.join(path, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return path, fd
+
+def requeue(spool_dir, path):
+    try:
+        os.replace(path, os.path.join(spool_dir, "incoming", os.path.basename(path)))
+        return 1
+    except OSError:
+        return 0
+
+def reclaim_stale_jobs(spool_dir):
+    # Jobs claimed by a worker that stopped before finishing them go back to incoming/
+    import fcntl
+
+    processing = os.path.join(spool_dir, "processing")
+    reclaimed = 0
+    for name in sorted(os.listdir(processing)):
+        path = os.path.join(processing, name)
+        try:
+            fd = os.open(os.path.join(path, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            for job_name in sorted(os.listdir(path)):
+                if job_name.endswith(".json"):
+                    reclaimed += requeue(spool_dir, os.path.join(path, job_name))
+            shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            # Still locked by a live worker, or already reclaimed by another one
+            pass
+        finally:
+            os.close(fd)
+    return reclaimed
+
+def claim_jobs(spool_dir, processing_dir=None, limit=None):
+    # Renaming into processing/ is atomic, so several workers can share one spool
+    processing_dir = processing_dir or os.path.join(spool_dir, "processing")
+    claimed = []
+    for name in sorted(os.listdir(os.path.join(spool_dir, "incoming"))):
+        if limit is not None and len(claimed) >= limit:
+            break
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(processing_dir, name)
+        try:
+            os.replace(os.path.join(spool_dir, "incoming", name), path)
+        except OSError:
+            continue
+        job = cache.read_json(path)
+        if job is None:
+            os.replace(path, os.path.join(spool_dir, "failed", name))
+            continue
+        claimed.append((path, job))
+    return claimed
+
+def job_key(job):
+    # Repeats of one alert in the same Slack thread; the same alert in another
+    # thread is a separate job, since every thread gets its own results
+    env = job.get("env", {})
+    subject = normalize(job.get("alert_subject")) if job["mode"] != "dashboard" else None
+    return job["mode"], job.get("dashboard_url"), subject, env.get("SLACK_CHANNEL_ID"), env.get("SLACK_THREAD_TS")
+
+def job_argv(job):
+    argv = [job["mode"]]
+    # The dashboard mode analyzes every panel and takes no subject
+    if job.get("alert_subject") is not None and job["mode"] != "dashboard":
+        argv.append(job["alert_subject"])
+    if job.get("dashboard_url"):
+        argv += ["--dashboard-url", job["dashboard_url"]]
+    return argv
+
+def run_job(job):
+    from freshworks_tools import cli
+
+    # Runs in a job process that handles one job at a time (see Worker), so the
+    # job's settings can go into the environment the mode scripts read; it is
+    # restored afterwards for the next job
+    saved = dict(os.environ)
+    os.environ.update(job.get("env", {}))
+    try:
+        cli.main(job_argv(job))
+        return True
+    except (Exception, SystemExit) as e:
+        print(f"Job failed: {e!r}")
+        return False
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+def preload():
+    # Imported once in the worker so every job process starts with them loaded
+    import importlib
+    from freshworks_tools import cli
+
+    for module in list(cli.MODES.values()) + WARM_IMPORTS:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+def warm_up():
+    # Job process initializer: the Grafana, Slack and LLM clients are built once
+    # per process and shared by every job it runs, as are the dashboard indexes
+    # dashboard_cache keeps in memory
+    from freshworks_tools.tools.grafana_client import get_grafana_client
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+    from freshworks_tools.tools.slack_client import get_slack_client
+
+    if os.environ.get("GRAFANA_API_KEY"):
+        get_grafana_client(os.environ["GRAFANA_API_KEY"])
+    if os.environ.get("SLACK_API_TOKEN"):
+        try:
+            get_slack_client(os.environ["SLACK_API_TOKEN"])
+        except ImportError:
+            pass
+    get_llm_gateway()
+
+class Worker:
+    # Resident process for alert jobs. Mode modules and their dependencies are
+    # imported once, then jobs run side by side in a pool of long-lived processes
+    # forked from the worker, each keeping its clients and caches warm across jobs
+    # (see warm_up). A pool broken by a job process dying is replaced. Repeats
+    # of an alert in the same thread within coalesce_window seconds are dropped; the
+    # same alert in other threads runs once per thread, and the shared render,
+    # analysis and relevance caches make those runs reuse each other's work
+    def __init__(self, spool_dir=None, poll_interval=None, coalesce_window=None, concurrency=None):
+        import threading
+        import multiprocessing
+
+        self.spool_dir = spool_dir or get_spool_dir()
+        self.poll_interval = float(poll_interval if poll_interval is not None else os.environ.get("WORKER_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+        self.coalesce_window = float(coalesce_window if coalesce_window is not None else os.environ.get("WORKER_COALESCE_WINDOW", DEFAULT_COALESCE_WINDOW))
+        self.concurrency = int(concurrency or os.environ.get("WORKER_CONCURRENCY", DEFAULT_CONCURRENCY))
+        self.context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        self.processing_dir = None
+        self.lock_fd = None
+        self.pool = None
+        self.done = threading.Event()
+        self.recent = {}
+        self.running = {}
+        self.processed = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def start(self, path, job):
+        from concurrent.futures.process import BrokenProcessPool
+
+        now = time.time()
+        self.recent = {key: started_at for key, started_at in self.recent.items() if now - started_at < self.coalesce_window}
+        key = job_key(job)
+        if key in self.recent:
+            self.coalesced += 1
+            print(f"Dropping repeat of alert '{job.get('alert_subject')}' for {job.get('dashboard_url')} in the same thread")
+            os.remove(path)
+            return
+
+        self.recent[key] = now
+        print(f"Processing {job['mode']} job '{job.get('alert_subject')}' (queued {now - job.get('enqueued_at', now):.1f}s)")
+        try:
+            future = self.get_pool().submit(run_job, job)
+        except BrokenProcessPool:
+            # A job process died and took the pool with it; start a new one
+            self.pool.shutdown(wait=False)
+            self.pool = None
+            future = self.get_pool().submit(run_job, job)
+        future.add_done_callback(lambda _: self.done.set())
+        self.running[path] = (future, key)
+
+    def get_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.concurrency, mp_context=self.context, initializer=warm_up)
+        return self.pool
+
+    def reap(self):
+        self.done.clear()
+        finished = [path for path, (future, _) in self.running.items() if future.done()]
+        for path in finished:
+            future, key = self.running.pop(path)
+            error = future.exception()
+            if error is not None:
+                print(f"Job process failed: {error!r}")
+            if error is None and future.result():
+                self.processed += 1
+                os.remove(path)
+            else:
+                # A failed run doesn't count, so the next copy of this alert gets analyzed
+                self.failed += 1
+                self.recent.pop(key, None)
+                os.replace(path, os.path.join(self.spool_dir, "failed", os.path.basename(path)))
+        return len(finished)
+
+    def run_once(self):
+        jobs = claim_jobs(self.spool_dir, self.processing_dir, max(0, self.concurrency - len(self.running)))
+        for path, job in jobs:
+            self.start(path, job)
+        return len(jobs)
+
+    def wait(self):
+        self.done.wait(self.poll_interval)
+
+    def run(self, once=False):
+        reclaimed = reclaim_stale_jobs(self.spool_dir)
+        if reclaimed:
+            print(f"Requeued {reclaimed} jobs left in progress by a stopped worker")
+        self.processing_dir, self.lock_fd = register_worker(self.spool_dir)
+        preload()
+        print(f"Worker watching {self.spool_dir} ({self.concurrency} concurrent jobs)")
+        try:
+            while True:
+                finished = self.reap()
+                started = self.run_once()
+                if once and not started and not self.running:
+                    break
+                if not started and not finished:
+                    self.wait()
+        except KeyboardInterrupt:
+            # Interrupted jobs stay in processing/ and are reclaimed by the next worker
+            pass
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(wait=True, cancel_futures=True)
+            if not any(name.endswith(".json") for name in os.listdir(self.processing_dir)):
+                shutil.rmtree(self.processing_dir, ignore_errors=True)
+            os.close(self.lock_fd)
+        print(f"Worker stopped: {self.processed} processed, {self.coalesced} coalesced, {self.failed} failed")
+
+def main(once=False):
+    Worker().run(once)
@@ -0,0 +1,119 @@
+import io
+import re
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from freshworks_tools.tools import llm_gateway
+from freshworks_tools.tools.budget import BudgetExhausted, RunBudget
+from freshworks_tools.tools.composite import analyze_in_composites
+from freshworks_tools.tools.grafana_client import GrafanaClient
+from freshworks_tools.tools.pipeline import run_grouped_pipeline, run_panel_pipeline
+
+def png(width=400, height=200):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class FakeGateway:
+    # Answers every composite call with findings for each numbered tile
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, purpose, messages, **kwargs):
+        self.calls += 1
+        count = len(re.findall(r"^\d+\. ", messages[0]["content"][0]["text"], re.M))
+        content = json.dumps([{"panel": number, "findings": "ok"} for number in range(1, count + 1)])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = FakeGateway()
+    monkeypatch.setattr(llm_gateway, "get_llm_gateway", lambda: gateway)
+    return gateway
+
+def test_charge_stops_at_the_call_cap():
+    budget = RunBudget(max_calls=2)
+    budget.charge(b"")
+    budget.charge(b"")
+    with pytest.raises(BudgetExhausted):
+        budget.charge(b"")
+    assert budget.stats()["vision_calls"] == 2
+    assert budget.reason == "vision call budget of 2 exhausted"
+
+def test_composite_grids_are_charged_and_checked(gateway):
+    budget = RunBudget(max_calls=1)
+    panels = [f"Panel {number}" for number in range(10)]
+    image = png()
+
+    def analyze_group(group, images):
+        return analyze_in_composites(group, images, lambda data: pytest.fail("no per-panel fallback expected"),
+                                     panels_per_grid=2, max_workers=1, budget=budget)
+
+    uploaded = run_grouped_pipeline(panels, lambda panel: image, analyze_group, lambda panel, image, analysis: panel, budget=budget)
+    assert gateway.calls == 1
+    assert uploaded == ["Panel 0", "Panel 1"]
+    assert budget.skipped == panels[2:]
+
+def test_panel_pipeline_skips_panels_past_the_deadline():
+    budget = RunBudget(time_budget=0.5)
+
+    def analyze(panel, image):
+        time.sleep(0.3)
+        budget.charge(b"")
+        return panel
+
+    uploaded = run_panel_pipeline(list(range(6)), lambda panel: panel, analyze, lambda panel, image, analysis: analysis,
+                                  render_limit=1, analyze_limit=1, budget=budget)
+    assert uploaded[0] == 0
+    assert None in uploaded
+    assert budget.skipped
+    assert budget.reason == "time budget exhausted"
+
+class SlowRender(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(5)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def slow_grafana():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowRender)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/render"
+    server.shutdown()
+    server.server_close()
+
+def test_grafana_requests_stop_at_the_deadline(slow_grafana):
+    budget = RunBudget(time_budget=0.5)
+    client = GrafanaClient("key", max_retries=3, backoff=0.01)
+    started = time.monotonic()
+    with pytest.raises(BudgetExhausted):
+        client.get(slow_grafana, budget=budget)
+    assert time.monotonic() - started < 2
+    assert budget.reason == "time budget exhausted"
+
+def test_llm_requests_stop_at_the_deadline():
+    budget = RunBudget(time_budget=0.5)
+    gateway = llm_gateway.LLMGateway(timeout=30, max_retries=3, backoff=0.01)
+    attempts = []
+
+    async def call(**kwargs):
+        attempts.append(kwargs["timeout"])
+        await asyncio.sleep(5)
+
+    started = time.monotonic()
+    with pytest.raises(BudgetExhausted):
+        gateway.run(gateway.request(call, "model", 10, budget=budget))
+    assert time.monotonic() - started < 2
+    assert len(attempts) == 1 and attempts[0] <= 0.5
@@ -0,0 +1,41 @@
+import os
+import time
+
+import pytest
+
+from freshworks_tools.tools import cache, dashboard_cache
+from freshworks_tools.tools.dashboard_model import DashboardIndex
+
+TITLES = ["CPU usage", "Memory usage", "HTTP 5xx rate", "p99 latency", "CPU throttling", "Disk I/O", "Untitled graph 7"]
+
+def make_panels(titles=TITLES):
+    return [{"id": panel_id, "title": title, "type": "timeseries", "targets": []} for panel_id, title in enumerate(titles, 1)]
+
+@pytest.mark.parametrize("subject", ["", "c", "cp", "cpu", "CPU us", "usage", "u", "age", "5xx r", "i/o", "nothing here", "y 7"])
+def test_titles_containing_matches_substring_scan(subject):
+    panels = make_panels()
+    expected = [panel for panel in panels if subject.lower() in panel["title"].lower()]
+    assert DashboardIndex(panels).titles_containing(subject) == expected
+
+def test_ordered_keeps_dashboard_order():
+    index = DashboardIndex(make_panels())
+    assert [panel["id"] for panel in index.ordered({5, 1, 3, 99})] == [1, 3, 5]
+
+def write_entry(api_url, org_id, version, titles):
+    path = os.path.join(cache.get_cache_dir("dashboards"), cache.cache_key(api_url, org_id) + ".json")
+    cache.write_json(path, {"format": dashboard_cache.CACHE_FORMAT, "api_url": api_url, "org_id": org_id,
+                            "version": version, "etag": None, "fetched_at": time.time(), "panels": make_panels(titles)})
+
+def test_dashboard_index_built_once_per_version(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRESHWORKS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("ALERT_COALESCING", "off")
+    api_url = "https://grafana.example/api/dashboards/uid/abc"
+    write_entry(api_url, "1", 4, TITLES)
+
+    index = dashboard_cache.get_dashboard_index(api_url, "1", "key")
+    assert dashboard_cache.get_dashboard_index(api_url, "1", "key") is index
+
+    write_entry(api_url, "1", 5, ["Queue depth"])
+    rebuilt = dashboard_cache.get_dashboard_index(api_url, "1", "key")
+    assert rebuilt is not index
+    assert [panel["title"] for panel in rebuilt.titles_containing("queue")] == ["Queue depth"]
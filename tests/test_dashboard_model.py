@@ -0,0 +1,56 @@
+from freshworks_tools.tools.dashboard_model import flatten_panels, resolve_library_panels, walk_panels
+
+def panel(panel_id, title=None, **fields):
+    return dict({"id": panel_id, "type": "timeseries", "title": title}, **fields)
+
+DASHBOARD = {"dashboard": {"panels": [
+    panel(1, "Overview"),
+    # Expanded row: its panels follow it at the top level
+    {"type": "row", "title": "Web", "collapsed": False, "panels": []},
+    panel(2, "Requests"),
+    panel(3, libraryPanel={"uid": "lib-errors", "name": "Errors"}),
+    # Collapsed row: its panels are nested inside it
+    {"type": "row", "title": "Database", "collapsed": True, "panels": [panel(4, "Connections"), panel(5, type="stat")]},
+    {"type": "row", "title": "", "collapsed": True, "panels": [panel(6, "Queue depth")]},
+]}}
+
+def test_walk_panels_assigns_rows_to_expanded_and_collapsed_children():
+    walked = [(item["id"], row) for item, row in walk_panels(DASHBOARD["dashboard"]["panels"])]
+    assert walked == [(1, None), (2, "Web"), (3, "Web"), (4, "Database"), (5, "Database"), (6, None)]
+
+def test_library_panels_are_fetched_once_and_keep_their_placement():
+    fetched = []
+
+    def fetch(uid):
+        fetched.append(uid)
+        return {"id": 99, "title": "Error rate", "type": "timeseries", "gridPos": {"x": 0}, "targets": [{"expr": "errors"}]}
+
+    dashboard_panel = panel(3, libraryPanel={"uid": "lib-errors"}, gridPos={"x": 12})
+    copy = panel(7, libraryPanel={"uid": "lib-errors"})
+    resolved = resolve_library_panels([(dashboard_panel, "Web"), (copy, None), (panel(1, "Overview"), None)], fetch)
+
+    assert fetched == ["lib-errors"]
+    (first, first_row), (second, _), (plain, _) = resolved
+    assert (first["id"], first["title"], first["gridPos"], first_row) == (3, "Error rate", {"x": 12}, "Web")
+    assert first["targets"] == [{"expr": "errors"}]
+    assert second["id"] == 7
+    assert plain["title"] == "Overview"
+
+def test_failed_library_fetch_keeps_the_dashboard_copy():
+    def fetch(uid):
+        raise RuntimeError("404")
+
+    item = panel(3, libraryPanel={"uid": "lib-errors"})
+    assert resolve_library_panels([(item, None)], fetch) == [(item, None)]
+
+def test_flatten_panels_names_untitled_panels():
+    panels = flatten_panels(DASHBOARD, lambda uid: {"title": "Error rate", "type": "timeseries"})
+    assert [(item["id"], item["title"], item["row"]) for item in panels] == [
+        (1, "Overview", None),
+        (2, "Requests", "Web"),
+        (3, "Error rate", "Web"),
+        (4, "Connections", "Database"),
+        (5, "Untitled stat 5", "Database"),
+        (6, "Queue depth", None),
+    ]
+    assert flatten_panels(DASHBOARD)[2]["title"] == "Untitled timeseries 3"
@@ -0,0 +1,27 @@
+import numpy as np
+
+from freshworks_tools.tools.data_engine import detect_anomalies
+
+def noise(points, seed=0):
+    return list(np.random.default_rng(seed).normal(100, 5, points))
+
+def test_noise_is_rarely_flagged():
+    flagged = sum(bool(detect_anomalies(noise(500, seed))) for seed in range(200))
+    assert flagged <= 4
+
+def test_missing_points_are_ignored():
+    values = noise(500)
+    values[100:110] = [None] * 10
+    assert detect_anomalies(values) == []
+
+def test_spike_is_flagged():
+    values = noise(500)
+    values[480] = 200
+    reasons = detect_anomalies(values)
+    assert any(reason.startswith("z-score") for reason in reasons)
+    assert any(reason.startswith("MAD score") for reason in reasons)
+
+def test_level_shift_is_flagged():
+    values = noise(500)
+    values[400:] = [value + 15 for value in values[400:]]
+    assert any(reason.startswith("level shift at point 400/500") for reason in detect_anomalies(values))
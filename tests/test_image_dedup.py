@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+from freshworks_tools.tools.budget import BudgetExhausted, RunBudget
+from freshworks_tools.tools.image_dedup import ANALYSIS_ERROR, AnalysisStore, ImageDeduplicator, is_blank
+
+def render(spike=None):
+    # A flat series, optionally with a spike, as a small PNG
+    image = Image.new("RGB", (400, 200), "white")
+    draw = ImageDraw.Draw(image)
+    draw.line([(0, 150), (400, 150)], fill="green", width=2)
+    if spike:
+        draw.line([(200, 150), (205, 150 - spike), (210, 150)], fill="green", width=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def no_data(title, offset=0):
+    # Grafana's empty panel: the title bar and a centered "No data"
+    image = Image.new("RGB", (1000, 500), (24, 27, 31))
+    draw = ImageDraw.Draw(image)
+    draw.text((10, 8), title, fill="white")
+    draw.text((480 + offset, 245), "No data", fill="gray")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class Vision:
+    def __init__(self, analysis="steady"):
+        self.analysis = analysis
+        self.calls = 0
+
+    def __call__(self, image_data):
+        self.calls += 1
+        return self.analysis
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalysisStore(str(tmp_path / "analyses.sqlite3"))
+
+def test_identical_renders_share_one_call_within_a_run():
+    vision = Vision()
+    deduplicator = ImageDeduplicator(vision, "test")
+    assert deduplicator.analyze(render()) == "steady"
+    assert deduplicator.analyze(render()) == "steady"
+    assert vision.calls == 1
+    assert deduplicator.stats() == {"hits": 1, "misses": 1}
+
+def test_flat_and_spiking_renders_get_separate_calls():
+    vision = Vision()
+    deduplicator = ImageDeduplicator(vision, "test")
+    deduplicator.analyze(render())
+    deduplicator.analyze(render(spike=10))
+    assert vision.calls == 2
+
+def test_near_identical_blank_renders_share_one_call():
+    assert is_blank(no_data("host-1"))
+    assert not is_blank(render())
+    vision = Vision("no data")
+    deduplicator = ImageDeduplicator(vision, "test")
+    assert deduplicator.analyze(no_data("host-1")) == "no data"
+    assert deduplicator.analyze(no_data("host-2", offset=1)) == "no data"
+    assert vision.calls == 1
+
+def test_store_reuses_only_same_panel_and_identical_render(store):
+    ImageDeduplicator(Vision(), "test", store).analyze(render(), panel_key="dash?orgId=1&panelId=1")
+
+    vision = Vision("new")
+    assert ImageDeduplicator(vision, "test", store).analyze(render(), panel_key="dash?orgId=1&panelId=1") == "steady"
+    assert ImageDeduplicator(vision, "test", store).analyze(render(), panel_key="dash?orgId=1&panelId=2") == "new"
+    assert ImageDeduplicator(vision, "test", store).analyze(render(spike=30), panel_key="dash?orgId=1&panelId=1") == "new"
+    assert vision.calls == 2
+
+def test_errors_are_not_reused(store):
+    failing = Vision(ANALYSIS_ERROR)
+    deduplicator = ImageDeduplicator(failing, "test", store)
+    deduplicator.analyze(render(), panel_key="p")
+    deduplicator.analyze(render(), panel_key="p")
+    assert failing.calls == 2
+    assert store.lookup("test", "p", "missing") is None
+
+def test_cache_hits_are_not_charged(store):
+    budget = RunBudget(max_calls=1)
+    vision = Vision()
+    ImageDeduplicator(vision, "test", store, budget=budget).analyze(render(), panel_key="p")
+    ImageDeduplicator(vision, "test", store, budget=budget).analyze(render(), panel_key="p")
+    with pytest.raises(BudgetExhausted):
+        ImageDeduplicator(vision, "test", store, budget=budget).analyze(render(spike=40), panel_key="p")
+    assert vision.calls == 1
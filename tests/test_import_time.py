@@ -0,0 +1,16 @@
+import os
+
+from import_time import MODULES, HEAVY_MODULES, DEFAULT_BUDGET_MS, check_startup
+
+# Shared CI runners can be slow; the budget can be raised without editing the test
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+def test_entry_points_import_no_heavy_dependencies():
+    _, imports, _ = check_startup(MODULES, BUDGET_MS)
+    heavy = sorted(name for name in imports if name.split(".")[0] in HEAVY_MODULES)
+    assert heavy == []
+
+def test_startup_import_time_within_budget():
+    total_ms, _, failures = check_startup(MODULES, BUDGET_MS)
+    assert total_ms > 0
+    assert failures == []
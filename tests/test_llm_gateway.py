@@ -0,0 +1,87 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from freshworks_tools.tools.llm_gateway import LLMGateway, RateLimiter, parse_reset
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class Stream:
+    # Yields the given deltas, then stalls for stall seconds before ending
+    def __init__(self, deltas, stall=0):
+        self.deltas = list(deltas)
+        self.stall = stall
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.deltas:
+            return chunk(self.deltas.pop(0))
+        await asyncio.sleep(self.stall)
+        raise StopAsyncIteration
+
+class Error(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+@pytest.fixture
+def gateway():
+    return LLMGateway(concurrency=2, timeout=0.3, max_retries=2, backoff=0.01)
+
+def test_stream_yields_deltas_in_order(gateway):
+    async def call(**kwargs):
+        return Stream(["a", "b", "c"])
+
+    assert list(gateway.iterate(call, "model", 10)) == ["a", "b", "c"]
+
+def test_stalled_stream_times_out_and_releases_its_slot(gateway):
+    async def call(**kwargs):
+        return Stream(["a"], stall=30)
+
+    started = time.monotonic()
+    deltas = []
+    with pytest.raises((TimeoutError, asyncio.TimeoutError)):
+        for delta in gateway.iterate(call, "model", 10):
+            deltas.append(delta)
+    assert deltas == ["a"]
+    assert time.monotonic() - started < 5
+    # Both concurrency slots are free again
+    assert gateway.run(asyncio.wait_for(gateway.semaphore.acquire(), 1))
+    assert gateway.run(asyncio.wait_for(gateway.semaphore.acquire(), 1))
+
+def test_request_retries_retryable_errors(gateway):
+    attempts = []
+
+    async def call(**kwargs):
+        attempts.append(kwargs["model"])
+        if len(attempts) < 3:
+            raise Error(503)
+        return "done"
+
+    assert gateway.run(gateway.request(call, "model", 10)) == "done"
+    assert len(attempts) == 3
+    assert gateway.retries == 2
+
+def test_request_does_not_retry_client_errors(gateway):
+    attempts = []
+
+    async def call(**kwargs):
+        attempts.append(1)
+        raise Error(400)
+
+    with pytest.raises(Error):
+        gateway.run(gateway.request(call, "model", 10))
+    assert len(attempts) == 1
+
+def test_rate_limiter_syncs_from_headers():
+    limiter = RateLimiter()
+    limiter.sync({"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+    assert limiter.buckets["requests"].level == 0
+    assert limiter.buckets["requests"].wait_time(1) > 0
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("20ms") == pytest.approx(0.02)
@@ -0,0 +1,23 @@
+import pytest
+
+from freshworks_tools.tools.multi_dashboard import embedding_shortlist
+
+def make_dashboard(uid, titles):
+    return {"url": f"https://grafana.example/d/{uid}/{uid}", "name": uid, "api_url": f"https://grafana.example/api/dashboards/uid/{uid}",
+            "org_id": "1", "version": 1, "panels": [{"id": panel_id, "title": title, "targets": []} for panel_id, title in enumerate(titles, 1)]}
+
+@pytest.fixture(autouse=True)
+def local_embeddings(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRESHWORKS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_MODEL", "local:hashing")
+    monkeypatch.setenv("RELEVANCE_EMBEDDING_MIN_SCORE", "-1")
+
+def test_embedding_shortlist_numbers_panels_across_dashboards(monkeypatch):
+    monkeypatch.setenv("RELEVANCE_PREFILTER_TOP_K", "2")
+    dashboards = [
+        make_dashboard("service", ["Request rate", "Checkout latency"]),
+        make_dashboard("database", ["Replication lag", "Checkout query latency"]),
+    ]
+    shortlisted = embedding_shortlist(dashboards, "checkout latency")
+    # Global numbers follow dashboard order: service panels are 0-1, database panels 2-3
+    assert shortlisted == [("Checkout latency", 1), ("Checkout query latency", 3)]
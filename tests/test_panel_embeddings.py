@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from freshworks_tools.tools import cache
+from freshworks_tools.tools.panel_embeddings import HashingEmbedder, PanelEmbeddingIndex, panel_text
+
+API_URL = "https://grafana.example/api/dashboards/uid/abc"
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed(self, texts):
+        self.texts += texts
+        return super().embed(texts)
+
+def make_panels():
+    return [
+        {"id": 1, "title": "CPU usage", "targets": [{"expr": "rate(node_cpu_seconds_total[5m])"}]},
+        {"id": 2, "title": "Memory usage", "targets": [{"expr": "node_memory_MemAvailable_bytes"}]},
+        {"id": 3, "title": "HTTP 5xx rate", "targets": [{"expr": "sum(rate(http_requests_total{code=~\"5..\"}[5m]))"}]},
+        {"id": 4, "title": "Disk I/O", "targets": [{"expr": "rate(node_disk_io_time_seconds_total[5m])"}]},
+    ]
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRESHWORKS_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+def test_update_embeds_only_new_or_changed_panels():
+    panels = make_panels()
+    embedder = CountingEmbedder()
+    index = PanelEmbeddingIndex(API_URL, "1", embedder).update(panels)
+    assert index.embedded == 4
+
+    panels[1] = dict(panels[1], title="Memory used")
+    panels.append({"id": 5, "title": "Queue depth", "targets": []})
+    embedder.texts = []
+    index = PanelEmbeddingIndex(API_URL, "1", embedder).update(panels)
+    assert index.embedded == 2
+    assert embedder.texts == [panel_text(panels[1]), panel_text(panels[4])]
+    assert np.allclose(index.vectors, HashingEmbedder().embed([panel_text(panel) for panel in panels]))
+
+def test_unchanged_index_is_memory_mapped_from_disk():
+    panels = make_panels()
+    expected = PanelEmbeddingIndex(API_URL, "1", HashingEmbedder()).update(panels).vectors
+
+    embedder = CountingEmbedder()
+    index = PanelEmbeddingIndex(API_URL, "1", embedder).update(panels)
+    assert embedder.texts == []
+    assert index.embedded == 0
+    assert isinstance(index.vectors, np.memmap)
+    assert np.array_equal(index.vectors, expected)
+
+def test_meta_names_the_only_vectors_file():
+    panels = make_panels()
+    index = PanelEmbeddingIndex(API_URL, "1", HashingEmbedder()).update(panels)
+    PanelEmbeddingIndex(API_URL, "1", HashingEmbedder()).update(panels[:2])
+
+    meta = cache.read_json(index.meta_path)
+    assert [name for name in os.listdir(index.path) if name.endswith(".npy")] == [meta["vectors"]]
+    assert meta["ids"] == [1, 2]
+
+def test_search_orders_by_similarity_and_applies_min_score():
+    index = PanelEmbeddingIndex(API_URL, "1", HashingEmbedder()).update(make_panels())
+
+    results = index.search("cpu usage", top_k=4, min_score=-1)
+    assert results[0][0] == 1
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+    assert len(results) == 4
+
+    filtered = index.search("cpu usage", top_k=4, min_score=results[1][1])
+    assert filtered == [result for result in results if result[1] >= results[1][1]]
+    assert index.search("cpu usage", top_k=2, min_score=-1) == results[:2]
+    assert index.search("cpu usage", min_score=1.01) == []
@@ -0,0 +1,45 @@
+import time
+
+from freshworks_tools.tools.relevance_cache import RelevanceCache
+
+def test_decisions_are_keyed_by_normalized_subject_title_and_model(tmp_path):
+    relevance_cache = RelevanceCache(str(tmp_path / "relevance.sqlite3"))
+    relevance_cache.set("High CPU on api", "CPU usage", "gpt-4", 1.0)
+    assert relevance_cache.get("  high cpu ON api ", "cpu   usage", "gpt-4") == 1.0
+    assert relevance_cache.get("High CPU on api", "CPU usage", "gpt-4o") is None
+    assert relevance_cache.get("Disk full", "CPU usage", "gpt-4") is None
+    assert relevance_cache.stats()["hits"] == 1
+    assert relevance_cache.stats()["total_misses"] == 2
+
+def test_expired_and_least_recently_used_entries_are_evicted(tmp_path):
+    relevance_cache = RelevanceCache(str(tmp_path / "relevance.sqlite3"), ttl=60, max_entries=2)
+    for title in ("a", "b", "c"):
+        relevance_cache.set("subject", title, "m", 0.0)
+        time.sleep(0.01)
+    relevance_cache.get("subject", "a", "m")
+    relevance_cache.evict()
+    assert relevance_cache.get("subject", "a", "m") == 0.0
+    assert relevance_cache.get("subject", "b", "m") is None
+    assert relevance_cache.get("subject", "c", "m") == 0.0
+
+    expired = RelevanceCache(str(tmp_path / "expired.sqlite3"), ttl=0)
+    expired.set("subject", "a", "m", 1.0)
+    assert expired.get("subject", "a", "m") is None
+
+def test_batched_lookup_is_one_transaction_and_counters_are_written_on_flush(tmp_path):
+    relevance_cache = RelevanceCache(str(tmp_path / "relevance.sqlite3"))
+    for title in ("a", "b"):
+        relevance_cache.set("subject", title, "m", 1.0)
+    statements = []
+    relevance_cache.conn.set_trace_callback(statements.append)
+
+    assert relevance_cache.get_many("subject", ["a", "b", "c"], "m") == {"a": 1.0, "b": 1.0}
+    assert sum(statement.startswith("COMMIT") for statement in statements) == 1
+    assert not any("counters" in statement for statement in statements)
+    # A second look after waiting for another run isn't counted again
+    assert relevance_cache.get_many("subject", ["c"], "m", count=False) == {}
+    assert relevance_cache.stats() == {"hits": 2, "misses": 1, "total_hits": 2, "total_misses": 1}
+
+    relevance_cache.flush()
+    relevance_cache.conn.set_trace_callback(None)
+    assert RelevanceCache(str(tmp_path / "relevance.sqlite3")).stats()["total_hits"] == 2
@@ -0,0 +1,70 @@
+import re
+import json
+import functools
+from types import SimpleNamespace
+
+import pytest
+
+from freshworks_tools.tools import filter_alert, llm_gateway
+from freshworks_tools.tools.filter_alert import chunk_panels, parse_panel_scores, score_related_panels
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class FakeGateway:
+    # Batch prompts get the CPU panels back in a code fence, except that a chunk
+    # containing `confused` gets an unknown id; single-panel prompts get Yes/No
+    def __init__(self, confused):
+        self.confused = confused
+        self.batches = []
+        self.singles = []
+
+    def complete(self, purpose, messages, **kwargs):
+        prompt = messages[0]["content"]
+        match = re.search(r"Panels: (\[.*\])\n", prompt)
+        if match is None:
+            title = re.search(r"titled '(.*?)' likely", prompt).group(1)
+            self.singles.append(title)
+            return reply("Yes, probably." if "CPU" in title else "No.")
+        panels = json.loads(match.group(1))
+        self.batches.append([panel["id"] for panel in panels])
+        if any(panel["id"] == self.confused for panel in panels):
+            return reply('[{"id": 99, "score": 1.0}]')
+        related = [{"id": panel["id"], "score": 0.9} for panel in panels if "CPU" in panel["title"]]
+        return reply(f"```json\n{json.dumps(related)}\n```")
+
+def test_chunks_split_on_panel_count_and_token_budget():
+    panels = [(f"Panel {number}", number) for number in range(5)]
+    assert [len(chunk) for chunk in chunk_panels(panels, max_panels=2)] == [2, 2, 1]
+    # Each panel is ~10 tokens, so three fit in 30
+    assert [len(chunk) for chunk in chunk_panels(panels, max_tokens=30)] == [3, 2]
+    # A single panel over the budget still gets a chunk of its own
+    assert chunk_panels([("x" * 400, 1), ("y", 2)], max_tokens=50) == [[("x" * 400, 1)], [("y", 2)]]
+
+def test_scores_are_parsed_from_fenced_or_prose_wrapped_json():
+    chunk = [("CPU", 1), ("Memory", 2)]
+    assert parse_panel_scores('```json\n[{"id": 1, "score": 0.8}]\n```', chunk) == {1: 0.8}
+    assert parse_panel_scores('The related panels are [{"id": 2}] based on the titles.', chunk) == {2: 1.0}
+    assert parse_panel_scores("[]", chunk) == {}
+
+def test_string_ids_map_back_to_panel_ids():
+    assert parse_panel_scores('[{"id": "1", "score": 0.7}]', [("CPU", 1)]) == {1: 0.7}
+    assert parse_panel_scores('[{"id": 7}]', [("CPU", "7")]) == {"7": 1.0}
+
+def test_unknown_ids_and_missing_arrays_are_rejected():
+    with pytest.raises(ValueError):
+        parse_panel_scores('[{"id": 3}]', [("CPU", 1)])
+    with pytest.raises(ValueError):
+        parse_panel_scores("None of these panels are related.", [("CPU", 1)])
+
+def test_only_the_chunk_with_a_bad_reply_falls_back_to_single_panel_calls(monkeypatch):
+    gateway = FakeGateway(confused=3)
+    monkeypatch.setattr(llm_gateway, "get_llm_gateway", lambda: gateway)
+    monkeypatch.setattr(filter_alert, "chunk_panels", functools.partial(chunk_panels, max_panels=2))
+    panels = [("CPU usage", 1), ("Memory", 2), ("CPU steal", 3), ("Disk", 4)]
+
+    related = score_related_panels(panels, "High CPU")
+
+    assert gateway.batches == [[1, 2], [3, 4]]
+    assert gateway.singles == ["CPU steal", "Disk"]
+    assert related == [("CPU usage", 1, 0.9), ("CPU steal", 3, 1.0)]
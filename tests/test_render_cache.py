@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from freshworks_tools.tools.render_cache import RenderCache
+
+URL = "https://grafana.example/render/d-solo/abc/service?orgId=1&from=1&to=2&panelId=3"
+
+class Download:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"png {self.calls}".encode()
+
+@pytest.fixture
+def render_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRESHWORKS_CACHE_DIR", str(tmp_path))
+    os.makedirs(tmp_path / "renders")
+    return RenderCache(str(tmp_path / "renders"), max_entries=2)
+
+def test_renders_are_reused_until_the_dashboard_version_changes(render_cache):
+    download = Download()
+    assert render_cache.fetch(URL, 7, download) == b"png 1"
+    assert render_cache.fetch(URL, 7, download) == b"png 1"
+    assert render_cache.fetch(URL, 8, download) == b"png 2"
+    assert download.calls == 2
+
+def test_unknown_version_is_never_cached(render_cache):
+    download = Download()
+    render_cache.fetch(URL, None, download)
+    render_cache.fetch(URL, None, download)
+    assert download.calls == 2
+    assert os.listdir(render_cache.cache_dir) == []
+
+def test_oldest_renders_are_evicted(render_cache):
+    for panel_id in range(4):
+        render_cache.set(f"{URL}&n={panel_id}", 1, b"png")
+    assert len(os.listdir(render_cache.cache_dir)) == 2
@@ -0,0 +1,24 @@
+import pytest
+
+from freshworks_tools.tools.render_window import get_render_window, parse_alert_time
+
+def test_alert_time_formats():
+    assert parse_alert_time("1700000000") == 1700000000
+    assert parse_alert_time("1700000000500") == pytest.approx(1700000000.5)
+    assert parse_alert_time("2023-11-14T22:13:20Z") == 1700000000
+    assert parse_alert_time("2023-11-14T22:13:20.250+00:00") == pytest.approx(1700000000.25)
+    assert parse_alert_time("yesterday") is None
+    assert parse_alert_time("") is None
+
+def test_window_ends_on_a_bucket_boundary(monkeypatch):
+    monkeypatch.setenv("RENDER_LOOKBACK", "1h")
+    monkeypatch.setenv("RENDER_WINDOW_BUCKET", "1m")
+    # Alerts firing within the same minute ask for the same window
+    assert get_render_window("1700000001") == get_render_window("2023-11-14T22:14:00Z")
+    assert get_render_window("1700000001") == ((1700000040 - 3600) * 1000, 1700000040 * 1000)
+    assert get_render_window("1700000041") != get_render_window("1700000001")
+
+def test_window_reads_alert_time_from_the_environment(monkeypatch):
+    monkeypatch.setenv("ALERT_TIME", "1700000000000")
+    monkeypatch.setenv("RENDER_WINDOW_BUCKET", "5m")
+    assert get_render_window()[1] == 1700000100 * 1000
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+import pytest
+
+from freshworks_tools.tools import cache, singleflight
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRESHWORKS_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("ALERT_COALESCING", raising=False)
+    return tmp_path
+
+def hold(parts, entered, release):
+    with singleflight.coalesce(*parts):
+        entered.set()
+        release.wait(5)
+
+def test_each_key_has_its_own_lock_file():
+    assert singleflight.lock_path(cache.cache_key("render", "a")) != singleflight.lock_path(cache.cache_key("render", "b"))
+
+def test_follower_waits_for_leader_and_lock_file_is_removed():
+    entered, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=hold, args=(("render", "a"), entered, release))
+    leader.start()
+    entered.wait(5)
+    threading.Timer(0.2, release.set).start()
+
+    started = time.monotonic()
+    with singleflight.coalesce("render", "a") as waited:
+        assert waited
+        assert time.monotonic() - started >= 0.15
+    leader.join()
+    assert not os.path.exists(singleflight.lock_path(cache.cache_key("render", "a")))
+
+def test_other_keys_do_not_wait():
+    entered, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=hold, args=(("render", "a"), entered, release))
+    leader.start()
+    entered.wait(5)
+    try:
+        with singleflight.coalesce("render", "b") as waited:
+            assert not waited
+    finally:
+        release.set()
+        leader.join()
+
+def test_wait_is_capped_by_the_callers_timeout():
+    entered, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=hold, args=(("analysis", "x"), entered, release))
+    leader.start()
+    entered.wait(5)
+    try:
+        started = time.monotonic()
+        with singleflight.coalesce("analysis", "x", timeout=0.1) as waited:
+            assert waited
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        leader.join()
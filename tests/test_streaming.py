@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from freshworks_tools.tools import streaming
+
+class FakeSlackClient:
+    def __init__(self):
+        self.updates = []
+
+    def chat_postMessage(self, **kwargs):
+        return {"ts": "1.0"}
+
+    def chat_update(self, **kwargs):
+        self.updates.append((time.monotonic(), kwargs["text"]))
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeSlackClient()
+    monkeypatch.setattr(streaming, "get_slack_client", lambda token: client)
+    monkeypatch.setattr(streaming, "get_update_throttle", lambda channel_id: streaming.UpdateThrottle(0.2))
+    return client
+
+def test_finish_returns_without_waiting_for_the_throttle(client):
+    message = streaming.StreamingMessage("token", "C1", "1.0", "*CPU*")
+    message.update("partial")
+    started = time.monotonic()
+    thread = message.finish("final")
+    assert time.monotonic() - started < 0.1
+
+    thread.join()
+    assert [text for _, text in client.updates] == ["*CPU*\npartial ...", "*CPU*\nfinal"]
+    # The final edit still waited for the channel's next slot
+    assert client.updates[1][0] - client.updates[0][0] >= 0.19
+
+def test_update_coalesces_text_within_an_interval(client):
+    message = streaming.StreamingMessage("token", "C1", "1.0", "*CPU*")
+    for text in ("a", "ab", "abc"):
+        message.update(text)
+    message.finish("abcd").join()
+    assert [text for _, text in client.updates] == ["*CPU*\na ...", "*CPU*\nabcd"]
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from freshworks_tools import cli, worker
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKER_SPOOL_DIR", str(tmp_path / "spool"))
+    return worker.get_spool_dir()
+
+def record_run(argv):
+    # Stands in for cli.main in the job process: records the job's environment and process
+    from freshworks_tools.tools.llm_gateway import get_llm_gateway
+
+    with open(os.path.join(os.environ["RECORD_DIR"], os.environ["SLACK_THREAD_TS"] + ".json"), "w") as f:
+        json.dump({"argv": argv, "pid": os.getpid(), "gateway": id(get_llm_gateway()),
+                   "leaked": os.environ.get("LEAKED")}, f)
+    os.environ["LEAKED"] = os.environ["SLACK_THREAD_TS"]
+
+def test_dashboard_job_argv_is_accepted_by_cli():
+    job = {"mode": "dashboard", "alert_subject": "High CPU", "dashboard_url": "https://grafana.example/d/abc/service"}
+    args = cli.build_parser().parse_args(worker.job_argv(job))
+    assert args.mode == "dashboard"
+    assert args.dashboard_url == job["dashboard_url"]
+
+def test_job_key_separates_threads():
+    job = {"mode": "filter", "alert_subject": "High CPU", "dashboard_url": "u", "env": {"SLACK_CHANNEL_ID": "C1", "SLACK_THREAD_TS": "1.0"}}
+    other_thread = dict(job, env={"SLACK_CHANNEL_ID": "C1", "SLACK_THREAD_TS": "2.0"})
+    assert worker.job_key(job) == worker.job_key(dict(job, alert_subject="high  cpu"))
+    assert worker.job_key(job) != worker.job_key(other_thread)
+
+def test_reclaim_requeues_only_jobs_of_stopped_workers(spool_dir):
+    processing = os.path.join(spool_dir, "processing")
+    stopped = os.path.join(processing, "123-dead")
+    os.makedirs(stopped)
+    with open(os.path.join(stopped, "2-stopped.json"), "w") as f:
+        f.write("{}")
+    live_dir, fd = worker.register_worker(spool_dir)
+    with open(os.path.join(live_dir, "3-live.json"), "w") as f:
+        f.write("{}")
+    try:
+        assert worker.reclaim_stale_jobs(spool_dir) == 1
+    finally:
+        os.close(fd)
+    assert os.listdir(os.path.join(spool_dir, "incoming")) == ["2-stopped.json"]
+    assert not os.path.exists(stopped)
+    assert sorted(os.listdir(live_dir)) == [".lock", "3-live.json"]
+
+def test_jobs_share_warm_processes_without_sharing_settings(spool_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "main", record_run)
+    monkeypatch.setattr(worker, "WARM_IMPORTS", [])
+    monkeypatch.setenv("RECORD_DIR", str(tmp_path))
+    monkeypatch.delenv("SLACK_THREAD_TS", raising=False)
+    for thread in ("1.0", "2.0", "1.0", "3.0"):
+        worker.enqueue_job("dashboard", "High CPU", "https://grafana.example/d/abc/service",
+                           {"SLACK_CHANNEL_ID": "C1", "SLACK_THREAD_TS": thread}, spool_dir)
+
+    runner = worker.Worker(spool_dir, poll_interval=0.01, coalesce_window=60, concurrency=1)
+    runner.run(once=True)
+
+    assert (runner.processed, runner.coalesced, runner.failed) == (3, 1, 0)
+    runs = {}
+    for thread in ("1.0", "2.0", "3.0"):
+        with open(tmp_path / f"{thread}.json") as f:
+            runs[thread] = json.load(f)
+    # One long-lived job process with one gateway ran every job
+    assert len({run["pid"] for run in runs.values()}) == 1
+    assert len({run["gateway"] for run in runs.values()}) == 1
+    assert all(run["leaked"] is None for run in runs.values())
+    assert runs["1.0"]["argv"] == ["dashboard", "--dashboard-url", "https://grafana.example/d/abc/service"]
+    assert "SLACK_THREAD_TS" not in os.environ
+    assert os.listdir(os.path.join(spool_dir, "processing")) == []
+
+def test_queued_jobs_keep_the_alert_time(spool_dir, monkeypatch):
+    monkeypatch.delenv("SLACK_CHANNEL_ID", raising=False)
+    monkeypatch.setenv("SLACK_THREAD_TS", "1.0")
+    monkeypatch.setenv("ALERT_TIME", "2023-11-14T22:13:20Z")
+    job = worker.cache.read_json(worker.enqueue_job("filter", "High CPU", "u", spool_dir=spool_dir))
+    assert job["env"] == {"SLACK_THREAD_TS": "1.0", "ALERT_TIME": "2023-11-14T22:13:20Z"}
+
+    monkeypatch.delenv("ALERT_TIME")
+    job = worker.cache.read_json(worker.enqueue_job("filter", "High CPU", "u", spool_dir=spool_dir))
+    assert float(job["env"]["ALERT_TIME"]) <= job["enqueued_at"]